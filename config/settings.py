@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     "rest_framework",
     "core"
 ]
@@ -128,14 +129,31 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-CELERY_BROKER_URL = os.environ.get("REDIS_URL", "redis://redis:6379/0")
-CELERY_RESULT_BACKEND = os.environ.get("REDIS_URL", "redis://redis:6379/0")
+REDIS_URL = os.environ.get("REDIS_URL", "redis://redis:6379/0")
+
+CELERY_BROKER_URL = REDIS_URL
+CELERY_RESULT_BACKEND = REDIS_URL
 
 VACANCY_PROCESSING_SCHEDULE_SECONDS = os.getenv("VACANCY_PROCESSING_SCHEDULE_SECONDS")
+VACANCY_DUPLICATE_INDEX_REBUILD_SECONDS = os.getenv("VACANCY_DUPLICATE_INDEX_REBUILD_SECONDS", "86400")
+VACANCY_MATCH_INDEX_REBUILD_SECONDS = os.getenv("VACANCY_MATCH_INDEX_REBUILD_SECONDS", "86400")
+VACANCY_STATS_REFRESH_SECONDS = os.getenv("VACANCY_STATS_REFRESH_SECONDS", "300")
 
 CELERY_BEAT_SCHEDULE = {
     'process_vacancy_batch': {
         'task': 'core.tasks.process_vacancy_batch',
         'schedule': timedelta(seconds=int(VACANCY_PROCESSING_SCHEDULE_SECONDS)),
     },
+    'rebuild_duplicate_index': {
+        'task': 'core.tasks.rebuild_duplicate_index_task',
+        'schedule': timedelta(seconds=int(VACANCY_DUPLICATE_INDEX_REBUILD_SECONDS)),
+    },
+    'rebuild_match_index': {
+        'task': 'core.tasks.rebuild_match_index_task',
+        'schedule': timedelta(seconds=int(VACANCY_MATCH_INDEX_REBUILD_SECONDS)),
+    },
+    'refresh_stats_rollups': {
+        'task': 'core.tasks.refresh_stats_rollups_task',
+        'schedule': timedelta(seconds=int(VACANCY_STATS_REFRESH_SECONDS)),
+    },
 }
\ No newline at end of file
@@ -0,0 +1,49 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse
+from django.views import View
+from pydantic import ValidationError
+
+from core.api.search import serialize_analysis
+from core.schemas import VacancyFeedParams
+from core.services import InvalidCursor, feed_page, wait_for_feed
+from core.utils import async_redis
+
+
+def serialize_feed(vacancies):
+    return [
+        {**serialize_analysis(vacancy.analysis), "processed_at": vacancy.processed_at.isoformat()}
+        for vacancy in vacancies
+    ]
+
+
+class VacancyFeedAPIView(View):
+    """
+    Change feed of processed vacancies. Consumers pass back `next_cursor` to get
+    the following page; with `wait` an empty page is held open until new vacancies
+    are processed or the wait expires. The view is async, so a waiting consumer
+    holds no worker; `wait` is refused when the app is served through WSGI, where it would.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            validated = VacancyFeedParams(**request.GET.dict())
+        except ValidationError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        if validated.wait and not isinstance(request, ASGIRequest):
+            return JsonResponse({"error": "wait is only available when the API is served through ASGI"}, status=400)
+
+        try:
+            if validated.wait:
+                async with async_redis(request):
+                    vacancies, next_cursor = await wait_for_feed(validated.cursor, validated.limit, validated.wait)
+            else:
+                vacancies, next_cursor = await sync_to_async(feed_page)(validated.cursor, validated.limit)
+        except InvalidCursor as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        return JsonResponse({
+            "results": await sync_to_async(serialize_feed)(vacancies),
+            "next_cursor": next_cursor,
+            "has_more": len(vacancies) == validated.limit,
+        })
@@ -0,0 +1,56 @@
+import json
+import os
+
+from django.http import JsonResponse
+from django.urls import reverse
+from django.views import View
+from pydantic import ValidationError
+from redis.exceptions import RedisError
+
+from core.schemas import VacancyInput
+from core.services import enqueue_vacancy, get_ingest_status
+from core.utils import async_redis
+
+
+class VacancyIngestView(View):
+    """
+    Async ingestion: validates the vacancy, queues it on a Redis stream and answers
+    202 with a tracking id. Duplicate checks and inserts happen in the
+    `consume_ingest_stream` consumer, so the request never touches the database.
+    """
+
+    async def post(self, request, *args, **kwargs):
+        try:
+            validated_data = VacancyInput(**json.loads(request.body))
+        except (ValidationError, json.JSONDecodeError, TypeError) as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        if len(validated_data.text) < int(os.getenv("VACANCY_MIN_LENGTH")):
+            return JsonResponse({"error": "Vacancy is too small"}, status=400)
+
+        try:
+            async with async_redis(request):
+                tracking_id = await enqueue_vacancy(validated_data)
+        except RedisError:
+            return JsonResponse({"error": "Ingestion queue is unavailable, retry later"}, status=503)
+
+        status_url = reverse("vacancy-ingest-status", args=[tracking_id])
+        response = JsonResponse({
+            "tracking_id": tracking_id,
+            "status": "queued",
+            "status_url": status_url,
+            "message": "Vacancy queued. Check status_url for the duplicate check result.",
+        }, status=202)
+        response["Location"] = status_url
+        return response
+
+
+class VacancyIngestStatusView(View):
+    async def get(self, request, tracking_id, *args, **kwargs):
+        try:
+            async with async_redis(request):
+                status = await get_ingest_status(tracking_id)
+        except RedisError:
+            return JsonResponse({"error": "Ingestion queue is unavailable, retry later"}, status=503)
+        if status is None:
+            return JsonResponse({"error": "Unknown or expired tracking id"}, status=404)
+        return JsonResponse({"tracking_id": tracking_id, **status})
@@ -0,0 +1,63 @@
+from django.http import JsonResponse
+from pydantic import ValidationError
+from rest_framework.views import APIView
+
+from core.api.search import serialize_analysis
+from core.models import Area, JobCategory, Resume, VacancyAnalysis
+from core.schemas import ResumeMatchParams
+from core.services import MatchCache, get_match_generation, get_match_index, match_vacancies
+
+match_cache = MatchCache()
+
+
+class ResumeMatchesAPIView(APIView):
+    def get(self, request, resume_id, *args, **kwargs):
+        try:
+            validated = ResumeMatchParams(**request.query_params.dict())
+        except ValidationError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        resume = Resume.objects.filter(id=resume_id).first()
+        if resume is None:
+            return JsonResponse({"error": "Resume not found"}, status=404)
+
+        params = validated.model_dump()
+        # Read before matching, so results computed while new vacancies arrive are cached as stale.
+        generation = get_match_generation()
+        index = get_match_index()
+        # Read before matching too: a sync in between only makes the results newer than their key.
+        cursor = index.cursor
+        results = match_cache.get(resume, params, generation, cursor)
+        if results is None:
+            results = self.find_matches(index, resume, validated)
+            match_cache.set(resume, params, generation, cursor, results)
+        return JsonResponse({"resume_id": resume.id, "results": results})
+
+    def find_matches(self, index, resume, validated):
+        filters = {"work_format": validated.work_format}
+        if validated.category:
+            filters["category_id"] = JobCategory.objects.filter(name=validated.category).values_list('id', flat=True).first()
+            if filters["category_id"] is None:
+                return []
+        if validated.area:
+            filters["area_id"] = Area.objects.filter(name=validated.area).values_list('id', flat=True).first()
+            if filters["area_id"] is None:
+                return []
+
+        matches = match_vacancies(index, resume.text, validated.k, **filters)
+        analyses = {
+            analysis.vacancy_id: analysis
+            for analysis in VacancyAnalysis.objects.filter(vacancy_id__in=[match["vacancy_id"] for match in matches])
+            .select_related('vacancy', 'vacancy__area', 'job_category', 'job_subcategory')
+            .prefetch_related('key_requirements')
+            .defer('vacancy__search_vector')
+        }
+        return [
+            {
+                **serialize_analysis(analyses[match["vacancy_id"]]),
+                "score": match["score"],
+                "similarity": match["similarity"],
+                "matched_requirements": match["matched_requirements"],
+            }
+            for match in matches if match["vacancy_id"] in analyses
+        ]
@@ -0,0 +1,59 @@
+from django.http import JsonResponse
+from pydantic import ValidationError
+from rest_framework.views import APIView
+
+from core.schemas import VacancySearchParams
+from core.services import VACANCIES, ResponseCache, search_vacancies
+
+search_cache = ResponseCache("search", [VACANCIES])
+
+
+def serialize_analysis(analysis):
+    vacancy = analysis.vacancy
+    return {
+        "id": vacancy.id,
+        "text": vacancy.text,
+        "source": vacancy.source,
+        "area": vacancy.area.name if vacancy.area else None,
+        "created_at": vacancy.created_at.isoformat(),
+        "job_category": analysis.job_category.name if analysis.job_category else None,
+        "job_subcategory": analysis.job_subcategory.name if analysis.job_subcategory else None,
+        "company": analysis.company,
+        "location": analysis.location,
+        "employment_type": analysis.employment_type,
+        "work_format": analysis.work_format,
+        "salary_range_min": analysis.salary_range_min,
+        "salary_range_max": analysis.salary_range_max,
+        "salary_currency": analysis.salary_currency,
+        "experience_years_required": analysis.experience_years_required,
+        "key_requirements": [requirement.name for requirement in analysis.key_requirements.all()],
+    }
+
+
+class VacancySearchAPIView(APIView):
+    def get(self, request, *args, **kwargs):
+        params = {key: value for key, value in request.query_params.items() if value != ""}
+        # ?requirements=Python&requirements=Django and ?requirements=Python,Django are both accepted.
+        params["requirements"] = [
+            name.strip()
+            for value in request.query_params.getlist("requirements")
+            for name in value.split(",") if name.strip()
+        ]
+        try:
+            validated = VacancySearchParams(**params)
+        except ValidationError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        def build():
+            analyses, has_next = search_vacancies(validated)
+            return {
+                "results": [serialize_analysis(analysis) for analysis in analyses],
+                "page": validated.page,
+                "page_size": validated.page_size,
+                "has_next": has_next,
+            }
+
+        # Requirement names are matched case-insensitively, so their order and case do not split the cache.
+        params = validated.model_dump(mode="json")
+        params["requirements"] = sorted({name.lower() for name in validated.requirements})
+        return search_cache.respond(request, params, build)
@@ -0,0 +1,39 @@
+import os
+
+from django.http import JsonResponse
+from pydantic import ValidationError
+from rest_framework.views import APIView
+
+from core.schemas import VacancyStatsParams
+from core.services import STATS, ResponseCache, stats_refreshed_at, vacancy_stats
+
+# Rollups change only when the refresh task runs, so clients and proxies may reuse responses.
+VACANCY_STATS_CACHE_SECONDS = int(os.getenv("VACANCY_STATS_CACHE_SECONDS", "300"))
+
+stats_cache = ResponseCache("stats", [STATS], public=True, max_age=VACANCY_STATS_CACHE_SECONDS)
+
+
+class VacancyStatsAPIView(APIView):
+    """
+    Read-only statistics over the daily rollups: vacancy counts, salary percentiles
+    and top key requirements per category (or per subcategory of `category`).
+    """
+
+    def get(self, request, *args, **kwargs):
+        params = {key: value for key, value in request.query_params.items() if value != ""}
+        try:
+            validated = VacancyStatsParams(**params)
+        except ValidationError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        def build():
+            refreshed_at = stats_refreshed_at()
+            return {
+                "date_from": validated.date_from.isoformat(),
+                "date_to": validated.date_to.isoformat(),
+                "refreshed_at": refreshed_at.isoformat() if refreshed_at else None,
+                **vacancy_stats(validated),
+            }
+
+        # Defaults are resolved by validation, so "no dates" and today's explicit window share an entry.
+        return stats_cache.respond(request, validated.model_dump(mode="json"), build)
@@ -0,0 +1,28 @@
+from django.db.models import Prefetch
+from rest_framework.views import APIView
+
+from core.models import JobCategory, JobSubcategory
+from core.services import TAXONOMY, ResponseCache
+
+taxonomy_cache = ResponseCache("taxonomy", [TAXONOMY])
+
+
+class TaxonomyAPIView(APIView):
+    """Job categories with their subcategories, as extracted from processed vacancies."""
+
+    def get(self, request, *args, **kwargs):
+        def build():
+            categories = JobCategory.objects.order_by('name').prefetch_related(
+                Prefetch('subcategories', queryset=JobSubcategory.objects.order_by('name'))
+            )
+            return {
+                "categories": [
+                    {
+                        "name": category.name,
+                        "subcategories": [subcategory.name for subcategory in category.subcategories.all()],
+                    }
+                    for category in categories
+                ]
+            }
+
+        return taxonomy_cache.respond(request, {}, build)
@@ -5,9 +5,17 @@ from django.http import JsonResponse
 from rest_framework.views import APIView
 from pydantic import ValidationError
 from core.models import Vacancy
-from core.schemas import VacancyInput
-from core.services import VacancyDuplicateDetector
-from core.utils import send_debug_telegram
+from core.schemas import VacancyInput, VacancyBulkInput
+from core.services import (
+    NEW_AREA_ID,
+    content_fingerprint,
+    create_areas,
+    existing_area_ids,
+    get_duplicate_index,
+    get_vacancy_text,
+    ingest_vacancies,
+)
+from core.utils import TELEGRAM_DEBUG, send_debug_telegram
 
 
 class VacancyCreateAPIView(APIView):
@@ -21,21 +29,31 @@ class VacancyCreateAPIView(APIView):
         if len(validated_data.text) < int(VACANCY_MIN_LENGTH):
             return JsonResponse({"error": "Vacancy is too small"}, status=400)
 
-        existing_vacancies_texts = list(Vacancy.objects.values_list('text', flat=True))
-        detector = VacancyDuplicateDetector(threshold=0.85, initial_vacancies=existing_vacancies_texts)
+        area_id = None
+        if validated_data.area:
+            area_id = existing_area_ids([validated_data.area]).get(validated_data.area, NEW_AREA_ID)
 
-        is_dup, sim, orig = detector.is_duplicate(validated_data.text)
+        duplicate_index = get_duplicate_index()
+
+        is_dup, sim, duplicate_id = duplicate_index.is_duplicate(validated_data.text, area_id=area_id)
         if is_dup:
-            send_debug_telegram(f"#duplicate\nVacancy is duplicate with similarity {sim:.2f}.\n\nDuplicate text:\n{validated_data.text}\n\nOriginal vacancy:\n{orig}")
+            if TELEGRAM_DEBUG:
+                orig = get_vacancy_text(duplicate_id)
+                send_debug_telegram(f"#duplicate\nVacancy is duplicate with similarity {sim:.2f}.\n\nDuplicate text:\n{validated_data.text}\n\nOriginal vacancy:\n{orig}")
             return JsonResponse(
-                {"error": f"Вакансия уже существует (дубликат). Сходство: {sim:.2f}"},
+                {"error": f"Вакансия уже существует (дубликат). Сходство: {sim:.2f}", "duplicate_of": duplicate_id},
                 status=400
             )
 
+        if validated_data.area:
+            area_id = create_areas([validated_data.area])[validated_data.area]
         vacancy = Vacancy.objects.create(
             text=validated_data.text,
-            source=validated_data.source or ""
+            source=validated_data.source or "",
+            area_id=area_id,
+            content_hash=content_fingerprint(validated_data.text)
         )
+        duplicate_index.add(vacancy.id, vacancy.text, vacancy.created_at, vacancy.area_id)
 
         return JsonResponse({
             "id": vacancy.id,
@@ -43,3 +61,19 @@ class VacancyCreateAPIView(APIView):
             "source": vacancy.source,
             "message": "Vacancy created. It will be processed later in a batch with ChatGPT."
         }, status=201)
+
+
+class VacancyBulkCreateAPIView(APIView):
+    def post(self, request, *args, **kwargs):
+        try:
+            validated_data = VacancyBulkInput(**request.data)
+        except (ValidationError, json.JSONDecodeError) as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        results = ingest_vacancies(validated_data.vacancies)
+
+        return JsonResponse({
+            "results": results,
+            "accepted": sum(1 for result in results if result["status"] == "accepted"),
+            "message": "Accepted vacancies will be processed later in a batch with ChatGPT."
+        }, status=200)
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import VacancyAnalysis
+from core.services import analysis_numbers
+from core.services.persistence import NUMERIC_FIELDS
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills the numeric salary and experience columns of existing analyses from their text fields, "
+        "in id-ordered batches. Rerun after changing VACANCY_CURRENCY_RATES or VACANCY_BASE_CURRENCY."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--start-id", type=int, default=0, help="Resume after this analysis id.")
+
+    def handle(self, *args, **options):
+        last_id = options["start_id"]
+        updated = 0
+        while True:
+            # Keyset pagination over the primary key: every batch is one short range scan,
+            # and each batch commits on its own, so locks stay short on a large table.
+            batch = list(
+                VacancyAnalysis.objects
+                .filter(id__gt=last_id)
+                .order_by('id')
+                .only('id', 'salary_range_min', 'salary_range_max', 'salary_currency', 'experience_years_required')
+                [:options["batch_size"]]
+            )
+            if not batch:
+                break
+            for analysis in batch:
+                for name, value in analysis_numbers(
+                    analysis.salary_range_min,
+                    analysis.salary_range_max,
+                    analysis.salary_currency,
+                    analysis.experience_years_required,
+                ).items():
+                    setattr(analysis, name, value)
+            with transaction.atomic():
+                VacancyAnalysis.objects.bulk_update(batch, NUMERIC_FIELDS)
+            last_id = batch[-1].id
+            updated += len(batch)
+            self.stdout.write(f"Updated {updated} analyses, last id {last_id}.")
+        self.stdout.write(self.style.SUCCESS(f"Done: {updated} analyses."))
@@ -0,0 +1,27 @@
+import os
+import socket
+
+from django.core.management.base import BaseCommand
+
+from core.services import IngestConsumer
+
+
+class Command(BaseCommand):
+    help = (
+        "Consumes vacancies queued by POST /api/vacancies/ingest/: dedupes and inserts them "
+        "in micro-batches and records each outcome for the status endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=int(os.getenv("VACANCY_INGEST_BATCH_SIZE", "100")),
+            help="Most vacancies per duplicate check and bulk insert.",
+        )
+        parser.add_argument("--block-ms", type=int, default=1000, help="How long one read waits for new messages.")
+        parser.add_argument("--name", default=f"{socket.gethostname()}-{os.getpid()}", help="Consumer name in the group.")
+        parser.add_argument("--once", action="store_true", help="Exit once the stream is drained.")
+
+    def handle(self, *args, **options):
+        consumer = IngestConsumer(options["name"], batch_size=options["batch_size"], block_ms=options["block_ms"])
+        handled = consumer.run(once=options["once"])
+        self.stdout.write(f"Ingested {handled} queued vacancies.")
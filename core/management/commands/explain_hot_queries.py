@@ -0,0 +1,157 @@
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from core.models import Area, JobCategory, JobSubcategory, Vacancy, VacancyAnalysis
+from core.schemas import VacancySearchParams
+from core.services import analysis_numbers, claimable_vacancies, feed_queryset, search_queryset
+from core.services.feed import encode_cursor
+from core.services.normalization import base_amount
+
+EXPLAIN_SOURCE = "explain"
+WORK_FORMATS = ["remote", "on-site", "hybrid"]
+MIN_ROWS = 10000
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs EXPLAIN ANALYZE on the hot queries (claim queue, feed, search) and checks that each "
+        "uses its index. By default seeds a synthetic dataset inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=50000, help="Vacancies to seed; 0 uses the existing data.")
+        parser.add_argument("--pending-ratio", type=float, default=0.02, help="Share of seeded vacancies left unprocessed.")
+        parser.add_argument("--days", type=int, default=90, help="Seeded vacancies are spread over this many days.")
+        parser.add_argument("--random-seed", type=int, default=0)
+        parser.add_argument("--keep", action="store_true", help="Commit the seeded rows instead of rolling back.")
+        parser.add_argument("--strict", action="store_true", help="Fail when a query does not use its index.")
+        parser.add_argument("--verbose-plans", action="store_true", help="Print full plans, not only the summary.")
+
+    def handle(self, *args, **options):
+        missing = []
+        with transaction.atomic():
+            if options["seed"]:
+                self.seed(options)
+            with connection.cursor() as cursor:
+                # Fresh statistics, or the planner judges the seeded tables by their old size.
+                cursor.execute("ANALYZE core_vacancy")
+                cursor.execute("ANALYZE core_vacancyanalysis")
+            if Vacancy.objects.count() < MIN_ROWS:
+                # On a handful of rows a sequential scan is the right plan, so the checks say nothing.
+                self.stdout.write(self.style.WARNING(f"Fewer than {MIN_ROWS} vacancies; seed more for meaningful plans."))
+            for name, queryset, index in self.hot_queries():
+                plan = queryset.explain(analyze=True, buffers=True)
+                timing = next((line.strip() for line in plan.splitlines() if line.startswith("Execution Time")), "")
+                if index is None:
+                    status = "-"
+                elif index in plan:
+                    status = f"uses {index}"
+                else:
+                    status = f"MISSING {index}"
+                    missing.append(name)
+                self.stdout.write(f"{name:<28} {timing:<32} {status}")
+                if options["verbose_plans"] or (index is not None and index not in plan):
+                    self.stdout.write(plan + "\n")
+            if not options["keep"]:
+                transaction.set_rollback(True)
+
+        if missing:
+            message = f"Queries not using their index: {', '.join(missing)}"
+            if options["strict"]:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS("All hot queries use their indexes."))
+
+    def seed(self, options):
+        rng = random.Random(options["random_seed"])
+        count = options["seed"]
+        Area.objects.bulk_create([Area(name=f"Explain area {number}") for number in range(20)], ignore_conflicts=True)
+        areas = list(Area.objects.filter(name__startswith="Explain area "))
+        JobCategory.objects.bulk_create(
+            [JobCategory(name=f"Explain category {number}") for number in range(12)], ignore_conflicts=True,
+        )
+        categories = list(JobCategory.objects.filter(name__startswith="Explain category "))
+        JobSubcategory.objects.bulk_create([
+            JobSubcategory(category=category, name=f"Subcategory {number}")
+            for category in categories for number in range(4)
+        ], ignore_conflicts=True)
+        subcategories = {}
+        for subcategory in JobSubcategory.objects.filter(category__in=categories):
+            subcategories.setdefault(subcategory.category_id, []).append(subcategory)
+
+        vocabulary = [f"слово{number}" for number in range(5000)]
+        for start in range(0, count, 5000):
+            size = min(5000, count - start)
+            vacancies = Vacancy.objects.bulk_create([
+                Vacancy(
+                    text="Требования: " + " ".join(rng.choices(vocabulary, k=40)),
+                    source=EXPLAIN_SOURCE,
+                    area=rng.choice(areas),
+                    is_processed=rng.random() >= options["pending_ratio"],
+                )
+                for _ in range(size)
+            ])
+            analyses = []
+            for vacancy in vacancies:
+                if not vacancy.is_processed:
+                    continue
+                category = rng.choice(categories)
+                salary_min = rng.randrange(30, 500) * 1000
+                analyses.append(VacancyAnalysis(
+                    vacancy=vacancy,
+                    job_category=category,
+                    job_subcategory=rng.choice(subcategories[category.id]),
+                    work_format=rng.choice(WORK_FORMATS),
+                    salary_range_min=str(salary_min),
+                    salary_range_max=str(salary_min * 2),
+                    salary_currency="RUB",
+                    experience_years_required=str(rng.randrange(0, 8)),
+                    **analysis_numbers(str(salary_min), str(salary_min * 2), "RUB", str(rng.randrange(0, 8))),
+                ))
+            VacancyAnalysis.objects.bulk_create(analyses)
+        with connection.cursor() as cursor:
+            # created_at is set by auto_now_add, so the spread over days is applied afterwards.
+            cursor.execute(
+                "UPDATE core_vacancy SET created_at = now() - random() * %s * interval '1 day' WHERE source = %s",
+                [options["days"], EXPLAIN_SOURCE],
+            )
+            cursor.execute(
+                "UPDATE core_vacancy SET processed_at = created_at + random() * interval '10 minutes', is_valid = true "
+                "WHERE source = %s AND is_processed",
+                [EXPLAIN_SOURCE],
+            )
+        self.stdout.write(f"Seeded {count} vacancies.")
+
+    def hot_queries(self):
+        """(name, queryset, index the plan is expected to use, or None when it depends on the data)."""
+        now = timezone.now()
+        processed = Vacancy.objects.filter(processed_at__isnull=False).order_by('processed_at', 'id')
+        middle = processed.values_list('processed_at', 'id')[max(processed.count() // 2 - 1, 0):][:1]
+        cursor = encode_cursor(*middle[0]) if middle else None
+        area = Vacancy.objects.filter(area__isnull=False).values_list('area_id', flat=True).first()
+        category = VacancyAnalysis.objects.values_list('job_category__name', flat=True).first()
+        word = (Vacancy.objects.values_list('text', flat=True).first() or "python").split()[-1]
+        return [
+            ("claim", claimable_vacancies(now).select_for_update(skip_locked=True).values('id')[:20],
+             "core_vacancy_pending_idx"),
+            ("feed, first page", feed_queryset()[:100], "core_vacancy_feed_idx"),
+            ("feed, deep cursor", feed_queryset(cursor)[:100], "core_vacancy_feed_idx"),
+            ("search, newest", search_queryset(VacancySearchParams())[:21], None),
+            ("search, category", search_queryset(VacancySearchParams(category=category))[:21], None),
+            ("search, full text", search_queryset(VacancySearchParams(q=word))[:21], "core_vacancy_search_gin"),
+            # Newest-first pages walk the created_at index and filter, which is cheaper while matches are common.
+            ("search, salary range", search_queryset(VacancySearchParams(salary_min=200000, salary_max=250000))[:21],
+             None),
+            ("salary range, bounds only", VacancyAnalysis.objects.filter(
+                salary_high_base__gte=base_amount(950000, None), salary_low_base__lte=base_amount(1000000, None),
+            ).values('salary_low_base', 'salary_high_base'), "core_analysis_salary_idx"),
+            ("area, last 7 days", VacancyAnalysis.objects.filter(
+                vacancy__area_id=area, vacancy__created_at__gte=now - timedelta(days=7),
+            ).values('job_category').annotate(total=Count('id')), "core_vacancy_area_date_idx"),
+        ]
@@ -0,0 +1,80 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.models import Vacancy
+from core.services import (
+    ExtractionCache,
+    ExtractionError,
+    OpenAIBatchBackend,
+    build_batches,
+    claim_vacancies,
+    release_vacancies,
+    save_vacancy_analyses,
+)
+from core.utils import get_redis
+
+BATCH_JOBS_KEY = "llm:batch:jobs"
+
+
+class Command(BaseCommand):
+    help = (
+        "Extracts unprocessed vacancies through the OpenAI Batch API. "
+        "`submit` claims vacancies and creates a job, `collect` saves the results of finished jobs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["submit", "collect"])
+        parser.add_argument("--limit", type=int, default=10000, help="Vacancies to submit.")
+        parser.add_argument("--batch-size", type=int, default=20, help="Vacancies per request.")
+        parser.add_argument(
+            "--lease-hours", type=float, default=26,
+            help="How long submitted vacancies stay claimed; must exceed the completion window.",
+        )
+
+    def handle(self, *args, **options):
+        backend = OpenAIBatchBackend()
+        if options["action"] == "submit":
+            self.submit(backend, options)
+        else:
+            self.collect(backend)
+
+    def submit(self, backend, options):
+        vacancies = claim_vacancies(options["limit"], lease_seconds=int(options["lease_hours"] * 3600))
+        batches, _ = build_batches(vacancies, options["batch_size"], max_wait_seconds=0)
+        if not batches:
+            self.stdout.write("No unprocessed vacancies.")
+            return
+        try:
+            job_id = backend.submit(batches)
+        except Exception:
+            release_vacancies(vacancies)
+            raise
+        # Positions of the requests map back to vacancy ids when the job is collected.
+        get_redis().hset(BATCH_JOBS_KEY, job_id, json.dumps([[vacancy.id for vacancy in batch] for batch in batches]))
+        self.stdout.write(f"Submitted job {job_id} with {len(vacancies)} vacancies in {len(batches)} requests.")
+
+    def collect(self, backend):
+        redis = get_redis()
+        extraction_cache = ExtractionCache(model=backend.model, prompt=backend.prompt)
+        for job_id, batches in redis.hgetall(BATCH_JOBS_KEY).items():
+            job_id = job_id.decode()
+            status, results = backend.collect(job_id)
+            if results is None:
+                self.stdout.write(f"Job {job_id} is {status}.")
+                continue
+
+            processed = 0
+            for position, ids in enumerate(json.loads(batches)):
+                batch = list(Vacancy.objects.filter(id__in=ids, is_processed=False))
+                items = results.get(position, ExtractionError("Missing from the job output."))
+                if isinstance(items, ExtractionError):
+                    self.stderr.write(f"Job {job_id}, request {position}: {items}")
+                elif batch:
+                    analyses, not_vacancies = save_vacancy_analyses(batch, items)
+                    extraction_cache.set_many(batch, items)
+                    processed += len(analyses) + len(not_vacancies)
+                # Vacancies without a result go back to the regular queue.
+                release_vacancies(batch)
+            redis.hdel(BATCH_JOBS_KEY, job_id)
+            self.stdout.write(f"Job {job_id} is {status}, saved {processed} vacancies.")
@@ -0,0 +1,94 @@
+import random
+import time
+import uuid
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Vacancy
+from core.schemas import VacancyInput
+from core.services import StubBackend, ingest_vacancies, rebuild_duplicate_index
+from core.tasks import process_vacancies
+
+LOADTEST_SOURCE = "loadtest"
+
+
+def synthetic_texts(count, seed, run_id):
+    """Random word salads: long enough to pass VACANCY_MIN_LENGTH and far from each other for TF-IDF."""
+    rng = random.Random(seed)
+    letters = "абвгдежзиклмнопрстуфхцчшэюя"
+    vocabulary = ["".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(3000)]
+    return [
+        f"Вакансия {run_id}-{number}. Требования: " + " ".join(rng.choices(vocabulary, k=80))
+        for number in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures ingestion -> claim -> extract -> persist throughput offline, with the stub "
+        "extraction backend instead of a paid API. Meant for a development database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--vacancies", type=int, default=1000)
+        parser.add_argument("--ingest-batch", type=int, default=100, help="Vacancies per ingest_vacancies call.")
+        parser.add_argument("--max-batches", type=int, default=10, help="Extraction batches per processing run.")
+        parser.add_argument("--latency", type=float, default=1.0, help="Stub latency per request, seconds.")
+        parser.add_argument("--item-latency", type=float, default=0.05, help="Stub latency per vacancy, seconds.")
+        parser.add_argument("--error-rate", type=float, default=0.0, help="Share of failed stub requests.")
+        parser.add_argument("--item-error-rate", type=float, default=0.0, help="Share of malformed stub items.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--keep", action="store_true", help="Keep the generated vacancies.")
+
+    def handle(self, *args, **options):
+        # Claiming takes the oldest unprocessed rows, so real ones would get stub results.
+        if Vacancy.objects.filter(is_processed=False).exclude(source=LOADTEST_SOURCE).exists():
+            raise CommandError("There are unprocessed vacancies that are not from a load test; use a separate database.")
+
+        run_id = uuid.uuid4().hex[:8]
+        texts = synthetic_texts(options["vacancies"], options["seed"], run_id)
+        backend = StubBackend(
+            latency=options["latency"],
+            item_latency=options["item_latency"],
+            error_rate=options["error_rate"],
+            item_error_rate=options["item_error_rate"],
+            seed=options["seed"],
+        )
+
+        started = time.perf_counter()
+        statuses = Counter()
+        for offset in range(0, len(texts), options["ingest_batch"]):
+            items = [VacancyInput(text=text, source=LOADTEST_SOURCE) for text in texts[offset:offset + options["ingest_batch"]]]
+            statuses.update(result["status"] for result in ingest_vacancies(items))
+        ingested = time.perf_counter()
+        self.report("Ingestion", len(texts), ingested - started)
+        self.stdout.write(", ".join(f"{status}: {count}" for status, count in sorted(statuses.items())))
+
+        processed = 0
+        runs = 0
+        idle_runs = 0
+        # Failed vacancies are released and retried; give up after a few runs without progress.
+        while idle_runs < 3 and Vacancy.objects.filter(source=LOADTEST_SOURCE, is_processed=False).exists():
+            run_processed = process_vacancies(backend, max_batches=options["max_batches"], max_wait_seconds=0)
+            runs += 1
+            idle_runs = 0 if run_processed else idle_runs + 1
+            processed += run_processed
+            if runs == 1:
+                self.stdout.write(f"First processing run finished after {time.perf_counter() - ingested:.2f}s.")
+        finished = time.perf_counter()
+        self.report(f"Extraction ({runs} runs)", processed, finished - ingested)
+        self.report("End to end", processed, finished - started)
+
+        left = Vacancy.objects.filter(source=LOADTEST_SOURCE, is_processed=False).count()
+        if left:
+            self.stdout.write(f"{left} vacancies left unprocessed.")
+
+        if not options["keep"]:
+            Vacancy.objects.filter(source=LOADTEST_SOURCE).delete()
+            # Drop the deleted rows from the duplicate index as well.
+            rebuild_duplicate_index()
+
+    def report(self, stage, count, seconds):
+        rate = count / seconds if seconds else 0
+        self.stdout.write(f"{stage}: {count} vacancies in {seconds:.2f}s, {rate:.1f}/s.")
@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from core.services import rebuild_stats_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the daily stats rollups of a date range from the base tables, e.g. after "
+        "vacancies were deleted or the salary buckets changed. New data is picked up by the refresh task."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=90, help="Rebuild this many days up to today.")
+        parser.add_argument("--date-from", help="First day, YYYY-MM-DD; overrides --days.")
+        parser.add_argument("--date-to", help="Last day, YYYY-MM-DD; defaults to today.")
+
+    def handle(self, *args, **options):
+        date_to = parse_date(options["date_to"]) if options["date_to"] else timezone.localdate()
+        if options["date_from"]:
+            date_from = parse_date(options["date_from"])
+        else:
+            date_from = date_to - timedelta(days=options["days"] - 1)
+        if date_from is None or date_to is None or date_from > date_to:
+            raise CommandError("Invalid date range.")
+        rebuild_stats_rollups(date_from, date_to)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats rollups from {date_from} to {date_to}."))
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.6 on 2025-03-20 10:12
+
+import hashlib
+import re
+
+from django.db import migrations, models
+
+# Frozen copy of core.services.fingerprint as of this migration, so later changes to the
+# service do not change what this migration computes.
+URL_RE = re.compile(r"(https?://\S+|www\.\S+|t\.me/\S+|@\w+)", re.IGNORECASE)
+NON_WORD_RE = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def content_fingerprint(text):
+    text = URL_RE.sub(" ", text.lower())
+    normalized = " ".join(NON_WORD_RE.sub(" ", text).split())
+    digest = hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def backfill_content_hash(apps, schema_editor):
+    Vacancy = apps.get_model('core', 'Vacancy')
+    batch = []
+    for vacancy in Vacancy.objects.only('id', 'text').order_by('id').iterator(chunk_size=1000):
+        vacancy.content_hash = content_fingerprint(vacancy.text)
+        batch.append(vacancy)
+        if len(batch) >= 1000:
+            Vacancy.objects.bulk_update(batch, ['content_hash'])
+            batch = []
+    if batch:
+        Vacancy.objects.bulk_update(batch, ['content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_jobcategory_remove_resume_keywords_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vacancy',
+            name='content_hash',
+            field=models.BigIntegerField(blank=True, db_index=True, null=True, verbose_name='Content Hash'),
+        ),
+        migrations.AddField(
+            model_name='vacancy',
+            name='is_valid',
+            field=models.BooleanField(default=False, verbose_name='Is Valid'),
+        ),
+        migrations.RunPython(backfill_content_hash, migrations.RunPython.noop),
+    ]
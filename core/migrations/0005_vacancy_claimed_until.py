@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2025-03-24 09:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_vacancy_content_hash_vacancy_is_valid'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vacancy',
+            name='claimed_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Claimed Until'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.6 on 2025-03-26 10:12
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# The trigger fires only when `text` is written, so status updates stay cheap.
+CREATE_TRIGGER = """
+CREATE FUNCTION core_vacancy_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := to_tsvector('pg_catalog.russian', coalesce(NEW.text, ''));
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_vacancy_search_vector_trigger
+BEFORE INSERT OR UPDATE OF text ON core_vacancy
+FOR EACH ROW EXECUTE FUNCTION core_vacancy_search_vector_update();
+
+UPDATE core_vacancy SET search_vector = to_tsvector('pg_catalog.russian', coalesce(text, ''));
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS core_vacancy_search_vector_trigger ON core_vacancy;
+DROP FUNCTION IF EXISTS core_vacancy_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_vacancy_claimed_until'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vacancy',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Search Vector'),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+        # Built after the backfill, which is much faster than updating a GIN index row by row.
+        migrations.AddIndex(
+            model_name='vacancy',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='core_vacancy_search_gin'),
+        ),
+    ]
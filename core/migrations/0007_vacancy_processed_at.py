@@ -0,0 +1,29 @@
+# Generated by Django 5.1.6 on 2025-03-27 14:05
+
+from django.db import migrations, models
+
+
+def backfill_processed_at(apps, schema_editor):
+    # The real processing time is unknown for existing rows; creation time keeps the feed order close.
+    Vacancy = apps.get_model('core', 'Vacancy')
+    Vacancy.objects.filter(is_processed=True, processed_at__isnull=True).update(processed_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_vacancy_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vacancy',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Processed At'),
+        ),
+        migrations.RunPython(backfill_processed_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='vacancy',
+            index=models.Index(fields=['processed_at', 'id'], name='core_vacancy_feed_idx'),
+        ),
+    ]
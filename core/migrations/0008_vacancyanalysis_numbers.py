@@ -0,0 +1,46 @@
+# Generated by Django 5.1.6 on 2025-03-28 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_vacancy_processed_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vacancyanalysis',
+            name='experience_years',
+            field=models.DecimalField(blank=True, decimal_places=1, max_digits=3, null=True),
+        ),
+        migrations.AddField(
+            model_name='vacancyanalysis',
+            name='salary_high_base',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='vacancyanalysis',
+            name='salary_low_base',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='vacancyanalysis',
+            name='salary_max_minor',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='vacancyanalysis',
+            name='salary_min_minor',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='vacancyanalysis',
+            index=models.Index(fields=['salary_high_base', 'salary_low_base'], name='core_analysis_salary_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vacancyanalysis',
+            index=models.Index(fields=['experience_years'], name='core_analysis_experience_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2025-03-28 16:40
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Built without locking writes, as core_vacancy is written to while the queue runs.
+    atomic = False
+
+    dependencies = [
+        ('core', '0008_vacancyanalysis_numbers'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='vacancy',
+            index=models.Index(condition=models.Q(('is_processed', False)), fields=['created_at'], name='core_vacancy_pending_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='vacancy',
+            index=models.Index(fields=['area', 'created_at'], name='core_vacancy_area_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='vacancyanalysis',
+            index=models.Index(fields=['job_category', 'job_subcategory', 'vacancy'], name='core_analysis_category_idx'),
+        ),
+    ]
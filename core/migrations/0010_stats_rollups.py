@@ -0,0 +1,59 @@
+# Generated by Django 5.1.6 on 2025-03-29 11:20
+
+import django.contrib.postgres.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_vacancy_pending_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('vacancy_id', models.BigIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyCategoryStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('vacancies', models.IntegerField(default=0)),
+                ('salary_count', models.IntegerField(default=0)),
+                ('salary_sum', models.BigIntegerField(default=0)),
+                ('salary_histogram', django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), default=list, size=None)),
+                ('job_category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='core.jobcategory')),
+                ('job_subcategory', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.jobsubcategory')),
+            ],
+            options={
+                'verbose_name': 'Daily Category Stats',
+                'verbose_name_plural': 'Daily Category Stats',
+                'indexes': [models.Index(fields=['day', 'job_category', 'job_subcategory'], name='core_daily_category_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyRequirementStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('vacancies', models.IntegerField(default=0)),
+                ('job_category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_requirement_stats', to='core.jobcategory')),
+                ('job_subcategory', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.jobsubcategory')),
+                ('requirement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='core.analysiskeyrequirement')),
+            ],
+            options={
+                'verbose_name': 'Daily Requirement Stats',
+                'verbose_name_plural': 'Daily Requirement Stats',
+                'indexes': [models.Index(fields=['day', 'job_category', 'job_subcategory'], name='core_daily_requirement_idx')],
+            },
+        ),
+    ]
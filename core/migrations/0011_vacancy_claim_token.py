@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2025-03-30 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_stats_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vacancy',
+            name='claim_token',
+            field=models.UUIDField(blank=True, null=True, verbose_name='Claim Token'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.6 on 2025-03-31 09:40
+
+from django.db import migrations, models
+
+# Concurrent rebuilds of one day could insert its rows twice; both copies hold the same
+# counts, so the one with the higher id is kept.
+DELETE_DUPLICATES = """
+DELETE FROM core_dailycategorystats a USING core_dailycategorystats b
+WHERE a.id < b.id AND a.day = b.day AND a.job_category_id = b.job_category_id
+    AND a.job_subcategory_id IS NOT DISTINCT FROM b.job_subcategory_id;
+
+DELETE FROM core_dailyrequirementstats a USING core_dailyrequirementstats b
+WHERE a.id < b.id AND a.day = b.day AND a.job_category_id = b.job_category_id
+    AND a.job_subcategory_id IS NOT DISTINCT FROM b.job_subcategory_id
+    AND a.requirement_id = b.requirement_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_vacancy_claim_token'),
+    ]
+
+    operations = [
+        migrations.RunSQL(DELETE_DUPLICATES, migrations.RunSQL.noop),
+        migrations.RemoveIndex(
+            model_name='dailycategorystats',
+            name='core_daily_category_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='dailyrequirementstats',
+            name='core_daily_requirement_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='dailycategorystats',
+            constraint=models.UniqueConstraint(condition=models.Q(('job_subcategory__isnull', False)), fields=('day', 'job_category', 'job_subcategory'), name='core_daily_category_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailycategorystats',
+            constraint=models.UniqueConstraint(condition=models.Q(('job_subcategory__isnull', True)), fields=('day', 'job_category'), name='core_daily_category_no_sub_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyrequirementstats',
+            constraint=models.UniqueConstraint(condition=models.Q(('job_subcategory__isnull', False)), fields=('day', 'job_category', 'job_subcategory', 'requirement'), name='core_daily_requirement_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyrequirementstats',
+            constraint=models.UniqueConstraint(condition=models.Q(('job_subcategory__isnull', True)), fields=('day', 'job_category', 'requirement'), name='core_daily_requirement_no_sub_uniq'),
+        ),
+    ]
@@ -1,3 +1,6 @@
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 class Area(models.Model):
@@ -24,12 +27,30 @@ class Vacancy(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Created At")
     is_processed = models.BooleanField(default=False, verbose_name="Is Processed")
     is_valid = models.BooleanField(default=False, verbose_name="Is Valid")
+    claimed_until = models.DateTimeField(null=True, blank=True, verbose_name="Claimed Until")
+    # Identifies one claim, so a worker whose lease ran out cannot save over the next claimer.
+    claim_token = models.UUIDField(null=True, blank=True, verbose_name="Claim Token")
+    content_hash = models.BigIntegerField(null=True, blank=True, db_index=True, verbose_name="Content Hash")
+    # Set when the analysis is saved; orders the change feed of processed vacancies.
+    processed_at = models.DateTimeField(null=True, blank=True, verbose_name="Processed At")
+    # Russian tsvector of `text`, kept up to date by a database trigger (migration 0006).
+    search_vector = SearchVectorField(null=True, editable=False, verbose_name="Search Vector")
     class Meta:
         verbose_name = "Vacancy"
         verbose_name_plural = "Vacancies"
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['created_at']),
+            GinIndex(fields=['search_vector'], name='core_vacancy_search_gin'),
+            models.Index(fields=['processed_at', 'id'], name='core_vacancy_feed_idx'),
+            # The claim queue: stays as small as the backlog, however many rows are processed.
+            models.Index(
+                fields=['created_at'],
+                condition=models.Q(is_processed=False),
+                name='core_vacancy_pending_idx',
+            ),
+            # Analyses of one area over a date range (matching, stats).
+            models.Index(fields=['area', 'created_at'], name='core_vacancy_area_date_idx'),
         ]
     def __str__(self):
         return f"Vacancy {self.id}"
@@ -89,6 +110,88 @@ class VacancyAnalysis(models.Model):
     salary_range_max = models.CharField(max_length=50, null=True, blank=True)
     salary_currency = models.CharField(max_length=10, null=True, blank=True)
     experience_years_required = models.CharField(max_length=10, null=True, blank=True)
+    # Numbers parsed from the text fields above (core.services.normalization), for indexed
+    # range filters and aggregates. Salaries are integers in minor units; the *_base bounds are
+    # converted to VACANCY_BASE_CURRENCY and fall back to each other for open-ended ranges.
+    salary_min_minor = models.BigIntegerField(null=True, blank=True)
+    salary_max_minor = models.BigIntegerField(null=True, blank=True)
+    salary_low_base = models.BigIntegerField(null=True, blank=True)
+    salary_high_base = models.BigIntegerField(null=True, blank=True)
+    experience_years = models.DecimalField(max_digits=3, decimal_places=1, null=True, blank=True)
     key_requirements = models.ManyToManyField(AnalysisKeyRequirement, blank=True, related_name="vacancies_data")
+    class Meta:
+        indexes = [
+            # Overlap filters compare both bounds; with both in one index they are answered index-only.
+            models.Index(fields=['salary_high_base', 'salary_low_base'], name='core_analysis_salary_idx'),
+            models.Index(fields=['experience_years'], name='core_analysis_experience_idx'),
+            # Category and subcategory filters resolve to vacancy ids without touching the heap.
+            models.Index(fields=['job_category', 'job_subcategory', 'vacancy'], name='core_analysis_category_idx'),
+        ]
     def __str__(self):
         return f"Analysis for Vacancy {self.vacancy.id}"
+
+
+class DailyCategoryStats(models.Model):
+    """Rollup of analysed vacancies created on one day, per category and subcategory."""
+    day = models.DateField()
+    job_category = models.ForeignKey(JobCategory, on_delete=models.CASCADE, related_name='daily_stats')
+    job_subcategory = models.ForeignKey(JobSubcategory, on_delete=models.CASCADE, null=True, blank=True)
+    vacancies = models.IntegerField(default=0)
+    salary_count = models.IntegerField(default=0)
+    # Sum of salary midpoints in minor units of the base currency.
+    salary_sum = models.BigIntegerField(default=0)
+    # Counts per bucket of core.services.stats.SALARY_BUCKETS; days are merged by adding them.
+    salary_histogram = ArrayField(models.IntegerField(), default=list)
+    class Meta:
+        verbose_name = "Daily Category Stats"
+        verbose_name_plural = "Daily Category Stats"
+        # One row per group; NULL subcategories need their own constraint, since NULLs never
+        # collide in a unique index. The constraints' indexes also serve lookups by day.
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'job_category', 'job_subcategory'],
+                condition=models.Q(job_subcategory__isnull=False),
+                name='core_daily_category_uniq',
+            ),
+            models.UniqueConstraint(
+                fields=['day', 'job_category'],
+                condition=models.Q(job_subcategory__isnull=True),
+                name='core_daily_category_no_sub_uniq',
+            ),
+        ]
+    def __str__(self):
+        return f"{self.day} {self.job_category_id}/{self.job_subcategory_id}: {self.vacancies}"
+
+class DailyRequirementStats(models.Model):
+    """Number of analysed vacancies created on one day that list a key requirement."""
+    day = models.DateField()
+    job_category = models.ForeignKey(JobCategory, on_delete=models.CASCADE, related_name='daily_requirement_stats')
+    job_subcategory = models.ForeignKey(JobSubcategory, on_delete=models.CASCADE, null=True, blank=True)
+    requirement = models.ForeignKey(AnalysisKeyRequirement, on_delete=models.CASCADE, related_name='daily_stats')
+    vacancies = models.IntegerField(default=0)
+    class Meta:
+        verbose_name = "Daily Requirement Stats"
+        verbose_name_plural = "Daily Requirement Stats"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'job_category', 'job_subcategory', 'requirement'],
+                condition=models.Q(job_subcategory__isnull=False),
+                name='core_daily_requirement_uniq',
+            ),
+            models.UniqueConstraint(
+                fields=['day', 'job_category', 'requirement'],
+                condition=models.Q(job_subcategory__isnull=True),
+                name='core_daily_requirement_no_sub_uniq',
+            ),
+        ]
+    def __str__(self):
+        return f"{self.day} {self.requirement_id}: {self.vacancies}"
+
+class RollupWatermark(models.Model):
+    """How far (processed_at, vacancy id) a rollup has consumed processed vacancies."""
+    name = models.CharField(max_length=50, unique=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    vacancy_id = models.BigIntegerField(default=0)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+    def __str__(self):
+        return f"{self.name}: {self.processed_at} / {self.vacancy_id}"
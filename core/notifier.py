@@ -0,0 +1,155 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+TELEGRAM_QUEUE_SIZE = int(os.getenv("TELEGRAM_QUEUE_SIZE", "1000"))
+# Telegram allows about 20 messages per minute into one channel or group.
+TELEGRAM_MIN_INTERVAL_SECONDS = float(os.getenv("TELEGRAM_MIN_INTERVAL_SECONDS", "3"))
+TELEGRAM_MAX_RETRIES = 5
+MESSAGE_SEPARATOR = "\n\n"
+
+
+def pack_messages(messages, limit=TELEGRAM_MESSAGE_LIMIT):
+    """
+    Joins messages into as few texts of at most `limit` characters as possible.
+    A single message longer than the limit is split into several texts.
+    """
+    chunks = []
+    current = ""
+    for message in messages:
+        while len(message) > limit:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(message[:limit])
+            message = message[limit:]
+        if not current:
+            current = message
+        elif len(current) + len(MESSAGE_SEPARATOR) + len(message) <= limit:
+            current = f"{current}{MESSAGE_SEPARATOR}{message}"
+        else:
+            chunks.append(current)
+            current = message
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class TelegramNotifier:
+    """
+    Sends messages to a Telegram chat from a background thread.
+
+    `enqueue` never blocks: messages go into a bounded in-memory queue and are
+    dropped with a warning when it is full. The sender thread coalesces whatever
+    is queued into as few messages as the 4096-character limit allows, keeps at
+    least TELEGRAM_MIN_INTERVAL_SECONDS between sends and honours `retry_after`
+    on 429 responses. Connections are reused through one pooled session.
+    """
+
+    def __init__(self, token, chat_id, max_queue=TELEGRAM_QUEUE_SIZE, min_interval=TELEGRAM_MIN_INTERVAL_SECONDS):
+        self.url = f"https://api.telegram.org/bot{token}/sendMessage"
+        self.chat_id = chat_id
+        self.min_interval = min_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._session = None
+        self._last_sent = 0.0
+
+    def _ensure_started(self):
+        # Celery and gunicorn fork workers; each process needs its own thread and session.
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+            self._session = session
+            self._thread = threading.Thread(target=self._run, name="telegram-notifier", daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def enqueue(self, message):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            logger.warning("Telegram queue is full, dropping message.")
+
+    def flush(self, timeout=10.0):
+        """Waits until queued messages are sent, e.g. before the process exits."""
+        if self._pid != os.getpid():
+            return
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.1)
+
+    def _run(self):
+        while True:
+            messages = [self._queue.get()]
+            while True:
+                try:
+                    messages.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                for text in pack_messages(messages):
+                    self._send(text)
+            except Exception as e:
+                logger.error(f"Error sending message to Telegram: {e}")
+            finally:
+                for _ in messages:
+                    self._queue.task_done()
+
+    def _send(self, text):
+        for attempt in range(TELEGRAM_MAX_RETRIES):
+            wait = self._last_sent + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_sent = time.monotonic()
+            try:
+                response = self._session.post(self.url, data={"chat_id": self.chat_id, "text": text}, timeout=10)
+            except requests.RequestException as e:
+                logger.error(f"Error sending message to Telegram: {e}")
+                time.sleep(min(2 ** attempt, 60))
+                continue
+            if response.status_code == 200:
+                return
+            if response.status_code == 429:
+                try:
+                    retry_after = response.json()["parameters"]["retry_after"]
+                except (ValueError, KeyError, TypeError):
+                    retry_after = 2 ** attempt
+                logger.warning(f"Telegram rate limit hit, retrying in {retry_after}s.")
+                time.sleep(retry_after)
+                continue
+            if response.status_code >= 500:
+                time.sleep(min(2 ** attempt, 60))
+                continue
+            logger.error(f"Error sending to Telegram, status: {response.status_code}, response: {response.text}")
+            return
+        logger.error("Giving up sending message to Telegram after retries.")
+
+
+_notifier = None
+
+
+def get_notifier(token, chat_id):
+    global _notifier
+    if _notifier is None:
+        _notifier = TelegramNotifier(token, chat_id)
+        atexit.register(_notifier.flush)
+    return _notifier
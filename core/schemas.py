@@ -1,5 +1,64 @@
-from pydantic import BaseModel, Field
+import os
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+from pydantic import BaseModel, Field, model_validator
 
 class VacancyInput(BaseModel):
     text: str = Field(..., description="Vacancy text")
     source: str = Field(..., description="Source of the vacancy")
+    area: str | None = Field(None, max_length=100, description="Area name, used to shard duplicate checks")
+
+class VacancyBulkInput(BaseModel):
+    vacancies: list[VacancyInput] = Field(
+        ...,
+        min_length=1,
+        max_length=int(os.getenv("VACANCY_BULK_MAX_ITEMS", "500")),
+        description="Vacancies to ingest in one request",
+    )
+
+class VacancySearchParams(BaseModel):
+    q: str | None = Field(None, max_length=200, description="Full-text query, web search syntax")
+    category: str | None = Field(None, description="Job category name")
+    subcategory: str | None = Field(None, description="Job subcategory name")
+    work_format: str | None = Field(None, description="remote, on-site, hybrid")
+    employment_type: str | None = Field(None, description="Full-time, Part-time, Contract")
+    currency: str | None = Field(None, description="Salary currency, e.g. RUB")
+    salary_min: int | None = Field(None, ge=0, description="Lowest acceptable salary")
+    salary_max: int | None = Field(None, ge=0, description="Highest acceptable salary")
+    experience_max: Decimal | None = Field(None, ge=0, le=60, description="Most years of required experience")
+    requirements: list[str] = Field(default_factory=list, description="Key requirements, all must match")
+    page: int = Field(1, ge=1)
+    page_size: int = Field(20, ge=1, le=int(os.getenv("VACANCY_SEARCH_MAX_PAGE_SIZE", "100")))
+
+class VacancyFeedParams(BaseModel):
+    cursor: str | None = Field(None, description="next_cursor of the previous page")
+    limit: int = Field(100, ge=1, le=int(os.getenv("VACANCY_FEED_MAX_LIMIT", "500")))
+    wait: float = Field(
+        0, ge=0, le=float(os.getenv("VACANCY_FEED_MAX_WAIT_SECONDS", "30")),
+        description="Seconds to wait for new vacancies when there are none (long poll)",
+    )
+
+class ResumeMatchParams(BaseModel):
+    k: int = Field(20, ge=1, le=int(os.getenv("VACANCY_MATCH_MAX_K", "100")), description="Number of matches")
+    category: str | None = Field(None, description="Job category name")
+    area: str | None = Field(None, description="Area name")
+    work_format: str | None = Field(None, description="remote, on-site, hybrid")
+
+class VacancyStatsParams(BaseModel):
+    date_from: date | None = Field(None, description="First day, defaults to 29 days before date_to")
+    date_to: date | None = Field(None, description="Last day, defaults to today")
+    category: str | None = Field(None, description="Job category name; results are then per subcategory")
+    subcategory: str | None = Field(None, description="Job subcategory name")
+    top: int = Field(10, ge=1, le=50, description="Key requirements per entry")
+
+    @model_validator(mode="after")
+    def check_window(self):
+        self.date_to = self.date_to or timezone.localdate()
+        self.date_from = self.date_from or self.date_to - timedelta(days=29)
+        if self.date_from > self.date_to:
+            raise ValueError("date_from must not be after date_to")
+        if (self.date_to - self.date_from).days >= int(os.getenv("VACANCY_STATS_MAX_DAYS", "366")):
+            raise ValueError("The date window is too long")
+        return self
@@ -1 +1,41 @@
-from .duplicate_detector import VacancyDuplicateDetector
\ No newline at end of file
+from .duplicate_detector import VacancyDuplicateDetector
+from .fingerprint import content_fingerprint, normalize_text
+from .duplicate_index import DuplicateIndex, get_duplicate_index, get_vacancy_text, rebuild_duplicate_index
+from .ingest import NEW_AREA_ID, create_areas, existing_area_ids, ingest_vacancies
+from .vacancy_queue import (
+    build_batches,
+    claim_vacancies,
+    claimable_vacancies,
+    estimate_tokens,
+    lock_leased,
+    release_vacancies,
+    renew_lease,
+)
+from .taxonomy import TaxonomyCache, bump_taxonomy_version, get_taxonomy_cache
+from .persistence import save_vacancy_analyses
+from .llm_cache import ExtractionCache
+from .stream_parser import StreamItemError, VacancyStreamParser
+from .llm_client import CircuitBreaker, CircuitOpenError, RateLimiter, ResilientLLMClient
+from .extraction import (
+    ExtractionBackend,
+    ExtractionError,
+    OpenAIBatchBackend,
+    OpenAIChatBackend,
+    StubBackend,
+    get_extraction_backend,
+)
+from .normalization import analysis_numbers, normalize_currency
+from .search import search_queryset, search_vacancies
+from .feed import InvalidCursor, feed_page, feed_queryset, publish_processed, wait_for_feed
+from .matching import (
+    MatchCache,
+    VacancyMatchIndex,
+    bump_match_generation,
+    get_match_generation,
+    get_match_index,
+    match_vacancies,
+    rebuild_match_index,
+)
+from .stats import rebuild_stats_rollups, refresh_stats_rollups, stats_refreshed_at, vacancy_stats
+from .response_cache import STATS, TAXONOMY, VACANCIES, ResponseCache, bump_response_generation
+from .ingest_queue import IngestConsumer, enqueue_vacancy, get_ingest_status
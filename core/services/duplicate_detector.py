@@ -1,48 +1,218 @@
 # core/duplicate_detector.py
 import os
 
+import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from scipy.sparse import vstack
 import nltk
 from nltk.corpus import stopwords
 
+from .lsh import MinHashLSH
+from .sparse_buffer import GrowableCSRMatrix
+
 nltk.download("stopwords")
 russian_stopwords = stopwords.words("russian")
 
+# LSH pre-filter. More bands / fewer rows raise recall (and the candidate set size),
+# fewer bands / more rows make the filter stricter and faster.
+DUPLICATE_LSH_ENABLED = os.getenv("VACANCY_DUPLICATE_LSH", "1").lower() in ("true", "1", "yes")
+DUPLICATE_LSH_BANDS = int(os.getenv("VACANCY_DUPLICATE_LSH_BANDS", "32"))
+DUPLICATE_LSH_ROWS = int(os.getenv("VACANCY_DUPLICATE_LSH_ROWS", "4"))
+DUPLICATE_SHINGLE_SIZE = int(os.getenv("VACANCY_DUPLICATE_SHINGLE_SIZE", "3"))
+
+
+def fit_vectorizer(vectorizer, texts):
+    """
+    Fits `vectorizer` on `texts`. Returns False instead of raising when no term is left,
+    e.g. every text is stopwords or 1-char tokens: such texts can only match by hash.
+    """
+    try:
+        vectorizer.fit(texts)
+    except ValueError as e:
+        if "empty vocabulary" not in str(e):
+            raise
+        return False
+    return True
+
+
 class VacancyDuplicateDetector:
-    def __init__(self, threshold=float(os.getenv("VACANCY_SIMILARITY_THRESHOLD")), initial_vacancies=None):
+    def __init__(
+        self,
+        threshold=float(os.getenv("VACANCY_SIMILARITY_THRESHOLD")),
+        initial_vacancies=None,
+        use_lsh=DUPLICATE_LSH_ENABLED,
+        lsh_bands=DUPLICATE_LSH_BANDS,
+        lsh_rows=DUPLICATE_LSH_ROWS,
+        shingle_size=DUPLICATE_SHINGLE_SIZE,
+        vectorizer=None,
+    ):
         self.threshold = threshold
         if initial_vacancies is None:
             initial_vacancies = []
-        self.vacancies = initial_vacancies.copy()
-        self.vectorizer = TfidfVectorizer(stop_words=russian_stopwords)
-        if self.vacancies:
-            self.tfidf_matrix = self.vectorizer.fit_transform(self.vacancies)
-        else:
-            self.tfidf_matrix = None
+        # Vacancy ids aligned with matrix rows; texts are not kept in memory.
+        self._ids = np.empty(max(len(initial_vacancies), 1024), dtype=np.int64)
+        self._size = 0
+        # A fitted vectorizer may be shared between detectors so their vectors are comparable.
+        self.vectorizer = vectorizer if vectorizer is not None else TfidfVectorizer(stop_words=russian_stopwords)
+        self.lsh = MinHashLSH(bands=lsh_bands, rows=lsh_rows, shingle_size=shingle_size) if use_lsh else None
+        self._buffer = None
+        if initial_vacancies:
+            matrix = self._vectorize([text for _, text in initial_vacancies])
+            if matrix is not None:
+                self._buffer = GrowableCSRMatrix.from_matrix(matrix)
+                for vacancy_id, text in initial_vacancies:
+                    self._append_id(vacancy_id, text)
+
+    def _vectorize(self, texts):
+        # The vocabulary is fitted only once, by the first rows the detector sees; None while they have no terms.
+        if not self.is_fitted and not fit_vectorizer(self.vectorizer, texts):
+            return None
+        return self.vectorizer.transform(texts)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def vacancy_ids(self):
+        return self._ids[:self._size]
+
+    def _append_id(self, vacancy_id, vacancy_text):
+        if self._size == self._ids.size:
+            ids = np.empty(max(2 * self._ids.size, 1024), dtype=np.int64)
+            ids[:self._size] = self._ids[:self._size]
+            self._ids = ids
+        self._ids[self._size] = vacancy_id
+        if self.lsh is not None:
+            self.lsh.insert(self._size, vacancy_text)
+        self._size += 1
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_ids'] = self.vacancy_ids.copy()
+        return state
+
+    @property
+    def tfidf_matrix(self):
+        # A view over the filled rows of the buffer, no copy is made.
+        if self._buffer is None:
+            return None
+        return self._buffer.matrix()
+
+    @property
+    def is_fitted(self):
+        return hasattr(self.vectorizer, "vocabulary_")
+
+    def signatures(self, vacancy_texts):
+        """MinHash signatures for best_matches, None when the LSH pre-filter is off."""
+        if self.lsh is None:
+            return None
+        return [self.lsh.signature(text) for text in vacancy_texts]
+
+    def best_matches(self, vectors, signatures):
+        """
+        Returns the best corpus similarity and matched vacancy id (-1 if none)
+        for each row of `vectors`, scoring only LSH candidates when the pre-filter is on.
+        `signatures` come from signatures(), or from any detector with the same LSH settings.
+        """
+        size = vectors.shape[0]
+        best_similarity = np.zeros(size)
+        best_ids = np.full(size, -1, dtype=np.int64)
+        if self._buffer is None:
+            return best_similarity, best_ids
+        matrix = self.tfidf_matrix
+        rows = None
+        if self.lsh is not None:
+            candidates = set()
+            for signature in signatures:
+                candidates.update(self.lsh.query(signature))
+            rows = np.fromiter(sorted(candidates), dtype=np.int64)
+            matrix = matrix[rows]
+        if matrix.shape[0] == 0:
+            return best_similarity, best_ids
+        # TF-IDF rows are L2-normalized, so the dot product is the cosine similarity.
+        # The product stays sparse, only overlapping rows are materialized.
+        similarities = (vectors @ matrix.T).tocsr()
+        best_rows = np.asarray(similarities.argmax(axis=1)).ravel()
+        best_similarity = similarities.max(axis=1).toarray().ravel()
+        if rows is not None:
+            best_rows = rows[best_rows]
+        best_ids = self.vacancy_ids[best_rows]
+        return best_similarity, best_ids
 
     def is_duplicate(self, vacancy_text):
-        if self.tfidf_matrix is None:
+        if self._buffer is None:
             return False, 0.0, None
-        vacancy_vec = self.vectorizer.transform([vacancy_text])
-        similarities = cosine_similarity(vacancy_vec, self.tfidf_matrix).flatten()
-        max_similarity = similarities.max() if similarities.size > 0 else 0.0
+        vectors = self.vectorizer.transform([vacancy_text])
+        similarities, ids = self.best_matches(vectors, self.signatures([vacancy_text]))
+        max_similarity = similarities[0]
         if max_similarity >= self.threshold:
-            duplicate_index = similarities.argmax()
-            duplicate_vacancy = self.vacancies[duplicate_index]
-            return True, max_similarity, duplicate_vacancy
+            return True, max_similarity, int(ids[0])
         return False, max_similarity, None
 
-    def add_vacancy(self, vacancy_text):
+    def is_duplicate_many(self, vacancy_texts):
+        """
+        Checks a batch with one transform call and one sparse product against the corpus.
+        Items are also checked against earlier non-duplicate items of the same batch.
+        Returns a list of (is_duplicate, similarity, vacancy_id, batch_match) tuples, where
+        vacancy_id is the matched corpus row and batch_match the position of the matched batch item.
+        """
+        if not vacancy_texts:
+            return []
+        vectorizer = self.vectorizer
+        if not self.is_fitted:
+            # Nothing is fitted yet, a throwaway vocabulary is enough for in-batch checks.
+            vectorizer = TfidfVectorizer(stop_words=russian_stopwords)
+            if not fit_vectorizer(vectorizer, vacancy_texts):
+                return [(False, 0.0, None, None)] * len(vacancy_texts)
+        vectors = vectorizer.transform(vacancy_texts)
+        similarities, ids = self.best_matches(vectors, self.signatures(vacancy_texts))
+        return dedupe_batch(vectors, similarities, ids, self.threshold)
+
+    def add_vacancy(self, vacancy_id, vacancy_text):
         duplicate, similarity, _ = self.is_duplicate(vacancy_text)
         if duplicate:
             return False, similarity
-        if self.tfidf_matrix is None:
-            self.vacancies = [vacancy_text]
-            self.tfidf_matrix = self.vectorizer.fit_transform(self.vacancies)
-        else:
-            self.vacancies.append(vacancy_text)
-            new_vector = self.vectorizer.transform([vacancy_text])
-            self.tfidf_matrix = vstack([self.tfidf_matrix, new_vector])
+        self.append(vacancy_id, vacancy_text)
         return True, similarity
+
+    def append(self, vacancy_id, vacancy_text):
+        """
+        Appends a vacancy to the matrix without a duplicate check.
+        The fitted vocabulary is reused, so IDF weights only change on a full refit.
+        """
+        if self._buffer is None:
+            matrix = self._vectorize([vacancy_text])
+            if matrix is None:
+                # No terms to compare; the hash stage still finds exact copies.
+                return
+            self._buffer = GrowableCSRMatrix.from_matrix(matrix)
+        else:
+            self._buffer.append_rows(self.vectorizer.transform([vacancy_text]))
+        self._append_id(vacancy_id, vacancy_text)
+
+
+def dedupe_batch(vectors, corpus_similarity, corpus_ids, threshold, compatible=None):
+    """
+    Combines corpus matches with in-batch checks: an item is a duplicate when it
+    matches the corpus or an earlier non-duplicate item of the same batch.
+    `compatible` is an optional boolean matrix of item pairs allowed to match.
+    """
+    batch_similarities = (vectors @ vectors.T).toarray()
+    if compatible is not None:
+        batch_similarities = np.where(compatible, batch_similarities, 0.0)
+    accepted = []
+    results = []
+    for position in range(vectors.shape[0]):
+        similarity = corpus_similarity[position]
+        if similarity >= threshold:
+            results.append((True, similarity, int(corpus_ids[position]), None))
+            continue
+        if accepted:
+            batch_scores = batch_similarities[position, accepted]
+            best = batch_scores.argmax()
+            if batch_scores[best] >= threshold:
+                results.append((True, batch_scores[best], None, accepted[best]))
+                continue
+            similarity = max(similarity, batch_scores[best])
+        accepted.append(position)
+        results.append((False, similarity, None, None))
+    return results
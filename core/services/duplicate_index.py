@@ -0,0 +1,434 @@
+import logging
+import os
+import threading
+
+from datetime import timedelta
+
+import joblib
+import numpy as np
+from celery import current_app
+from django.conf import settings
+from django.db.models import Max, Min
+from django.utils import timezone
+from kombu.exceptions import OperationalError
+from redis.exceptions import RedisError
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from core.models import Vacancy
+from core.utils import get_redis
+from .duplicate_detector import (
+    DUPLICATE_LSH_BANDS,
+    DUPLICATE_LSH_ENABLED,
+    DUPLICATE_LSH_ROWS,
+    DUPLICATE_SHINGLE_SIZE,
+    VacancyDuplicateDetector,
+    dedupe_batch,
+    fit_vectorizer,
+    russian_stopwords,
+)
+from .feed import VACANCY_FEED_SETTLE_SECONDS
+from .fingerprint import content_fingerprint, find_exact_duplicates
+from .lsh import MinHashLSH
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_INDEX_PATH = os.getenv(
+    "VACANCY_DUPLICATE_INDEX_PATH",
+    str(settings.BASE_DIR / "data" / "duplicate_index.joblib"),
+)
+# New vacancies are compared only with postings from the last N days (0 disables the window),
+# stored in buckets of VACANCY_DUPLICATE_BUCKET_DAYS days.
+DUPLICATE_WINDOW_DAYS = int(os.getenv("VACANCY_DUPLICATE_WINDOW_DAYS", "30"))
+DUPLICATE_BUCKET_DAYS = int(os.getenv("VACANCY_DUPLICATE_BUCKET_DAYS", "7"))
+DUPLICATE_SHARD_BY_AREA = os.getenv("VACANCY_DUPLICATE_SHARD_BY_AREA", "0").lower() in ("true", "1", "yes")
+# Exact-match stage on the normalized content hash, checked before LSH and cosine.
+DUPLICATE_HASH_STAGE = os.getenv("VACANCY_DUPLICATE_HASH_STAGE", "1").lower() in ("true", "1", "yes")
+# A small index is queued for a rebuild whenever it doubles since the last fit, so a fresh
+# deployment does not keep the vocabulary of its first few vacancies until the
+# scheduled rebuild. Larger indexes wait for the scheduled run.
+DUPLICATE_REFIT_MAX_ROWS = int(os.getenv("VACANCY_DUPLICATE_REFIT_MAX_ROWS", "20000"))
+# Set while a refit is queued, so workers queue one rebuild between them.
+DUPLICATE_REFIT_QUEUED_KEY = "duplicate_index:refit_queued"
+DUPLICATE_REFIT_QUEUED_SECONDS = 600
+
+
+class DuplicateIndex:
+    """
+    Long-lived duplicate index: a fitted TF-IDF vocabulary plus stored matrices.
+    It is built once from the table, saved to disk and then kept up to date
+    one row at a time. IDF weights are refreshed only by a full rebuild.
+
+    Rows are partitioned into shards by `created_at` bucket and, optionally, by area.
+    Lookups only score shards inside the configured window, older buckets are evicted.
+
+    A check runs in stages: content hash lookup in the database, then LSH candidates,
+    then exact TF-IDF cosine on those candidates.
+    """
+
+    # Bumped whenever the pickled layout changes; older files are rebuilt on load.
+    FORMAT_VERSION = 6
+
+    def __init__(
+        self,
+        threshold=float(os.getenv("VACANCY_SIMILARITY_THRESHOLD")),
+        vectorizer=None,
+        last_vacancy_id=0,
+        window_days=DUPLICATE_WINDOW_DAYS,
+        bucket_days=DUPLICATE_BUCKET_DAYS,
+        shard_by_area=DUPLICATE_SHARD_BY_AREA,
+    ):
+        # One vocabulary for all shards so their vectors are comparable.
+        self.vectorizer = vectorizer if vectorizer is not None else TfidfVectorizer(stop_words=russian_stopwords)
+        self.threshold = threshold
+        self.window_days = window_days
+        self.bucket_days = bucket_days
+        self.shard_by_area = shard_by_area
+        # (bucket, area_id) -> VacancyDuplicateDetector; area_id is None unless sharding by area.
+        self.shards = {}
+        # Only its hash functions are used: every shard gets the same LSH settings, so a
+        # text is signed once per lookup instead of once per shard.
+        self.minhash = (
+            MinHashLSH(bands=DUPLICATE_LSH_BANDS, rows=DUPLICATE_LSH_ROWS, shingle_size=DUPLICATE_SHINGLE_SIZE)
+            if DUPLICATE_LSH_ENABLED else None
+        )
+        self.format_version = self.FORMAT_VERSION
+        # Every Vacancy.id up to this one is in the index. Ids are allocated before their
+        # transactions commit, so the mark only moves past rows older than the settle interval.
+        self.last_vacancy_id = last_vacancy_id
+        # Number of rows the vocabulary was fitted on.
+        self.fitted_rows = 0
+        # Rows already indexed above last_vacancy_id, skipped when sync scans them again.
+        self._added_ids = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls):
+        index = cls()
+        last_vacancy_id = Vacancy.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+        # Rows with lower ids than a recent one may still be uncommitted, so the mark stays
+        # below the first unsettled row and sync scans everything above it again.
+        first_unsettled_id = (
+            Vacancy.objects.filter(created_at__gt=_settled_before()).aggregate(first_id=Min('id'))['first_id']
+        )
+        settled_id = last_vacancy_id
+        if first_unsettled_id is not None:
+            settled_id = Vacancy.objects.filter(id__lt=first_unsettled_id).aggregate(last_id=Max('id'))['last_id'] or 0
+        queryset = Vacancy.objects.filter(id__lte=last_vacancy_id).order_by('id')
+        window_start = index._window_start()
+        if window_start is not None:
+            queryset = queryset.filter(created_at__gte=window_start)
+        rows = list(queryset.values_list('id', 'text', 'created_at', 'area_id'))
+
+        shard_rows = {}
+        for vacancy_id, text, created_at, area_id in rows:
+            shard_rows.setdefault(index._shard_key(created_at, area_id), []).append((vacancy_id, text))
+        if rows and fit_vectorizer(index.vectorizer, [text for _, text, _, _ in rows]):
+            index.fitted_rows = len(rows)
+        for key, vacancies in shard_rows.items():
+            index.shards[key] = index._new_shard(vacancies)
+        index.last_vacancy_id = settled_id
+        index._added_ids = {vacancy_id for vacancy_id, _, _, _ in rows if vacancy_id > settled_id}
+        return index
+
+    @classmethod
+    def load(cls, path=DUPLICATE_INDEX_PATH):
+        index = joblib.load(path)
+        index._lock = threading.Lock()
+        return index
+
+    def save(self, path=DUPLICATE_INDEX_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with self._lock:
+            joblib.dump(self, tmp_path)
+        # Atomic swap so workers never read a half-written file.
+        os.replace(tmp_path, path)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def is_current(self):
+        """False when the file was written by an older layout or with other settings."""
+        return (
+            getattr(self, 'format_version', None) == self.FORMAT_VERSION
+            and self.window_days == DUPLICATE_WINDOW_DAYS
+            and self.bucket_days == DUPLICATE_BUCKET_DAYS
+            and self.shard_by_area == DUPLICATE_SHARD_BY_AREA
+        )
+
+    def __len__(self):
+        return sum(len(shard) for shard in self.shards.values())
+
+    def needs_refit(self):
+        size = len(self)
+        return size <= DUPLICATE_REFIT_MAX_ROWS and size >= 2 * max(self.fitted_rows, 1)
+
+    def _bucket(self, created_at):
+        return created_at.date().toordinal() // self.bucket_days
+
+    def _shard_key(self, created_at, area_id):
+        return self._bucket(created_at), area_id if self.shard_by_area else None
+
+    def _window_start(self):
+        if self.window_days <= 0:
+            return None
+        return timezone.now() - timedelta(days=self.window_days)
+
+    def _new_shard(self, vacancies=None):
+        lsh_settings = {}
+        if self.minhash is not None:
+            lsh_settings = {
+                "lsh_bands": self.minhash.bands,
+                "lsh_rows": self.minhash.rows,
+                "shingle_size": self.minhash.shingle_size,
+            }
+        return VacancyDuplicateDetector(
+            threshold=self.threshold,
+            initial_vacancies=vacancies,
+            vectorizer=self.vectorizer,
+            use_lsh=self.minhash is not None,
+            **lsh_settings,
+        )
+
+    def _signatures(self, vacancy_texts):
+        if self.minhash is None:
+            return None
+        return [self.minhash.signature(text) for text in vacancy_texts]
+
+    def _append(self, vacancy_id, vacancy_text, created_at, area_id):
+        key = self._shard_key(created_at, area_id)
+        shard = self.shards.get(key)
+        if shard is None:
+            shard = self.shards[key] = self._new_shard()
+        shard.append(vacancy_id, vacancy_text)
+
+    def _shards_for(self, area_id):
+        """
+        Shards a new vacancy is compared with: buckets inside the window, and with
+        area sharding only the same area plus rows without an area. A vacancy
+        without an area is compared with every area.
+        """
+        window_start = self._window_start()
+        start_bucket = self._bucket(window_start) if window_start is not None else None
+        for (bucket, shard_area_id), shard in self.shards.items():
+            if start_bucket is not None and bucket < start_bucket:
+                continue
+            if area_id is not None and shard_area_id not in (area_id, None):
+                continue
+            yield shard
+
+    def evict(self):
+        """Drops shards whose bucket lies entirely before the window."""
+        window_start = self._window_start()
+        if window_start is None:
+            return
+        start_bucket = self._bucket(window_start)
+        for key in [key for key in self.shards if key[0] < start_bucket]:
+            del self.shards[key]
+
+    def sync(self):
+        """
+        Appends vacancies inserted since the index was built or last synced,
+        e.g. by other workers, and evicts expired buckets. A bulk insert can commit
+        after rows with higher ids, so rows newer than the settle interval are indexed
+        but scanned again on the next sync, until the mark can move past them.
+        Costs one indexed query when nothing is new.
+        """
+        with self._lock:
+            settled_before = _settled_before()
+            new_rows = (
+                Vacancy.objects
+                .filter(id__gt=self.last_vacancy_id)
+                .order_by('id')
+                .values_list('id', 'text', 'created_at', 'area_id')
+            )
+            settled = True
+            for vacancy_id, text, created_at, area_id in new_rows.iterator():
+                if vacancy_id not in self._added_ids:
+                    self._append(vacancy_id, text, created_at, area_id)
+                    self._added_ids.add(vacancy_id)
+                settled = settled and created_at <= settled_before
+                if settled:
+                    self.last_vacancy_id = vacancy_id
+            self._added_ids = {vacancy_id for vacancy_id in self._added_ids if vacancy_id > self.last_vacancy_id}
+            self.evict()
+
+    def _exact_matches(self, vacancy_texts, area_ids):
+        """Hash stage: matched vacancy id (or None) per text, with one indexed query."""
+        if not DUPLICATE_HASH_STAGE:
+            return [None] * len(vacancy_texts)
+        fingerprints = [content_fingerprint(text) for text in vacancy_texts]
+        stored = find_exact_duplicates(fingerprints, since=self._window_start())
+        matches = []
+        for fingerprint, area_id in zip(fingerprints, area_ids):
+            match = None
+            for vacancy_id, stored_area_id in stored.get(fingerprint, []):
+                if not self.shard_by_area or area_id is None or stored_area_id in (area_id, None):
+                    match = vacancy_id
+                    break
+            matches.append(match)
+        return matches
+
+    def is_duplicate(self, vacancy_text, area_id=None):
+        exact_id = self._exact_matches([vacancy_text], [area_id])[0]
+        if exact_id is not None:
+            return True, 1.0, exact_id
+        with self._lock:
+            if not hasattr(self.vectorizer, "vocabulary_"):
+                return False, 0.0, None
+            vectors = self.vectorizer.transform([vacancy_text])
+            signatures = self._signatures([vacancy_text])
+            max_similarity, duplicate_id = 0.0, None
+            for shard in self._shards_for(area_id):
+                similarities, ids = shard.best_matches(vectors, signatures)
+                if similarities[0] > max_similarity:
+                    max_similarity, duplicate_id = similarities[0], int(ids[0])
+            if max_similarity >= self.threshold:
+                return True, max_similarity, duplicate_id
+            return False, max_similarity, None
+
+    def is_duplicate_many(self, vacancy_texts, area_ids=None):
+        """
+        Batch variant of is_duplicate, see VacancyDuplicateDetector.is_duplicate_many.
+        Hash matches are resolved first, the rest go through the similarity stages.
+        """
+        if not vacancy_texts:
+            return []
+        if area_ids is None:
+            area_ids = [None] * len(vacancy_texts)
+        results = [None] * len(vacancy_texts)
+        remaining = []
+        for position, exact_id in enumerate(self._exact_matches(vacancy_texts, area_ids)):
+            if exact_id is not None:
+                results[position] = (True, 1.0, exact_id, None)
+            else:
+                remaining.append(position)
+        similar = self._similar_many(
+            [vacancy_texts[position] for position in remaining],
+            [area_ids[position] for position in remaining],
+        )
+        for position, (is_dup, sim, duplicate_id, batch_match) in zip(remaining, similar):
+            if batch_match is not None:
+                batch_match = remaining[batch_match]
+            results[position] = (is_dup, sim, duplicate_id, batch_match)
+        return results
+
+    def _similar_many(self, vacancy_texts, area_ids):
+        """Similarity stages for a batch; every shard is scored once for the items it applies to."""
+        if not vacancy_texts:
+            return []
+        with self._lock:
+            vectorizer = self.vectorizer
+            if not hasattr(vectorizer, "vocabulary_"):
+                # Nothing is fitted yet, a throwaway vocabulary is enough for in-batch checks.
+                vectorizer = TfidfVectorizer(stop_words=russian_stopwords)
+                if not fit_vectorizer(vectorizer, vacancy_texts):
+                    return [(False, 0.0, None, None)] * len(vacancy_texts)
+            vectors = vectorizer.transform(vacancy_texts)
+            signatures = self._signatures(vacancy_texts)
+
+            best_similarity = np.zeros(len(vacancy_texts))
+            best_ids = np.full(len(vacancy_texts), -1, dtype=np.int64)
+            shard_items = {}
+            for position, area_id in enumerate(area_ids):
+                for shard in self._shards_for(area_id):
+                    shard_items.setdefault(id(shard), (shard, []))[1].append(position)
+            for shard, positions in shard_items.values():
+                similarities, ids = shard.best_matches(
+                    vectors[positions], [signatures[position] for position in positions] if signatures is not None else None
+                )
+                better = similarities > best_similarity[positions]
+                best_similarity[np.asarray(positions)[better]] = similarities[better]
+                best_ids[np.asarray(positions)[better]] = ids[better]
+
+            # Items of the same batch are compared only when their areas may overlap.
+            compatible = None
+            if self.shard_by_area:
+                areas = np.array([-1 if area_id is None else area_id for area_id in area_ids])
+                compatible = (areas[:, None] == areas[None, :]) | (areas[:, None] == -1) | (areas[None, :] == -1)
+            return dedupe_batch(vectors, best_similarity, best_ids, self.threshold, compatible=compatible)
+
+    def add(self, vacancy_id, vacancy_text, created_at, area_id=None):
+        with self._lock:
+            if vacancy_id <= self.last_vacancy_id or vacancy_id in self._added_ids:
+                return
+            self._append(vacancy_id, vacancy_text, created_at, area_id)
+            self._added_ids.add(vacancy_id)
+
+
+def _settled_before():
+    return timezone.now() - timedelta(seconds=VACANCY_FEED_SETTLE_SECONDS)
+
+
+_index = None
+_index_mtime = None
+_index_lock = threading.Lock()
+
+
+def queue_refit(index):
+    """
+    Queues rebuild_duplicate_index_task unless a refit is already queued. Lookups
+    keep using the current index until the rebuilt file replaces it.
+    """
+    try:
+        if get_redis().set(DUPLICATE_REFIT_QUEUED_KEY, 1, nx=True, ex=DUPLICATE_REFIT_QUEUED_SECONDS):
+            logger.info("Duplicate index has grown to %s rows, queued a refit.", len(index))
+            current_app.send_task("core.tasks.rebuild_duplicate_index_task")
+    except (RedisError, OperationalError) as e:
+        logger.warning(f"Could not queue duplicate index refit: {e}")
+
+
+def get_duplicate_index():
+    """
+    Returns the duplicate index of this worker process.
+    The index is loaded from disk once and reloaded only when a rebuild replaces the file.
+    """
+    global _index, _index_mtime
+    with _index_lock:
+        try:
+            mtime = os.path.getmtime(DUPLICATE_INDEX_PATH)
+        except OSError:
+            mtime = None
+
+        if mtime is None:
+            logger.info("Duplicate index not found at %s, building it.", DUPLICATE_INDEX_PATH)
+            _index = DuplicateIndex.build()
+            _index.save()
+            _index_mtime = os.path.getmtime(DUPLICATE_INDEX_PATH)
+        elif _index is None or mtime != _index_mtime:
+            _index = DuplicateIndex.load()
+            _index_mtime = mtime
+            if not _index.is_current():
+                logger.info("Duplicate index at %s is outdated, rebuilding it.", DUPLICATE_INDEX_PATH)
+                _index = DuplicateIndex.build()
+                _index.save()
+                _index_mtime = os.path.getmtime(DUPLICATE_INDEX_PATH)
+        index = _index
+
+    index.sync()
+    if index.needs_refit():
+        queue_refit(index)
+    return index
+
+
+def get_vacancy_text(vacancy_id):
+    """
+    Fetches the text of a matched vacancy. The index keeps only ids,
+    texts are loaded on demand, e.g. for debug messages.
+    """
+    return Vacancy.objects.filter(id=vacancy_id).values_list('text', flat=True).first()
+
+
+def rebuild_duplicate_index():
+    """
+    Refits the vocabulary and IDF weights on the window and replaces the file on disk.
+    """
+    index = DuplicateIndex.build()
+    index.save()
+    try:
+        get_redis().delete(DUPLICATE_REFIT_QUEUED_KEY)
+    except RedisError as e:
+        logger.warning(f"Could not clear queued duplicate index refit: {e}")
+    return index
@@ -0,0 +1,350 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+from openai import OpenAI
+
+from .llm_client import ResilientLLMClient
+from .stream_parser import StreamItemError, VacancyStreamParser
+from .vacancy_queue import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+GPT_PROMPT_PATH = "config/prompts/vacancy_processing_prompt.txt"
+GPT_MODEL = "gpt-4o-mini"
+# "openai" for chat completions, "stub" for the local deterministic backend.
+VACANCY_EXTRACTION_BACKEND = os.getenv("VACANCY_EXTRACTION_BACKEND", "openai")
+
+# Stub backend: base latency per request, extra latency per vacancy, and the
+# share of failed requests and of malformed items.
+EXTRACTION_STUB_LATENCY_SECONDS = float(os.getenv("EXTRACTION_STUB_LATENCY_SECONDS", "1"))
+EXTRACTION_STUB_ITEM_LATENCY_SECONDS = float(os.getenv("EXTRACTION_STUB_ITEM_LATENCY_SECONDS", "0.05"))
+EXTRACTION_STUB_ERROR_RATE = float(os.getenv("EXTRACTION_STUB_ERROR_RATE", "0"))
+EXTRACTION_STUB_ITEM_ERROR_RATE = float(os.getenv("EXTRACTION_STUB_ITEM_ERROR_RATE", "0"))
+EXTRACTION_STUB_SEED = int(os.getenv("EXTRACTION_STUB_SEED", "0"))
+
+
+class ExtractionError(Exception):
+    pass
+
+
+def load_gpt_prompt(file_path=GPT_PROMPT_PATH):
+    with open(file_path, "r", encoding="utf-8") as f:
+        return f.read().strip()
+
+
+def build_gpt_messages(prompt, batch):
+    vacancies_for_gpt = []
+    for vac in batch:
+        _id = vac.id  # using internal id for mapping
+        vacancies_for_gpt.append({
+            "id": _id,
+            "text": vac.text
+        })
+
+    user_payload = {
+        "Vacancies": vacancies_for_gpt
+    }
+
+    messages = [
+        {"role": "system", "content": prompt},
+        {"role": "user", "content": json.dumps(user_payload, ensure_ascii=False)}
+    ]
+
+    logger.debug(messages)
+    return messages
+
+
+def parse_gpt_content(content):
+    """Parses a whole completion into the list of items, dropping Markdown code fences."""
+    content = content.strip()
+    if content.startswith("```"):
+        content = content.strip("`").strip()
+        if content.lower().startswith("json"):
+            content = content[4:].strip()
+
+    try:
+        gpt_json = json.loads(content)
+    except json.JSONDecodeError as e:
+        raise ExtractionError(f"Failed to decode JSON from ChatGPT: {e} | content: {content}") from e
+
+    if isinstance(gpt_json, list):
+        return gpt_json
+    return gpt_json.get("Vacancies", [])
+
+
+class ExtractionBackend:
+    """
+    Turns a batch of vacancies into response items of the format described in the
+    GPT prompt. Methods run in worker threads, so they must not touch the database.
+    `model` and `prompt` identify the results in the ExtractionCache.
+    """
+
+    name = None
+    model = None
+    prompt = ""
+
+    def available(self):
+        """False while the provider is known to be failing, so no work is claimed."""
+        return True
+
+    def extract(self, batch):
+        """Returns the list of items for `batch`, raises ExtractionError on failure."""
+        raise NotImplementedError
+
+    def stream(self, batch):
+        """
+        Yields items (or StreamItemError for malformed ones) as soon as each is ready.
+        Backends without incremental output yield the result of `extract`.
+        """
+        yield from self.extract(batch)
+
+
+class OpenAIChatBackend(ExtractionBackend):
+    """ChatGPT through the chat completions API, paced and retried by ResilientLLMClient."""
+
+    name = "openai"
+
+    def __init__(self, client=None, model=GPT_MODEL, prompt=None):
+        if client is None:
+            client = create_openai_client()
+        self.llm = ResilientLLMClient(client)
+        self.model = model
+        self.prompt = prompt if prompt is not None else load_gpt_prompt()
+
+    def available(self):
+        if self.llm.breaker.is_open():
+            logger.warning(f"LLM circuit is open for {self.llm.breaker.open_for()}s more.")
+            return False
+        return True
+
+    def estimate_request_tokens(self, batch):
+        return estimate_tokens(self.prompt) + sum(estimate_tokens(vacancy.text) for vacancy in batch)
+
+    def extract(self, batch):
+        messages = build_gpt_messages(self.prompt, batch)
+
+        try:
+            response = self.llm.chat_completion(
+                self.estimate_request_tokens(batch),
+                model=self.model,
+                messages=messages,
+                temperature=0.0
+            )
+        except Exception as e:
+            raise ExtractionError(f"Error calling ChatGPT API: {e}") from e
+
+        if not response or not response.choices:
+            raise ExtractionError("No response from ChatGPT.")
+
+        logger.debug(response.choices)
+        return parse_gpt_content(response.choices[0].message.content)
+
+    def stream(self, batch):
+        messages = build_gpt_messages(self.prompt, batch)
+        parser = VacancyStreamParser()
+
+        try:
+            stream = self.llm.chat_completion(
+                self.estimate_request_tokens(batch),
+                model=self.model,
+                messages=messages,
+                temperature=0.0,
+                stream=True
+            )
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if content:
+                    yield from parser.feed(content)
+        except Exception as e:
+            raise ExtractionError(f"Error calling ChatGPT API: {e}") from e
+
+        if not parser.started:
+            raise ExtractionError("No Vacancies array in the ChatGPT response.")
+        if not parser.finished:
+            logger.warning("ChatGPT response ended before the Vacancies array was closed.")
+
+
+class OpenAIBatchBackend(ExtractionBackend):
+    """
+    OpenAI Batch API for bulk backfills: half the price of chat completions, but
+    results arrive within the completion window instead of seconds. Work is split
+    into `submit`, which uploads all batches as one job, and `collect`, which
+    returns the items once the job has finished; see the extraction_backfill command.
+    """
+
+    name = "openai_batch"
+    completion_window = "24h"
+
+    def __init__(self, client=None, model=GPT_MODEL, prompt=None):
+        self.client = client or create_openai_client()
+        self.model = model
+        self.prompt = prompt if prompt is not None else load_gpt_prompt()
+
+    def submit(self, batches):
+        """Uploads one request per batch and returns the id of the created job."""
+        lines = []
+        for position, batch in enumerate(batches):
+            lines.append(json.dumps({
+                "custom_id": str(position),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": self.model,
+                    "messages": build_gpt_messages(self.prompt, batch),
+                    "temperature": 0.0,
+                },
+            }, ensure_ascii=False))
+        payload = io.BytesIO("\n".join(lines).encode("utf-8"))
+        payload.name = "vacancies.jsonl"
+        input_file = self.client.files.create(file=payload, purpose="batch")
+        job = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window=self.completion_window,
+        )
+        return job.id
+
+    def collect(self, job_id):
+        """
+        Returns (status, results). `results` is None until the job has finished and
+        then maps the position of every submitted batch to its items or to an ExtractionError.
+        """
+        job = self.client.batches.retrieve(job_id)
+        if job.status in ("validating", "in_progress", "finalizing"):
+            return job.status, None
+
+        results = {}
+        if job.output_file_id:
+            content = self.client.files.content(job.output_file_id).text
+            for line in content.splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                position = int(record["custom_id"])
+                response = record.get("response") or {}
+                if response.get("status_code") != 200:
+                    results[position] = ExtractionError(f"Batch request failed: {record.get('error') or response}")
+                    continue
+                try:
+                    results[position] = parse_gpt_content(response["body"]["choices"][0]["message"]["content"])
+                except (KeyError, IndexError, ExtractionError) as e:
+                    results[position] = e if isinstance(e, ExtractionError) else ExtractionError(str(e))
+        return job.status, results
+
+    def extract(self, batch):
+        raise ExtractionError("The Batch API backend is asynchronous, use submit() and collect().")
+
+
+class StubBackend(ExtractionBackend):
+    """
+    Deterministic local backend for benchmarks and load tests: no network, no API key.
+
+    Items are derived from a hash of the vacancy text, and failures are drawn from
+    a generator seeded with the batch ids and the attempt number, so the same run
+    gives the same results. Items are streamed over the simulated latency.
+    """
+
+    name = "stub"
+    model = "stub"
+    categories = ["Developer", "QA", "Manager", "DevOps & Infrastructure", "Data & Machine Learning"]
+    requirements = ["Python", "Django", "PostgreSQL", "Redis", "Docker", "Kubernetes", "Git", "SQL", "Celery", "Linux"]
+
+    def __init__(
+        self,
+        latency=EXTRACTION_STUB_LATENCY_SECONDS,
+        item_latency=EXTRACTION_STUB_ITEM_LATENCY_SECONDS,
+        error_rate=EXTRACTION_STUB_ERROR_RATE,
+        item_error_rate=EXTRACTION_STUB_ITEM_ERROR_RATE,
+        seed=EXTRACTION_STUB_SEED,
+    ):
+        self.latency = latency
+        self.item_latency = item_latency
+        self.error_rate = error_rate
+        self.item_error_rate = item_error_rate
+        self.seed = seed
+        self._attempts = {}
+        self._lock = threading.Lock()
+
+    def _random(self, batch):
+        # Retries of the same batch draw new numbers, so failed vacancies get through eventually.
+        key = ",".join(str(vacancy.id) for vacancy in batch)
+        with self._lock:
+            self._attempts[key] = attempt = self._attempts.get(key, 0) + 1
+        return random.Random(f"{self.seed}:{attempt}:{key}")
+
+    def item(self, vacancy):
+        digest = int.from_bytes(hashlib.blake2b(vacancy.text.encode("utf-8"), digest_size=8).digest(), "big")
+        salary_min = 50000 + digest % 20 * 10000
+        return {
+            "id": vacancy.id,
+            "job_category": self.categories[digest % len(self.categories)],
+            "job_subcategory": "Other",
+            "company": f"Company {digest % 100}",
+            "location": "Москва",
+            "employment_type": "Full-time",
+            "work_format": ["remote", "on-site", "hybrid"][digest % 3],
+            "salary_range_min": str(salary_min),
+            "salary_range_max": str(salary_min * 2),
+            "salary_currency": "RUB",
+            "experience_years_required": str(digest % 6),
+            "key_requirements": [
+                self.requirements[(digest >> shift) % len(self.requirements)] for shift in (8, 16, 24)
+            ],
+        }
+
+    def _run(self, batch):
+        rng = self._random(batch)
+        time.sleep(self.latency)
+        if rng.random() < self.error_rate:
+            raise ExtractionError("Stub backend failure.")
+        for vacancy in batch:
+            time.sleep(self.item_latency)
+            if rng.random() < self.item_error_rate:
+                yield StreamItemError("Stub malformed item", json.dumps({"id": vacancy.id}))
+            else:
+                yield self.item(vacancy)
+
+    def extract(self, batch):
+        return [item for item in self._run(batch) if not isinstance(item, StreamItemError)]
+
+    def stream(self, batch):
+        yield from self._run(batch)
+
+
+def create_openai_client():
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise EnvironmentError("API key for OpenAI is not set in environment variables.")
+    # Retries are done by ResilientLLMClient, which also paces requests and trips the circuit breaker.
+    return OpenAI(api_key=api_key, max_retries=0)
+
+
+BACKENDS = {
+    OpenAIChatBackend.name: OpenAIChatBackend,
+    StubBackend.name: StubBackend,
+}
+
+_backend = None
+
+
+def get_extraction_backend():
+    """Returns the backend selected by VACANCY_EXTRACTION_BACKEND, created on first use."""
+    global _backend
+    if _backend is None:
+        try:
+            backend_class = BACKENDS[VACANCY_EXTRACTION_BACKEND]
+        except KeyError:
+            raise EnvironmentError(
+                f"Unknown VACANCY_EXTRACTION_BACKEND {VACANCY_EXTRACTION_BACKEND!r}, "
+                f"expected one of: {', '.join(BACKENDS)}."
+            )
+        _backend = backend_class()
+    return _backend
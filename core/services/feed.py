@@ -0,0 +1,117 @@
+import asyncio
+import base64
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.utils import timezone
+from redis.exceptions import RedisError
+
+from core.models import Vacancy
+from core.utils import get_async_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+FEED_CHANNEL = "vacancies:processed"
+# Rows become visible in the feed only this long after processing, so a transaction
+# that commits slightly after a later one cannot slip behind a consumer's cursor.
+VACANCY_FEED_SETTLE_SECONDS = float(os.getenv("VACANCY_FEED_SETTLE_SECONDS", "2"))
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(processed_at, vacancy_id):
+    raw = f"{processed_at.isoformat()}|{vacancy_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        processed_at, vacancy_id = raw.split("|")
+        return datetime.fromisoformat(processed_at), int(vacancy_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def publish_processed():
+    """Wakes up long-polling feed readers; called after processed vacancies are committed."""
+    try:
+        get_redis().publish(FEED_CHANNEL, "1")
+    except RedisError as e:
+        logger.warning(f"Could not publish feed notification: {e}")
+
+
+def feed_queryset(cursor=None):
+    """Analysed vacancies after `cursor` that are past the settle interval, in feed order."""
+    queryset = (
+        Vacancy.objects
+        .filter(analysis__isnull=False, processed_at__lte=timezone.now() - timedelta(seconds=VACANCY_FEED_SETTLE_SECONDS))
+        .select_related('area', 'analysis__job_category', 'analysis__job_subcategory')
+        .prefetch_related('analysis__key_requirements')
+        .defer('search_vector')
+        .order_by('processed_at', 'id')
+    )
+    if cursor:
+        processed_at, vacancy_id = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(processed_at__gt=processed_at) | Q(processed_at=processed_at, id__gt=vacancy_id)
+        )
+    return queryset
+
+
+def feed_page(cursor=None, limit=100):
+    """
+    Returns (vacancies, next_cursor) with up to `limit` analysed vacancies
+    after `cursor`, ordered by (processed_at, id). Each page is one range scan of the
+    (processed_at, id) index, whatever the depth, plus one query for key requirements.
+    `next_cursor` equals `cursor` when there is nothing new.
+    """
+    vacancies = list(feed_queryset(cursor)[:limit])
+    if vacancies:
+        cursor = encode_cursor(vacancies[-1].processed_at, vacancies[-1].id)
+    return vacancies, cursor
+
+
+async def wait_for_feed(cursor=None, limit=100, timeout=25.0):
+    """
+    Long poll: returns feed_page() as soon as it is not empty, waiting up to `timeout`
+    seconds. While waiting, the reader awaits the Redis channel instead of polling the
+    database, so a waiting consumer holds no worker; without Redis it falls back to
+    polling every settle interval. Runs on the event loop of an async view.
+    """
+    deadline = time.monotonic() + timeout
+    page = sync_to_async(feed_page)
+    pubsub = get_async_redis().pubsub(ignore_subscribe_messages=True)
+    try:
+        # Subscribe before the first query, so a notification in between is not lost.
+        await pubsub.subscribe(FEED_CHANNEL)
+    except RedisError as e:
+        logger.warning(f"Could not subscribe to feed notifications: {e}")
+        await pubsub.aclose()
+        pubsub = None
+    try:
+        while True:
+            vacancies, next_cursor = await page(cursor, limit)
+            remaining = deadline - time.monotonic()
+            if vacancies or remaining <= 0:
+                return vacancies, next_cursor
+            notified = False
+            if pubsub is not None:
+                try:
+                    notified = await pubsub.get_message(timeout=remaining) is not None
+                except RedisError as e:
+                    logger.warning(f"Lost feed notifications: {e}")
+                    await pubsub.aclose()
+                    pubsub = None
+            if notified or pubsub is None:
+                # New rows show up once they are past the settle interval.
+                await asyncio.sleep(min(VACANCY_FEED_SETTLE_SECONDS, max(deadline - time.monotonic(), 0)))
+    finally:
+        if pubsub is not None:
+            await pubsub.aclose()
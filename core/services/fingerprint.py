@@ -0,0 +1,37 @@
+import hashlib
+import re
+
+from core.models import Vacancy
+
+URL_RE = re.compile(r"(https?://\S+|www\.\S+|t\.me/\S+|@\w+)", re.IGNORECASE)
+# Anything that is not a letter or a digit: punctuation, emojis, markup.
+NON_WORD_RE = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def normalize_text(text):
+    """
+    Canonical form of a vacancy text: lowercase, without links, mentions,
+    emojis and punctuation, with whitespace collapsed.
+    """
+    text = URL_RE.sub(" ", text.lower())
+    return " ".join(NON_WORD_RE.sub(" ", text).split())
+
+
+def content_fingerprint(text):
+    """64-bit hash of the normalized text, as a signed integer for a BigIntegerField."""
+    digest = hashlib.blake2b(normalize_text(text).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def find_exact_duplicates(fingerprints, since=None):
+    """
+    First stage of duplicate detection: one indexed lookup of content hashes.
+    Returns {fingerprint: [(vacancy_id, area_id), ...]} for the hashes already stored.
+    """
+    queryset = Vacancy.objects.filter(content_hash__in=set(fingerprints))
+    if since is not None:
+        queryset = queryset.filter(created_at__gte=since)
+    matches = {}
+    for content_hash, vacancy_id, area_id in queryset.order_by('id').values_list('content_hash', 'id', 'area_id'):
+        matches.setdefault(content_hash, []).append((vacancy_id, area_id))
+    return matches
@@ -0,0 +1,88 @@
+import os
+
+from django.db import transaction
+
+from core.models import Area, Vacancy
+from core.utils import TELEGRAM_DEBUG, send_debug_telegram
+from .fingerprint import content_fingerprint
+from .duplicate_index import get_duplicate_index, get_vacancy_text
+
+# A new area has no vacancies yet, so its duplicate checks use an id no row has:
+# only vacancies without an area are compared.
+NEW_AREA_ID = 0
+
+
+def existing_area_ids(names):
+    """{name: id} of the areas among `names` that exist; nothing is created."""
+    return dict(Area.objects.filter(name__in=set(names)).values_list('name', 'id'))
+
+
+def create_areas(names):
+    """{name: id} for `names`, creating the missing areas; called for accepted vacancies only."""
+    names = set(names)
+    Area.objects.bulk_create([Area(name=name) for name in names], ignore_conflicts=True)
+    return existing_area_ids(names)
+
+
+def ingest_vacancies(items):
+    """
+    Dedupes a batch of VacancyInput items against the corpus and against each other,
+    inserts the survivors with one bulk_create and returns a result dict per item.
+    """
+    min_length = int(os.getenv("VACANCY_MIN_LENGTH"))
+    results = [None] * len(items)
+    candidates = []
+    for position, item in enumerate(items):
+        if len(item.text) < min_length:
+            results[position] = {"status": "rejected", "error": "Vacancy is too small"}
+        else:
+            candidates.append(position)
+
+    areas = existing_area_ids(items[position].area for position in candidates if items[position].area)
+
+    duplicate_index = get_duplicate_index()
+    checks = duplicate_index.is_duplicate_many(
+        [items[position].text for position in candidates],
+        area_ids=[
+            areas.get(items[position].area, NEW_AREA_ID) if items[position].area else None
+            for position in candidates
+        ],
+    )
+
+    survivors = []
+    batch_matches = {}
+    for position, (is_dup, sim, duplicate_id, batch_match) in zip(candidates, checks):
+        if is_dup:
+            results[position] = {"status": "duplicate", "similarity": round(float(sim), 4), "duplicate_of": duplicate_id}
+            if batch_match is not None:
+                batch_matches[position] = candidates[batch_match]
+            if TELEGRAM_DEBUG:
+                if batch_match is not None:
+                    original_text = items[candidates[batch_match]].text
+                else:
+                    original_text = get_vacancy_text(duplicate_id)
+                send_debug_telegram(f"#duplicate\nVacancy is duplicate with similarity {sim:.2f}.\n\nDuplicate text:\n{items[position].text}\n\nOriginal vacancy:\n{original_text}")
+        else:
+            survivors.append(position)
+
+    with transaction.atomic():
+        areas = create_areas(items[position].area for position in survivors if items[position].area)
+        created = Vacancy.objects.bulk_create([
+            Vacancy(
+                text=items[position].text,
+                source=items[position].source or "",
+                area_id=areas.get(items[position].area),
+                content_hash=content_fingerprint(items[position].text),
+            )
+            for position in survivors
+        ])
+
+    created_ids = {}
+    for position, vacancy in zip(survivors, created):
+        duplicate_index.add(vacancy.id, vacancy.text, vacancy.created_at, vacancy.area_id)
+        created_ids[position] = vacancy.id
+        results[position] = {"status": "accepted", "id": vacancy.id}
+    for position, matched_position in batch_matches.items():
+        results[position]["duplicate_of"] = created_ids[matched_position]
+
+    return results
@@ -0,0 +1,198 @@
+import json
+import logging
+import os
+import time
+import uuid
+
+from django.db import InterfaceError, OperationalError, close_old_connections
+from pydantic import ValidationError
+from redis.exceptions import RedisError, ResponseError
+
+from core.schemas import VacancyInput
+from core.utils import get_async_redis, get_redis
+from .ingest import ingest_vacancies
+
+logger = logging.getLogger(__name__)
+
+INGEST_STREAM = "vacancies:ingest"
+INGEST_GROUP = "ingest"
+# Messages that kept failing, kept for inspection with their delivery count.
+INGEST_DEAD_LETTER_STREAM = "vacancies:ingest:dead"
+INGEST_STATUS_KEY = "vacancies:ingest:status:{tracking_id}"
+# How long clients can look up the outcome of a queued vacancy.
+VACANCY_INGEST_STATUS_TTL_SECONDS = int(os.getenv("VACANCY_INGEST_STATUS_TTL_SECONDS", "86400"))
+# Messages a crashed consumer read but did not acknowledge are taken over after this long.
+VACANCY_INGEST_CLAIM_IDLE_SECONDS = int(os.getenv("VACANCY_INGEST_CLAIM_IDLE_SECONDS", "60"))
+# A message claimed more often than this is moved to the dead-letter stream instead of retried.
+VACANCY_INGEST_MAX_DELIVERIES = int(os.getenv("VACANCY_INGEST_MAX_DELIVERIES", "5"))
+VACANCY_INGEST_DEAD_LETTER_MAXLEN = int(os.getenv("VACANCY_INGEST_DEAD_LETTER_MAXLEN", "10000"))
+
+
+async def enqueue_vacancy(item):
+    """Queues a validated VacancyInput for the consumer and returns its tracking id."""
+    tracking_id = uuid.uuid4().hex
+    pipeline = get_async_redis().pipeline(transaction=False)
+    pipeline.set(
+        INGEST_STATUS_KEY.format(tracking_id=tracking_id),
+        json.dumps({"status": "queued"}),
+        ex=VACANCY_INGEST_STATUS_TTL_SECONDS,
+    )
+    pipeline.xadd(INGEST_STREAM, {"tracking_id": tracking_id, "payload": item.model_dump_json()})
+    await pipeline.execute()
+    return tracking_id
+
+
+async def get_ingest_status(tracking_id):
+    """The outcome of a queued vacancy: queued, accepted, duplicate or rejected; None when unknown."""
+    value = await get_async_redis().get(INGEST_STATUS_KEY.format(tracking_id=tracking_id))
+    return json.loads(value) if value else None
+
+
+class IngestConsumer:
+    """
+    Reads queued vacancies from the Redis stream as a member of a consumer group and
+    ingests them in micro-batches: one duplicate check and one bulk_create per batch.
+    A batch is acknowledged only after its rows and statuses are written, so a crash
+    replays it; the replay is reported as a duplicate of the rows already inserted.
+    A batch that fails is retried item by item and the failing items are rejected;
+    messages that still come back VACANCY_INGEST_MAX_DELIVERIES times are dead-lettered.
+    """
+
+    def __init__(self, name, batch_size=100, block_ms=1000):
+        self.name = name
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.redis = get_redis()
+        self._claim_cursor = "0-0"
+
+    def ensure_group(self):
+        try:
+            self.redis.xgroup_create(INGEST_STREAM, INGEST_GROUP, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def read(self):
+        """Messages left pending by dead consumers first, then new ones."""
+        self._claim_cursor, messages, *_ = self.redis.xautoclaim(
+            INGEST_STREAM, INGEST_GROUP, self.name,
+            min_idle_time=VACANCY_INGEST_CLAIM_IDLE_SECONDS * 1000,
+            start_id=self._claim_cursor,
+            count=self.batch_size,
+        )
+        messages = self.dead_letter_exhausted([message for message in messages if message[1]])
+        if messages:
+            return messages
+        response = self.redis.xreadgroup(
+            INGEST_GROUP, self.name, {INGEST_STREAM: ">"}, count=self.batch_size, block=self.block_ms,
+        )
+        return response[0][1] if response else []
+
+    def dead_letter_exhausted(self, messages):
+        """Moves claimed messages delivered too often to the dead-letter stream; returns the rest."""
+        if not messages:
+            return messages
+        pipeline = self.redis.pipeline(transaction=False)
+        for message_id, _ in messages:
+            pipeline.xpending_range(INGEST_STREAM, INGEST_GROUP, min=message_id, max=message_id, count=1)
+        deliveries = [entries[0]["times_delivered"] if entries else 0 for entries in pipeline.execute()]
+
+        alive, exhausted = [], []
+        for message, delivered in zip(messages, deliveries):
+            (exhausted if delivered > VACANCY_INGEST_MAX_DELIVERIES else alive).append((message, delivered))
+        if not exhausted:
+            return messages
+
+        pipeline = self.redis.pipeline(transaction=False)
+        for (message_id, fields), delivered in exhausted:
+            tracking_id = fields[b"tracking_id"].decode()
+            logger.error(f"Queued vacancy {tracking_id} failed {delivered - 1} deliveries, dead-lettering it")
+            pipeline.xadd(
+                INGEST_DEAD_LETTER_STREAM,
+                {**fields, b"deliveries": delivered - 1},
+                maxlen=VACANCY_INGEST_DEAD_LETTER_MAXLEN,
+                approximate=True,
+            )
+            pipeline.set(
+                INGEST_STATUS_KEY.format(tracking_id=tracking_id),
+                json.dumps({"status": "rejected", "error": "Could not be ingested, moved to the dead-letter stream"}),
+                ex=VACANCY_INGEST_STATUS_TTL_SECONDS,
+            )
+        message_ids = [message_id for (message_id, _), _ in exhausted]
+        pipeline.xack(INGEST_STREAM, INGEST_GROUP, *message_ids)
+        pipeline.xdel(INGEST_STREAM, *message_ids)
+        pipeline.execute()
+        return [message for message, _ in alive]
+
+    def ingest(self, items):
+        """
+        Statuses for validated items. When the batch fails, its items are retried one by
+        one, so a bad vacancy is rejected with its error instead of holding back the rest.
+        Database outages propagate and leave the batch pending.
+        """
+        try:
+            return ingest_vacancies(items)
+        except (OperationalError, InterfaceError):
+            raise
+        except Exception:
+            logger.exception("Could not ingest a batch of queued vacancies, retrying them one by one")
+        statuses = []
+        for item in items:
+            try:
+                statuses.extend(ingest_vacancies([item]))
+            except (OperationalError, InterfaceError):
+                raise
+            except Exception as e:
+                logger.exception("Could not ingest a queued vacancy")
+                statuses.append({"status": "rejected", "error": str(e)})
+        return statuses
+
+    def handle(self, messages):
+        # A long-running consumer must not keep using a connection the database dropped.
+        close_old_connections()
+        statuses = {}
+        items, tracking_ids = [], []
+        for _, fields in messages:
+            tracking_id = fields[b"tracking_id"].decode()
+            try:
+                items.append(VacancyInput.model_validate_json(fields[b"payload"]))
+                tracking_ids.append(tracking_id)
+            except ValidationError as e:
+                statuses[tracking_id] = {"status": "rejected", "error": str(e)}
+        if items:
+            statuses.update(zip(tracking_ids, self.ingest(items)))
+
+        pipeline = self.redis.pipeline(transaction=False)
+        for tracking_id, status in statuses.items():
+            pipeline.set(
+                INGEST_STATUS_KEY.format(tracking_id=tracking_id),
+                json.dumps(status),
+                ex=VACANCY_INGEST_STATUS_TTL_SECONDS,
+            )
+        message_ids = [message_id for message_id, _ in messages]
+        pipeline.xack(INGEST_STREAM, INGEST_GROUP, *message_ids)
+        # Acknowledged entries are not needed any more; the stream holds only the backlog.
+        pipeline.xdel(INGEST_STREAM, *message_ids)
+        pipeline.execute()
+        return len(messages)
+
+    def run(self, once=False):
+        """Consumes until stopped; with `once`, returns when the stream is drained."""
+        self.ensure_group()
+        handled = 0
+        while True:
+            try:
+                messages = self.read()
+                if messages:
+                    handled += self.handle(messages)
+                elif once:
+                    return handled
+            except RedisError as e:
+                logger.warning(f"Ingest stream unavailable: {e}")
+                time.sleep(self.block_ms / 1000)
+            except Exception:
+                # Unacknowledged messages stay pending and are claimed again after the idle timeout.
+                logger.exception("Could not ingest a batch of queued vacancies")
+                if once:
+                    raise
+                time.sleep(self.block_ms / 1000)
@@ -0,0 +1,65 @@
+import hashlib
+import json
+import logging
+import os
+
+from redis.exceptions import RedisError
+
+from core.utils import get_redis
+from .fingerprint import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Entries expire after the TTL; under memory pressure Redis evicts them by its
+# maxmemory-policy (allkeys-lru is recommended for this instance).
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+LLM_CACHE_PREFIX = "llm:extract"
+
+
+class ExtractionCache:
+    """
+    Content-addressed cache of per-vacancy GPT extraction results.
+    Keys combine the model, a hash of the system prompt and a hash of the normalized
+    vacancy text, so reposts and retried batches hit while prompt or model changes miss.
+    """
+
+    def __init__(self, model, prompt, ttl=LLM_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self.namespace = hashlib.sha256(f"{model}\n{prompt}".encode("utf-8")).hexdigest()[:16]
+
+    def key(self, text):
+        digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        return f"{LLM_CACHE_PREFIX}:{self.namespace}:{digest}"
+
+    def get_many(self, vacancies):
+        """Returns {vacancy_id: item} for cached vacancies, with the item id set to the vacancy."""
+        if not vacancies:
+            return {}
+        try:
+            values = get_redis().mget([self.key(vacancy.text) for vacancy in vacancies])
+        except RedisError as e:
+            logger.warning(f"LLM cache lookup failed: {e}")
+            return {}
+        hits = {}
+        for vacancy, value in zip(vacancies, values):
+            if value is not None:
+                hits[vacancy.id] = {**json.loads(value), "id": vacancy.id}
+        return hits
+
+    def set_many(self, vacancies, items):
+        """Stores response items of a batch, matched to vacancies by id."""
+        vacancy_map = {vacancy.id: vacancy for vacancy in vacancies}
+        try:
+            pipeline = get_redis().pipeline(transaction=False)
+            for item in items:
+                if not isinstance(item, dict) or item.get("id") not in vacancy_map:
+                    continue
+                value = {name: value for name, value in item.items() if name != "id"}
+                pipeline.set(
+                    self.key(vacancy_map[item["id"]].text),
+                    json.dumps(value, ensure_ascii=False),
+                    ex=self.ttl,
+                )
+            pipeline.execute()
+        except RedisError as e:
+            logger.warning(f"LLM cache store failed: {e}")
@@ -0,0 +1,203 @@
+import logging
+import os
+import random
+import threading
+import time
+
+import openai
+from redis.exceptions import RedisError
+
+from core.utils import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Limits of one worker process; keep their sum across workers under the account limits.
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "500"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "200000"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "1"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "60"))
+# Consecutive failed calls, across all workers, that open the circuit...
+LLM_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5"))
+# ...and how long it stays open before one trial batch is let through.
+LLM_CIRCUIT_OPEN_SECONDS = int(os.getenv("LLM_CIRCUIT_OPEN_SECONDS", "60"))
+LLM_CIRCUIT_PREFIX = "llm:circuit"
+
+# Rate limits, timeouts, dropped connections and 5xx are worth another attempt;
+# other API errors (bad request, auth, ...) fail right away.
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate_per_minute`."""
+
+    def __init__(self, rate_per_minute):
+        self.capacity = rate_per_minute
+        self.rate = rate_per_minute / 60.0
+        self._tokens = rate_per_minute
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount):
+        """Takes `amount` tokens and returns how long the caller must wait before using them."""
+        # A request larger than the bucket would never fit, so it waits for a full bucket.
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class RateLimiter:
+    """
+    Paces requests of one process by requests per minute and estimated tokens per
+    minute. After a 429 every thread waits out the provider's Retry-After.
+    """
+
+    def __init__(self, requests_per_minute=LLM_REQUESTS_PER_MINUTE, tokens_per_minute=LLM_TOKENS_PER_MINUTE):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def pause(self, seconds):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def acquire(self, tokens):
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        with self._lock:
+            wait = max(wait, self._paused_until - time.monotonic())
+        if wait > 0:
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker shared by all workers through Redis.
+
+    Every failed call increments a counter and every successful call resets it.
+    When the counter reaches `failure_threshold` the circuit opens for
+    `open_seconds`: calls fail fast and workers stop claiming vacancies. After
+    that the circuit is half-open, and the first failure opens it again.
+    Redis errors never block calls.
+    """
+
+    def __init__(self, failure_threshold=LLM_CIRCUIT_FAILURE_THRESHOLD, open_seconds=LLM_CIRCUIT_OPEN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.open_key = f"{LLM_CIRCUIT_PREFIX}:open"
+        self.half_open_key = f"{LLM_CIRCUIT_PREFIX}:half_open"
+        self.failures_key = f"{LLM_CIRCUIT_PREFIX}:failures"
+
+    def is_open(self):
+        try:
+            return bool(get_redis().exists(self.open_key))
+        except RedisError as e:
+            logger.warning(f"Could not read circuit state: {e}")
+            return False
+
+    def open_for(self):
+        """Seconds until the circuit closes, 0 if it is not open."""
+        try:
+            return max(get_redis().ttl(self.open_key), 0)
+        except RedisError:
+            return 0
+
+    def record_success(self):
+        try:
+            get_redis().delete(self.failures_key, self.half_open_key)
+        except RedisError as e:
+            logger.warning(f"Could not update circuit state: {e}")
+
+    def record_failure(self):
+        try:
+            redis = get_redis()
+            pipe = redis.pipeline()
+            pipe.incr(self.failures_key)
+            pipe.expire(self.failures_key, self.open_seconds * 10)
+            pipe.exists(self.half_open_key)
+            failures, _, half_open = pipe.execute()
+            if failures >= self.failure_threshold or half_open:
+                pipe = redis.pipeline()
+                pipe.set(self.open_key, 1, ex=self.open_seconds)
+                pipe.set(self.half_open_key, 1, ex=self.open_seconds * 10)
+                pipe.delete(self.failures_key)
+                pipe.execute()
+                logger.error(f"LLM circuit opened for {self.open_seconds}s after {failures} failures.")
+        except RedisError as e:
+            logger.warning(f"Could not update circuit state: {e}")
+
+
+def retry_after(error):
+    """Delay in seconds requested by the provider, if any."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+def backoff_delay(attempt, base=LLM_BACKOFF_BASE_SECONDS, cap=LLM_BACKOFF_MAX_SECONDS):
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class ResilientLLMClient:
+    """
+    Wraps an OpenAI client: every chat completion waits for the rate limiter,
+    retries transient errors with backoff (or the provider's Retry-After) and
+    reports its outcome to the circuit breaker. The wrapped client should be
+    created with max_retries=0 so the SDK does not retry on its own.
+    """
+
+    def __init__(self, client, limiter=None, breaker=None, max_retries=LLM_MAX_RETRIES):
+        self.client = client
+        self.limiter = limiter or RateLimiter()
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retries = max_retries
+
+    def chat_completion(self, estimated_tokens, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            if self.breaker.is_open():
+                raise CircuitOpenError(f"LLM circuit is open for {self.breaker.open_for()}s more.")
+            self.limiter.acquire(estimated_tokens)
+            try:
+                response = self.client.chat.completions.create(**kwargs)
+            except RETRYABLE_ERRORS as e:
+                self.breaker.record_failure()
+                if attempt == self.max_retries or self.breaker.is_open():
+                    raise
+                delay = retry_after(e)
+                if delay is None:
+                    delay = backoff_delay(attempt)
+                if isinstance(e, openai.RateLimitError):
+                    # Hold back the other threads of this worker as well.
+                    self.limiter.pause(delay)
+                logger.warning(f"{type(e).__name__} from LLM, retry {attempt + 1}/{self.max_retries} in {delay:.1f}s.")
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return response
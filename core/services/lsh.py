@@ -0,0 +1,79 @@
+import re
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+# Universal hashing h(x) = (a * x + b) mod p over the 61-bit Mersenne prime. Shingle hashes
+# x are 32-bit and a, b are drawn below 2^32, so a * x + b stays below 2^64 and the uint64
+# arithmetic never wraps before the modulo.
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def shingles(text, size):
+    """
+    Returns the set of word n-grams of the text.
+    Texts shorter than `size` words fall back to single words.
+    """
+    tokens = TOKEN_RE.findall(text.lower())
+    if len(tokens) < size:
+        return set(tokens)
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+class MinHashLSH:
+    """
+    MinHash signatures split into `bands` bands of `rows` rows each.
+    Two texts become candidates when at least one band matches, which happens
+    with probability 1 - (1 - s^rows)^bands for shingle Jaccard similarity s.
+    """
+
+    def __init__(self, bands=32, rows=4, shingle_size=3, seed=1):
+        self.bands = bands
+        self.rows = rows
+        self.shingle_size = shingle_size
+        num_perm = bands * rows
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, MAX_HASH + np.uint64(1), size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, MAX_HASH + np.uint64(1), size=num_perm, dtype=np.uint64)
+        self._buckets = [defaultdict(list) for _ in range(bands)]
+
+    @property
+    def threshold(self):
+        """Approximate Jaccard similarity at which the candidate probability is 1/2."""
+        return (1.0 / self.bands) ** (1.0 / self.rows)
+
+    def signature(self, text):
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in shingles(text, self.shingle_size)),
+            dtype=np.uint64,
+        )
+        if hashes.size == 0:
+            return np.full(self.bands * self.rows, MAX_HASH, dtype=np.uint64)
+        permuted = (np.outer(hashes, self._a) + self._b) % MERSENNE_PRIME & MAX_HASH
+        return permuted.min(axis=0)
+
+    def _band_keys(self, signature):
+        # Band slices are folded into a 32-bit key to keep the buckets compact;
+        # a key collision only adds a false candidate that cosine scoring rejects.
+        for band in range(self.bands):
+            yield band, zlib.crc32(signature[band * self.rows:(band + 1) * self.rows].tobytes())
+
+    def insert(self, key, text):
+        for band, band_key in self._band_keys(self.signature(text)):
+            self._buckets[band][band_key].append(key)
+
+    def query(self, signature):
+        """
+        Keys of the candidates for a signature(). Indexes with the same parameters and
+        seed hash alike, so one signature can be queried against each of them.
+        """
+        candidates = set()
+        for band, band_key in self._band_keys(signature):
+            bucket = self._buckets[band].get(band_key)
+            if bucket:
+                candidates.update(bucket)
+        return candidates
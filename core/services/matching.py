@@ -0,0 +1,399 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+
+import joblib
+import numpy as np
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from redis.exceptions import RedisError
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from core.models import VacancyAnalysis
+from core.utils import get_redis
+from .duplicate_detector import russian_stopwords
+from .feed import VACANCY_FEED_SETTLE_SECONDS, encode_cursor
+from .fingerprint import normalize_text
+from .sparse_buffer import GrowableCSRMatrix
+
+logger = logging.getLogger(__name__)
+
+MATCH_INDEX_PATH = os.getenv(
+    "VACANCY_MATCH_INDEX_PATH",
+    str(settings.BASE_DIR / "data" / "match_index.joblib"),
+)
+# Only vacancies created in the last N days are recommended.
+MATCH_WINDOW_DAYS = int(os.getenv("VACANCY_MATCH_WINDOW_DAYS", "60"))
+MATCH_MAX_FEATURES = int(os.getenv("VACANCY_MATCH_MAX_FEATURES", "200000"))
+# Share of the score given to key requirements found in the resume, the rest is text similarity.
+MATCH_REQUIREMENT_WEIGHT = float(os.getenv("VACANCY_MATCH_REQUIREMENT_WEIGHT", "0.3"))
+# Candidates taken by text similarity for every requested match, then re-ranked with requirements.
+MATCH_CANDIDATE_FACTOR = int(os.getenv("VACANCY_MATCH_CANDIDATE_FACTOR", "5"))
+MATCH_SYNC_SECONDS = float(os.getenv("VACANCY_MATCH_SYNC_SECONDS", "5"))
+# A small index is refitted whenever the rows synced since the build outnumber the built ones.
+MATCH_REFIT_MAX_ROWS = int(os.getenv("VACANCY_MATCH_REFIT_MAX_ROWS", "20000"))
+MATCH_CACHE_TTL_SECONDS = int(os.getenv("VACANCY_MATCH_CACHE_TTL_SECONDS", "3600"))
+MATCH_GENERATION_KEY = "match:generation"
+
+WORK_FORMATS = {"remote": 0, "on-site": 1, "hybrid": 2}
+
+ROW_DTYPE = np.dtype([
+    ("id", np.int64),
+    ("category_id", np.int64),
+    ("area_id", np.int64),
+    ("work_format", np.int8),
+    ("created_day", np.int32),
+    ("alive", np.bool_),
+])
+
+
+def work_format_code(value):
+    return WORK_FORMATS.get((value or "").strip().lower(), -1)
+
+
+class VacancyMatchIndex:
+    """
+    TF-IDF vectors of recent analysed vacancies for resume matching.
+
+    Rows of the last build are kept column-major, so a query only reads the
+    postings of the terms present in the resume instead of scoring every row.
+    Vacancies processed after the build go to a small row-major delta that is
+    scored in full. Structured attributes live in one numpy record array, and
+    filters are applied as masks over the candidates only.
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, window_days=MATCH_WINDOW_DAYS):
+        self.vectorizer = TfidfVectorizer(
+            stop_words=russian_stopwords, sublinear_tf=True, max_features=MATCH_MAX_FEATURES
+        )
+        self.window_days = window_days
+        self.format_version = self.FORMAT_VERSION
+        self.postings = None  # CSC matrix of the built rows
+        self.delta = None     # GrowableCSRMatrix of rows synced after the build
+        self.rows = np.empty(0, dtype=ROW_DTYPE)
+        self._size = 0
+        self._row_of = {}     # vacancy id -> row
+        # (processed_at, id) of the last synced vacancy, same order as the change feed.
+        self.cursor = None
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        state['rows'] = self.rows[:self._size].copy()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+
+    def is_current(self):
+        return getattr(self, 'format_version', None) == self.FORMAT_VERSION and self.window_days == MATCH_WINDOW_DAYS
+
+    def _window_start(self):
+        return timezone.now() - timedelta(days=self.window_days)
+
+    @classmethod
+    def _queryset(cls):
+        return (
+            VacancyAnalysis.objects
+            .filter(vacancy__processed_at__isnull=False)
+            .order_by('vacancy__processed_at', 'vacancy_id')
+            .values_list(
+                'vacancy_id', 'vacancy__text', 'vacancy__processed_at', 'vacancy__created_at',
+                'vacancy__area_id', 'job_category_id', 'work_format',
+            )
+        )
+
+    def _append_rows(self, records):
+        needed = self._size + len(records)
+        if needed > self.rows.size:
+            rows = np.empty(max(needed, 2 * self.rows.size, 1024), dtype=ROW_DTYPE)
+            rows[:self._size] = self.rows[:self._size]
+            self.rows = rows
+        for vacancy_id, _, _, created_at, area_id, category_id, work_format in records:
+            previous = self._row_of.get(vacancy_id)
+            if previous is not None:
+                # Reprocessed vacancy: the old row stays in the matrix but is never returned.
+                self.rows['alive'][previous] = False
+            self.rows[self._size] = (
+                vacancy_id,
+                category_id if category_id is not None else -1,
+                area_id if area_id is not None else -1,
+                work_format_code(work_format),
+                created_at.date().toordinal(),
+                True,
+            )
+            self._row_of[vacancy_id] = self._size
+            self._size += 1
+        if records:
+            last = records[-1]
+            self.cursor = (last[2], last[0])
+
+    @classmethod
+    def build(cls):
+        index = cls()
+        records = list(
+            cls._queryset()
+            .filter(vacancy__created_at__gte=index._window_start())
+            .filter(vacancy__processed_at__lte=timezone.now() - timedelta(seconds=VACANCY_FEED_SETTLE_SECONDS))
+        )
+        if records:
+            index.postings = index.vectorizer.fit_transform(record[1] for record in records).tocsc()
+            index._append_rows(records)
+        return index
+
+    @property
+    def is_fitted(self):
+        return hasattr(self.vectorizer, "vocabulary_")
+
+    @property
+    def built_rows(self):
+        return self.postings.shape[0] if self.postings is not None else 0
+
+    def needs_refit(self):
+        return self._size <= MATCH_REFIT_MAX_ROWS and self._size >= 2 * max(self.built_rows, 1)
+
+    def sync(self, force=False):
+        """Appends vacancies processed since the last sync, at most every MATCH_SYNC_SECONDS."""
+        now = time.monotonic()
+        if not force and now - self._synced_at < MATCH_SYNC_SECONDS:
+            return
+        with self._lock:
+            self._synced_at = now
+            queryset = self._queryset().filter(
+                vacancy__created_at__gte=self._window_start(),
+                vacancy__processed_at__lte=timezone.now() - timedelta(seconds=VACANCY_FEED_SETTLE_SECONDS),
+            )
+            if self.cursor is not None:
+                processed_at, vacancy_id = self.cursor
+                queryset = queryset.filter(
+                    Q(vacancy__processed_at__gt=processed_at)
+                    | Q(vacancy__processed_at=processed_at, vacancy_id__gt=vacancy_id)
+                )
+            records = list(queryset)
+            if not records:
+                return
+            if not self.is_fitted:
+                # Built from an empty table: the first rows fit the vocabulary.
+                self.postings = self.vectorizer.fit_transform(record[1] for record in records).tocsc()
+            else:
+                vectors = self.vectorizer.transform(record[1] for record in records)
+                if self.delta is None:
+                    self.delta = GrowableCSRMatrix.from_matrix(vectors)
+                else:
+                    self.delta.append_rows(vectors)
+            self._append_rows(records)
+
+    def search(self, resume_text, limit, category_id=None, area_id=None, work_format=None):
+        """
+        Returns (rows, similarities) of the best `limit` rows by cosine similarity,
+        best first. Rows that share no term with the resume are never scored, and the
+        best ones are picked with argpartition instead of a full sort.
+        """
+        if not self.is_fitted or not self._size:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        query = self.vectorizer.transform([resume_text]).T.tocsc()
+        candidate_rows, candidate_scores = [], []
+        n_built = self.built_rows
+        if self.postings is not None:
+            scores = (self.postings @ query).tocoo()
+            candidate_rows.append(scores.row)
+            candidate_scores.append(scores.data)
+        if self.delta is not None:
+            scores = (self.delta.matrix() @ query).tocoo()
+            candidate_rows.append(scores.row + n_built)
+            candidate_scores.append(scores.data)
+        if not candidate_rows:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        rows = np.concatenate(candidate_rows).astype(np.int64)
+        scores = np.concatenate(candidate_scores)
+
+        meta = self.rows[rows]
+        mask = meta['alive'] & (meta['created_day'] >= self._window_start().date().toordinal())
+        if category_id is not None:
+            mask &= meta['category_id'] == category_id
+        if area_id is not None:
+            mask &= meta['area_id'] == area_id
+        if work_format is not None:
+            mask &= meta['work_format'] == work_format_code(work_format)
+        rows, scores = rows[mask], scores[mask]
+
+        if rows.size > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            rows, scores = rows[top], scores[top]
+        order = np.argsort(-scores)
+        return rows[order], scores[order]
+
+    def vacancy_ids(self, rows):
+        return self.rows['id'][rows]
+
+    @classmethod
+    def load(cls, path=MATCH_INDEX_PATH):
+        return joblib.load(path)
+
+    def save(self, path=MATCH_INDEX_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with self._lock:
+            joblib.dump(self, tmp_path)
+        os.replace(tmp_path, path)
+
+
+def requirement_overlap(resume_text, names):
+    """Requirement names that occur in the resume as whole words."""
+    text = f" {normalize_text(resume_text)} "
+    return [name for name in names if f" {normalize_text(name)} " in text]
+
+
+def match_vacancies(index, resume_text, limit=20, category_id=None, area_id=None, work_format=None):
+    """
+    Ranks vacancies for a resume. MATCH_CANDIDATE_FACTOR * limit candidates are taken
+    by text similarity, then re-ranked by
+        (1 - MATCH_REQUIREMENT_WEIGHT) * similarity + MATCH_REQUIREMENT_WEIGHT * overlap,
+    where overlap is the share of a vacancy's key requirements found in the resume.
+    Returns a list of dicts sorted by score.
+    """
+    rows, similarities = index.search(
+        resume_text, limit * MATCH_CANDIDATE_FACTOR,
+        category_id=category_id, area_id=area_id, work_format=work_format,
+    )
+    vacancy_ids = [int(vacancy_id) for vacancy_id in index.vacancy_ids(rows)]
+    requirements = {}
+    Through = VacancyAnalysis.key_requirements.through
+    for vacancy_id, name in Through.objects.filter(
+        vacancyanalysis__vacancy_id__in=vacancy_ids
+    ).values_list('vacancyanalysis__vacancy_id', 'analysiskeyrequirement__name'):
+        requirements.setdefault(vacancy_id, []).append(name)
+
+    matches = []
+    for vacancy_id, similarity in zip(vacancy_ids, similarities):
+        names = requirements.get(vacancy_id, [])
+        matched = requirement_overlap(resume_text, names)
+        overlap = len(matched) / len(names) if names else 0.0
+        matches.append({
+            "vacancy_id": vacancy_id,
+            "score": round((1 - MATCH_REQUIREMENT_WEIGHT) * float(similarity) + MATCH_REQUIREMENT_WEIGHT * overlap, 4),
+            "similarity": round(float(similarity), 4),
+            "matched_requirements": matched,
+        })
+    matches.sort(key=lambda match: match["score"], reverse=True)
+    return matches[:limit]
+
+
+_index = None
+_index_mtime = None
+_index_lock = threading.Lock()
+
+
+def get_match_index():
+    """
+    Returns the match index of this process, loaded from disk once and reloaded
+    when a rebuild replaces the file, then synced with newly processed vacancies.
+    """
+    global _index, _index_mtime
+    with _index_lock:
+        try:
+            mtime = os.path.getmtime(MATCH_INDEX_PATH)
+        except OSError:
+            mtime = None
+
+        if mtime is None:
+            logger.info("Match index not found at %s, building it.", MATCH_INDEX_PATH)
+            _index = VacancyMatchIndex.build()
+            _index.save()
+            _index_mtime = os.path.getmtime(MATCH_INDEX_PATH)
+        elif _index is None or mtime != _index_mtime:
+            _index = VacancyMatchIndex.load()
+            _index_mtime = mtime
+            if not _index.is_current():
+                _index = VacancyMatchIndex.build()
+                _index.save()
+                _index_mtime = os.path.getmtime(MATCH_INDEX_PATH)
+        index = _index
+
+    index.sync()
+    if index.needs_refit():
+        with _index_lock:
+            if _index is index:
+                logger.info("Match index has grown to %s rows, refitting it.", len(index))
+                _index = index = VacancyMatchIndex.build()
+                _index.save()
+                _index_mtime = os.path.getmtime(MATCH_INDEX_PATH)
+            else:
+                index = _index
+    return index
+
+
+def rebuild_match_index():
+    """Refits the vocabulary on the window, folds the delta into the postings and replaces the file."""
+    index = VacancyMatchIndex.build()
+    index.save()
+    return index
+
+
+def get_match_generation():
+    try:
+        return int(get_redis().get(MATCH_GENERATION_KEY) or 0)
+    except RedisError as e:
+        logger.warning(f"Could not read match generation: {e}")
+        return None
+
+
+def bump_match_generation():
+    """Invalidates every cached match list; called when new analyses are committed."""
+    try:
+        get_redis().incr(MATCH_GENERATION_KEY)
+    except RedisError as e:
+        logger.warning(f"Could not bump match generation: {e}")
+
+
+class MatchCache:
+    """
+    Match lists per resume in Redis. Keys include the resume text hash, the query,
+    the generation counter read before matching and the cursor of the index the
+    matches come from. New vacancies or an edited resume simply miss; results computed
+    during a bump, or by an index that has not synced the new vacancies yet (they wait
+    for the settle interval and the sync throttle), are never served as fresh.
+    """
+
+    prefix = "match:resume"
+
+    def key(self, resume, params, generation, cursor):
+        digest = hashlib.sha256(
+            json.dumps([resume.text, params], sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()[:24]
+        synced = encode_cursor(*cursor) if cursor is not None else "-"
+        return f"{self.prefix}:{resume.id}:{generation}:{synced}:{digest}"
+
+    def get(self, resume, params, generation, cursor):
+        if generation is None:
+            return None
+        try:
+            value = get_redis().get(self.key(resume, params, generation, cursor))
+        except RedisError as e:
+            logger.warning(f"Could not read match cache: {e}")
+            return None
+        return json.loads(value) if value else None
+
+    def set(self, resume, params, generation, cursor, matches):
+        if generation is None:
+            return
+        try:
+            get_redis().set(
+                self.key(resume, params, generation, cursor), json.dumps(matches), ex=MATCH_CACHE_TTL_SECONDS,
+            )
+        except RedisError as e:
+            logger.warning(f"Could not write match cache: {e}")
@@ -0,0 +1,133 @@
+import os
+import re
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+# Normalized salaries are stored in minor units of this currency.
+BASE_CURRENCY = os.getenv("VACANCY_BASE_CURRENCY", "RUB").upper()
+
+
+def _parse_rates(raw):
+    rates = {BASE_CURRENCY: Decimal(1)}
+    for pair in raw.split(","):
+        if ":" not in pair:
+            continue
+        code, rate = pair.split(":", 1)
+        try:
+            rates[code.strip().upper()] = Decimal(rate.strip())
+        except InvalidOperation:
+            continue
+    return rates
+
+
+# Units of BASE_CURRENCY per unit of each currency, e.g. "USD:90,EUR:98".
+# Rows are not re-normalized when rates change; rerun `backfill_analysis_numbers` for that.
+CURRENCY_RATES = _parse_rates(os.getenv("VACANCY_CURRENCY_RATES", "USD:90,EUR:98,KZT:0.18,BYN:27,UAH:2.2"))
+
+# ISO 4217 exponents that differ from the usual two decimal places.
+MINOR_UNIT_EXPONENTS = {"JPY": 0, "KRW": 0, "VND": 0, "CLP": 0, "ISK": 0}
+
+CURRENCY_ALIASES = {
+    "₽": "RUB", "РУБ": "RUB", "РУБ.": "RUB", "RUR": "RUB", "РУБЛЕЙ": "RUB",
+    "$": "USD", "ДОЛЛ": "USD", "ДОЛЛАРОВ": "USD",
+    "€": "EUR", "ЕВРО": "EUR",
+    "₸": "KZT", "ТЕНГЕ": "KZT",
+}
+
+# Largest amount kept, in minor units; anything above is a parsing accident, not a salary.
+MAX_SALARY_MINOR = 10 ** 14
+MAX_EXPERIENCE_YEARS = Decimal("60")
+
+# "200 000", "150,000", "150000.50", "1,5 млн", "300k", "от 3 лет": the first number and
+# its multiplier. A comma or dot followed by exactly three digits groups thousands.
+NUMBER_RE = re.compile(
+    r"(\d{1,3}(?:[ \u00a0\u202f]\d{3})+|\d{1,3}(?:[.,]\d{3})+(?!\d)|\d+)(?:[.,](\d+))?"
+    r"\s*(k|к|тыс\w*|т\.|m|м|млн\w*)?(?![a-zа-я])",
+    re.IGNORECASE,
+)
+MONTHS_RE = re.compile(r"мес|month", re.IGNORECASE)
+MULTIPLIERS = {"k": 1000, "к": 1000, "тыс": 1000, "т.": 1000, "m": 10 ** 6, "м": 10 ** 6, "млн": 10 ** 6}
+
+
+def normalize_currency(value):
+    """ISO code for a GPT currency value ("₽", "руб." -> "RUB"); None when empty."""
+    if not value:
+        return None
+    code = str(value).strip().upper()
+    if code in ("", "-"):
+        return None
+    return CURRENCY_ALIASES.get(code, code)
+
+
+def _parse_number(value):
+    if value is None:
+        return None
+    match = NUMBER_RE.search(str(value))
+    if not match:
+        return None
+    whole, fraction, suffix = match.groups()
+    number = Decimal(re.sub(r"\D", "", whole) + ("." + fraction if fraction else ""))
+    if suffix:
+        suffix = suffix.lower()
+        number *= MULTIPLIERS.get(suffix, 1000 if suffix.startswith("тыс") else 10 ** 6)
+    return number
+
+
+def minor_exponent(currency):
+    return MINOR_UNIT_EXPONENTS.get(currency, 2)
+
+
+def parse_salary(value, currency=None):
+    """Salary text ("200 000", "1,5 млн") as an integer number of minor units, or None."""
+    number = _parse_number(value)
+    if number is None:
+        return None
+    minor = int((number * 10 ** minor_exponent(currency)).to_integral_value(ROUND_HALF_UP))
+    return minor if 0 < minor <= MAX_SALARY_MINOR else None
+
+
+def base_amount(major, currency):
+    """An amount in units of `currency` as minor units of BASE_CURRENCY, or None for unknown rates."""
+    rate = CURRENCY_RATES.get(currency or BASE_CURRENCY)
+    if rate is None:
+        return None
+    return int((Decimal(major) * rate * 10 ** minor_exponent(BASE_CURRENCY)).to_integral_value(ROUND_HALF_UP))
+
+
+def to_base_currency(minor, currency):
+    """Minor units of `currency` converted to minor units of BASE_CURRENCY, or None for unknown rates."""
+    if minor is None:
+        return None
+    base = base_amount(Decimal(minor) / 10 ** minor_exponent(currency or BASE_CURRENCY), currency)
+    return base if base is not None and base <= MAX_SALARY_MINOR else None
+
+
+def parse_experience(value):
+    """Required experience ("3", "1.5", "3-5 лет", "6 месяцев") as Decimal years, the lower bound for ranges."""
+    number = _parse_number(value)
+    if number is not None and MONTHS_RE.search(str(value)):
+        number /= 12
+    if number is None or number > MAX_EXPERIENCE_YEARS:
+        return None
+    return number.quantize(Decimal("0.1"), ROUND_HALF_UP)
+
+
+def analysis_numbers(salary_min, salary_max, currency, experience):
+    """
+    Numeric columns of VacancyAnalysis for the raw GPT values. The base-currency
+    bounds fall back to each other, so an open-ended range such as "from 100 000"
+    still overlaps filters and aggregates with plain comparisons.
+    """
+    currency = normalize_currency(currency)
+    min_minor = parse_salary(salary_min, currency)
+    max_minor = parse_salary(salary_max, currency)
+    if min_minor is not None and max_minor is not None and min_minor > max_minor:
+        min_minor, max_minor = max_minor, min_minor
+    low = to_base_currency(min_minor if min_minor is not None else max_minor, currency)
+    high = to_base_currency(max_minor if max_minor is not None else min_minor, currency)
+    return {
+        "salary_min_minor": min_minor,
+        "salary_max_minor": max_minor,
+        "salary_low_base": low,
+        "salary_high_base": high,
+        "experience_years": parse_experience(experience),
+    }
@@ -0,0 +1,181 @@
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import (
+    Vacancy,
+    JobCategory,
+    JobSubcategory,
+    AnalysisKeyRequirement,
+    VacancyAnalysis
+)
+from .feed import publish_processed
+from .matching import bump_match_generation
+from .normalization import analysis_numbers
+from .response_cache import bump_vacancy_responses
+from .taxonomy import get_taxonomy_cache
+from .vacancy_queue import lock_leased
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_FIELDS = [
+    'company',
+    'location',
+    'employment_type',
+    'work_format',
+    'salary_range_min',
+    'salary_range_max',
+    'salary_currency',
+    'experience_years_required',
+]
+NUMERIC_FIELDS = [
+    'salary_min_minor',
+    'salary_max_minor',
+    'salary_low_base',
+    'salary_high_base',
+    'experience_years',
+]
+
+
+def _clip(model, field_name, value):
+    # One oversized value from GPT must not fail the bulk insert of the whole batch.
+    if not value:
+        return None
+    value = str(value)
+    return value[:model._meta.get_field(field_name).max_length]
+
+
+def _parse_item(item):
+    """Normalized names and analysis fields of one GPT response item."""
+    location = item.get("location")
+    if location in [None, "Не указано"]:
+        location = "-"
+    fields = {name: _clip(VacancyAnalysis, name, item.get(name)) for name in ANALYSIS_FIELDS}
+    fields['location'] = _clip(VacancyAnalysis, 'location', location)
+    # Parsed from the stored text, so backfill_analysis_numbers gives the same result.
+    fields.update(analysis_numbers(
+        fields['salary_range_min'],
+        fields['salary_range_max'],
+        fields['salary_currency'],
+        fields['experience_years_required'],
+    ))
+
+    key_reqs = item.get("key_requirements", [])
+    requirements = []
+    if isinstance(key_reqs, list):
+        for req_name in key_reqs:
+            if isinstance(req_name, str) and req_name.strip():
+                requirements.append(_clip(AnalysisKeyRequirement, 'name', req_name.strip()))
+    return {
+        "category": _clip(JobCategory, 'name', item.get("job_category")) or "Other",
+        "subcategory": _clip(JobSubcategory, 'name', item.get("job_subcategory")),
+        "fields": fields,
+        # None means the response had no list, so existing requirements are kept.
+        "requirements": list(dict.fromkeys(requirements)) if isinstance(key_reqs, list) else None,
+    }
+
+
+def save_vacancy_analyses(vacancies, items):
+    """
+    Stores GPT results for a batch of vacancies with a fixed number of queries:
+    taxonomy names are resolved through the worker's TaxonomyCache (misses with
+    bulk_create plus one select), analyses are upserted and key requirement links rewritten in bulk,
+    and vacancies are marked processed with one bulk_update, all in one transaction.
+    Feed subscribers are notified and cached resume matches and responses invalidated once it commits.
+    Only vacancies still leased by this worker are saved; their rows stay locked until the commit.
+
+    Returns (analyses, not_vacancies): the saved VacancyAnalysis objects with
+    `key_requirement_names` set, and the vacancies rejected as not a vacancy.
+    """
+    vacancy_map = {vacancy.id: vacancy for vacancy in vacancies}
+    parsed = {}
+    not_vacancies = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        vacancy = vacancy_map.get(item.get("id"))
+        if vacancy is None or vacancy.id in parsed or vacancy in not_vacancies:
+            continue
+        if item.get("not_a_vacancy"):
+            not_vacancies.append(vacancy)
+        else:
+            parsed[vacancy.id] = _parse_item(item)
+
+    with transaction.atomic():
+        results = [vacancy_map[vacancy_id] for vacancy_id in parsed] + not_vacancies
+        held = lock_leased(results)
+        if len(held) < len(results):
+            logger.warning(f"Lease lost for {len(results) - len(held)} vacancies, their results are dropped.")
+            parsed = {vacancy_id: data for vacancy_id, data in parsed.items() if vacancy_id in held}
+            not_vacancies = [vacancy for vacancy in not_vacancies if vacancy.id in held]
+        taxonomy = get_taxonomy_cache()
+        category_ids = taxonomy.resolve_categories({data["category"] for data in parsed.values()})
+        subcategory_ids = taxonomy.resolve_subcategories({
+            (category_ids[data["category"]], data["subcategory"])
+            for data in parsed.values() if data["subcategory"]
+        })
+        requirement_ids = taxonomy.resolve_requirements({
+            (category_ids[data["category"]], name)
+            for data in parsed.values() for name in data["requirements"] or []
+        })
+
+        analyses = []
+        for vacancy_id, data in parsed.items():
+            # Instances built from cached ids, so debug output needs no extra queries.
+            category = JobCategory(id=category_ids[data["category"]], name=data["category"])
+            subcategory = None
+            if data["subcategory"]:
+                subcategory = JobSubcategory(
+                    id=subcategory_ids[(category.id, data["subcategory"])],
+                    category=category,
+                    name=data["subcategory"],
+                )
+            analyses.append(VacancyAnalysis(
+                vacancy=vacancy_map[vacancy_id],
+                job_category=category,
+                job_subcategory=subcategory,
+                **data["fields"],
+            ))
+        analyses = VacancyAnalysis.objects.bulk_create(
+            analyses,
+            update_conflicts=True,
+            unique_fields=['vacancy'],
+            update_fields=['job_category', 'job_subcategory', *ANALYSIS_FIELDS, *NUMERIC_FIELDS],
+        )
+
+        Through = VacancyAnalysis.key_requirements.through
+        replaced = [
+            analysis.id for analysis in analyses
+            if parsed[analysis.vacancy_id]["requirements"] is not None
+        ]
+        Through.objects.filter(vacancyanalysis_id__in=replaced).delete()
+        links = []
+        for analysis in analyses:
+            names = parsed[analysis.vacancy_id]["requirements"] or []
+            analysis.key_requirement_names = names
+            for name in names:
+                links.append(Through(
+                    vacancyanalysis_id=analysis.id,
+                    analysiskeyrequirement_id=requirement_ids[(analysis.job_category_id, name)],
+                ))
+        Through.objects.bulk_create(links, ignore_conflicts=True)
+
+        now = timezone.now()
+        for vacancy in not_vacancies:
+            vacancy.is_processed = True
+            vacancy.processed_at = now
+        for analysis in analyses:
+            analysis.vacancy.is_processed = True
+            analysis.vacancy.is_valid = True
+            analysis.vacancy.processed_at = now
+        Vacancy.objects.bulk_update(
+            not_vacancies + [analysis.vacancy for analysis in analyses],
+            ['is_processed', 'is_valid', 'processed_at'],
+        )
+        if analyses:
+            transaction.on_commit(publish_processed)
+            transaction.on_commit(bump_match_generation)
+            transaction.on_commit(bump_vacancy_responses)
+
+    return analyses, not_vacancies
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import logging
+import os
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from redis.exceptions import RedisError
+
+from core.utils import get_redis
+
+logger = logging.getLogger(__name__)
+
+VACANCY_RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("VACANCY_RESPONSE_CACHE_TTL_SECONDS", "600"))
+VACANCY_RESPONSE_CACHE = os.getenv("VACANCY_RESPONSE_CACHE", "1").lower() in ("true", "1", "yes")
+
+GENERATION_KEY = "response:generation:{scope}"
+
+# What a cached response depends on; each scope has its own generation counter.
+VACANCIES = "vacancies"
+STATS = "stats"
+TAXONOMY = "taxonomy"
+
+
+def bump_response_generation(*scopes):
+    """Invalidates every cached response that depends on `scopes`; called after commits."""
+    try:
+        pipeline = get_redis().pipeline(transaction=False)
+        for scope in scopes:
+            pipeline.incr(GENERATION_KEY.format(scope=scope))
+        pipeline.execute()
+    except RedisError as e:
+        logger.warning(f"Could not bump response generations {scopes}: {e}")
+
+
+def bump_vacancy_responses():
+    bump_response_generation(VACANCIES)
+
+
+class ResponseCache:
+    """
+    JSON responses of a read endpoint in Redis, keyed by the endpoint, the generations
+    of its scopes and the validated (so normalized) query parameters. Writers bump a
+    generation instead of deleting keys, so every older entry just stops being read
+    and expires with its TTL. The ETag is derived from the key, which lets a client
+    revalidate with one MGET and no body transfer. When Redis is down the endpoint
+    is served uncached.
+    """
+
+    prefix = "response"
+
+    def __init__(self, name, scopes, ttl=VACANCY_RESPONSE_CACHE_TTL_SECONDS, **cache_control):
+        self.name = name
+        self.scopes = scopes
+        self.ttl = ttl
+        # Without explicit directives clients may store responses but must revalidate them.
+        self.cache_control = cache_control or {"no_cache": True}
+
+    def generations(self):
+        keys = [GENERATION_KEY.format(scope=scope) for scope in self.scopes]
+        try:
+            return [int(value or 0) for value in get_redis().mget(keys)]
+        except RedisError as e:
+            logger.warning(f"Could not read response generations: {e}")
+            return None
+
+    def key(self, params, generations):
+        digest = hashlib.sha256(
+            json.dumps(params, sort_keys=True, ensure_ascii=False, cls=DjangoJSONEncoder).encode("utf-8")
+        ).hexdigest()[:32]
+        return f"{self.prefix}:{self.name}:{'.'.join(map(str, generations))}:{digest}"
+
+    def respond(self, request, params, build):
+        """
+        Returns the response for `params` (a JSON-serializable dict), calling `build()`
+        for the body only on a miss. Generations are read before building, so a result
+        computed during a commit is stored under the older generation and not served after it.
+        """
+        generations = self.generations() if VACANCY_RESPONSE_CACHE else None
+        if generations is None:
+            return self._response(json.dumps(build(), cls=DjangoJSONEncoder), None, "BYPASS")
+
+        key = self.key(params, generations)
+        etag = f'"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            response = HttpResponseNotModified()
+            response["ETag"] = etag
+            patch_cache_control(response, **self.cache_control)
+            return response
+
+        try:
+            body = get_redis().get(key)
+        except RedisError as e:
+            logger.warning(f"Could not read response cache: {e}")
+            body = None
+        if body is not None:
+            return self._response(body, etag, "HIT")
+
+        body = json.dumps(build(), cls=DjangoJSONEncoder)
+        try:
+            get_redis().set(key, body, ex=self.ttl)
+        except RedisError as e:
+            logger.warning(f"Could not write response cache: {e}")
+        return self._response(body, etag, "MISS")
+
+    def _response(self, body, etag, status):
+        response = HttpResponse(body, content_type="application/json")
+        response["X-Cache"] = status
+        if etag:
+            response["ETag"] = etag
+        patch_cache_control(response, **self.cache_control)
+        return response
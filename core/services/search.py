@@ -0,0 +1,64 @@
+from django.contrib.postgres.search import SearchQuery
+from django.db.models import Exists, OuterRef
+
+from core.models import VacancyAnalysis
+from .normalization import base_amount, normalize_currency
+
+SEARCH_CONFIG = "russian"
+
+
+def search_queryset(params):
+    """Processed vacancies matching VacancySearchParams, newest first, not yet paged."""
+    queryset = VacancyAnalysis.objects.select_related(
+        'vacancy', 'vacancy__area', 'job_category', 'job_subcategory'
+    ).prefetch_related('key_requirements').defer('vacancy__search_vector')
+
+    if params.q:
+        # Matches through the GIN index on the trigger-maintained tsvector.
+        queryset = queryset.filter(
+            vacancy__search_vector=SearchQuery(params.q, config=SEARCH_CONFIG, search_type="websearch")
+        )
+    if params.category:
+        queryset = queryset.filter(job_category__name=params.category)
+    if params.subcategory:
+        queryset = queryset.filter(job_subcategory__name=params.subcategory)
+    if params.work_format:
+        queryset = queryset.filter(work_format__iexact=params.work_format)
+    if params.employment_type:
+        queryset = queryset.filter(employment_type__iexact=params.employment_type)
+    if params.currency:
+        queryset = queryset.filter(salary_currency__iexact=params.currency)
+
+    # A vacancy matches when its salary range overlaps the requested one. Amounts are in
+    # `currency` (the base currency by default) and compared with the normalized columns,
+    # both of which are in the (salary_high_base, salary_low_base) index.
+    currency = normalize_currency(params.currency)
+    if params.salary_min is not None:
+        bound = base_amount(params.salary_min, currency)
+        queryset = queryset.filter(salary_high_base__gte=bound) if bound is not None else queryset.none()
+    if params.salary_max is not None:
+        bound = base_amount(params.salary_max, currency)
+        queryset = queryset.filter(salary_low_base__lte=bound) if bound is not None else queryset.none()
+    if params.experience_max is not None:
+        queryset = queryset.filter(experience_years__lte=params.experience_max)
+
+    Through = VacancyAnalysis.key_requirements.through
+    for name in params.requirements:
+        # One EXISTS per requirement keeps rows unique, unlike chained joins.
+        queryset = queryset.filter(Exists(Through.objects.filter(
+            vacancyanalysis_id=OuterRef('pk'),
+            analysiskeyrequirement__name__iexact=name,
+        )))
+
+    return queryset.order_by('-vacancy__created_at', '-vacancy_id')
+
+
+def search_vacancies(params):
+    """
+    Returns (analyses, has_next) for one page of processed vacancies matching
+    VacancySearchParams, newest first. The page is fetched with one extra row
+    instead of a COUNT(*), and related rows come in two queries in total.
+    """
+    offset = (params.page - 1) * params.page_size
+    page = list(search_queryset(params)[offset:offset + params.page_size + 1])
+    return page[:params.page_size], len(page) > params.page_size
@@ -0,0 +1,87 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+
+# scipy keeps int32 index arrays as-is, int64 ones whose values fit into int32
+# would be downcast (copied) on every view.
+INDEX_DTYPE = np.int32
+
+
+class GrowableCSRMatrix:
+    """
+    Append-only CSR storage with preallocated indptr/indices/data arrays.
+    Capacity doubles when full, so appending a row costs amortized O(nnz of the row)
+    instead of copying the whole matrix like scipy.sparse.vstack does.
+    """
+
+    def __init__(self, n_cols, dtype=np.float64, row_capacity=1024, nnz_capacity=65536):
+        self.n_cols = n_cols
+        self.n_rows = 0
+        self.indptr = np.zeros(row_capacity + 1, dtype=INDEX_DTYPE)
+        self.indices = np.empty(nnz_capacity, dtype=INDEX_DTYPE)
+        self.data = np.empty(nnz_capacity, dtype=dtype)
+
+    @classmethod
+    def from_matrix(cls, matrix):
+        matrix = csr_matrix(matrix)
+        buffer = cls(
+            matrix.shape[1],
+            dtype=matrix.dtype,
+            row_capacity=max(matrix.shape[0], 1),
+            nnz_capacity=max(matrix.nnz, 1),
+        )
+        buffer.append_rows(matrix)
+        return buffer
+
+    def __getstate__(self):
+        # Spare capacity is not worth storing on disk.
+        nnz = self.nnz
+        state = self.__dict__.copy()
+        state['indptr'] = self.indptr[:self.n_rows + 1].copy()
+        state['indices'] = self.indices[:nnz].copy()
+        state['data'] = self.data[:nnz].copy()
+        return state
+
+    @property
+    def nnz(self):
+        return int(self.indptr[self.n_rows])
+
+    @property
+    def shape(self):
+        return self.n_rows, self.n_cols
+
+    def _reserve(self, n_rows, nnz):
+        row_capacity = self.indptr.size - 1
+        if n_rows > row_capacity:
+            indptr = np.zeros(max(n_rows, 2 * row_capacity) + 1, dtype=INDEX_DTYPE)
+            indptr[:self.n_rows + 1] = self.indptr[:self.n_rows + 1]
+            self.indptr = indptr
+        if nnz > self.data.size:
+            capacity = max(nnz, 2 * self.data.size)
+            used = self.nnz
+            indices = np.empty(capacity, dtype=INDEX_DTYPE)
+            indices[:used] = self.indices[:used]
+            data = np.empty(capacity, dtype=self.data.dtype)
+            data[:used] = self.data[:used]
+            self.indices, self.data = indices, data
+
+    def append_rows(self, matrix):
+        """Appends every row of a sparse matrix with `n_cols` columns."""
+        matrix = csr_matrix(matrix)
+        if matrix.shape[1] != self.n_cols:
+            raise ValueError(f"Expected {self.n_cols} columns, got {matrix.shape[1]}.")
+        start = self.nnz
+        end = start + matrix.nnz
+        self._reserve(self.n_rows + matrix.shape[0], end)
+        self.indices[start:end] = matrix.indices
+        self.data[start:end] = matrix.data
+        self.indptr[self.n_rows + 1:self.n_rows + matrix.shape[0] + 1] = matrix.indptr[1:] + start
+        self.n_rows += matrix.shape[0]
+
+    def matrix(self):
+        """Returns a csr_matrix over the filled prefix; the arrays are shared, not copied."""
+        nnz = self.nnz
+        return csr_matrix(
+            (self.data[:nnz], self.indices[:nnz], self.indptr[:self.n_rows + 1]),
+            shape=self.shape,
+            copy=False,
+        )
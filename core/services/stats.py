@@ -0,0 +1,242 @@
+import bisect
+import os
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from core.models import DailyCategoryStats, DailyRequirementStats, RollupWatermark, Vacancy, VacancyAnalysis
+from .feed import VACANCY_FEED_SETTLE_SECONDS
+from .normalization import BASE_CURRENCY, base_amount, minor_exponent
+from .response_cache import STATS, bump_response_generation
+
+STATS_ROLLUP = "daily_stats"
+# Processed vacancies consumed per refresh; a backlog is worked off over several runs.
+VACANCY_STATS_REFRESH_MAX_ROWS = int(os.getenv("VACANCY_STATS_REFRESH_MAX_ROWS", "50000"))
+
+# Log-spaced salary buckets from 10 000 to 10 000 000 units of the base currency, 10% wide,
+# so percentiles of any merged window are off by at most ~5%. Changing them invalidates
+# stored histograms; run `rebuild_stats_rollups` afterwards.
+SALARY_HISTOGRAM_START = 10_000
+SALARY_HISTOGRAM_END = 10_000_000
+SALARY_HISTOGRAM_RATIO = 1.1
+
+
+def _salary_buckets():
+    bounds = []
+    value = SALARY_HISTOGRAM_START
+    while value < SALARY_HISTOGRAM_END:
+        bounds.append(base_amount(value, BASE_CURRENCY))
+        value *= SALARY_HISTOGRAM_RATIO
+    return bounds
+
+
+# Upper bounds in minor units of the base currency; the histogram has one more overflow bucket.
+SALARY_BUCKETS = _salary_buckets()
+PERCENTILES = (25, 50, 75, 90)
+
+
+def _day_range(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def _salary_midpoint(low, high):
+    if low is None and high is None:
+        return None
+    if low is None or high is None:
+        return low if high is None else high
+    return (low + high) // 2
+
+
+def _created_on(day, prefix=""):
+    start, end = _day_range(day)
+    return Q(**{
+        f"{prefix}vacancy__created_at__gte": start,
+        f"{prefix}vacancy__created_at__lt": end,
+        f"{prefix}job_category__isnull": False,
+    })
+
+
+def rebuild_day(day):
+    """
+    Recomputes the rollups of vacancies created on `day` from the base tables. A day is
+    always rebuilt as a whole, so reprocessed vacancies are never counted twice.
+    """
+    groups = {}
+    for category_id, subcategory_id, low, high in VacancyAnalysis.objects.filter(_created_on(day)).values_list(
+        'job_category_id', 'job_subcategory_id', 'salary_low_base', 'salary_high_base',
+    ):
+        stats = groups.get((category_id, subcategory_id))
+        if stats is None:
+            stats = groups[(category_id, subcategory_id)] = DailyCategoryStats(
+                day=day,
+                job_category_id=category_id,
+                job_subcategory_id=subcategory_id,
+                salary_histogram=[0] * (len(SALARY_BUCKETS) + 1),
+            )
+        stats.vacancies += 1
+        salary = _salary_midpoint(low, high)
+        if salary is not None:
+            stats.salary_count += 1
+            stats.salary_sum += salary
+            stats.salary_histogram[bisect.bisect_left(SALARY_BUCKETS, salary)] += 1
+
+    Through = VacancyAnalysis.key_requirements.through
+    requirements = (
+        Through.objects
+        .filter(_created_on(day, prefix="vacancyanalysis__"))
+        .values('vacancyanalysis__job_category_id', 'vacancyanalysis__job_subcategory_id', 'analysiskeyrequirement_id')
+        .annotate(vacancies=Count('id'))
+        .order_by()
+    )
+    with transaction.atomic():
+        DailyCategoryStats.objects.filter(day=day).delete()
+        DailyRequirementStats.objects.filter(day=day).delete()
+        DailyCategoryStats.objects.bulk_create(groups.values())
+        DailyRequirementStats.objects.bulk_create([
+            DailyRequirementStats(
+                day=day,
+                job_category_id=row['vacancyanalysis__job_category_id'],
+                job_subcategory_id=row['vacancyanalysis__job_subcategory_id'],
+                requirement_id=row['analysiskeyrequirement_id'],
+                vacancies=row['vacancies'],
+            )
+            for row in requirements
+        ])
+
+
+def refresh_stats_rollups(limit=VACANCY_STATS_REFRESH_MAX_ROWS):
+    """
+    Advances the rollups past vacancies processed since the high-water mark, rebuilding
+    only the days those vacancies were created on. Rows newer than the feed settle
+    interval wait for the next run, so a late commit is never skipped. Concurrent runs
+    queue on the watermark row. Returns the rebuilt days.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        mark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=STATS_ROLLUP)
+        queryset = (
+            Vacancy.objects
+            .filter(processed_at__lte=now - timedelta(seconds=VACANCY_FEED_SETTLE_SECONDS))
+            .order_by('processed_at', 'id')
+        )
+        if mark.processed_at is not None:
+            queryset = queryset.filter(
+                Q(processed_at__gt=mark.processed_at) | Q(processed_at=mark.processed_at, id__gt=mark.vacancy_id)
+            )
+        rows = list(queryset.values_list('processed_at', 'id', 'created_at')[:limit])
+        days = sorted({timezone.localdate(created_at) for _, _, created_at in rows})
+        for day in days:
+            rebuild_day(day)
+        if rows:
+            mark.processed_at, mark.vacancy_id = rows[-1][0], rows[-1][1]
+        mark.refreshed_at = now
+        mark.save()
+    # Cached responses carry refreshed_at, so they go stale even when no day changed.
+    bump_response_generation(STATS)
+    return days
+
+
+def rebuild_stats_rollups(date_from, date_to):
+    """
+    Rebuilds every day in [date_from, date_to], e.g. after vacancies were deleted.
+    Holds the watermark lock, so it never runs alongside refresh_stats_rollups.
+    """
+    with transaction.atomic():
+        RollupWatermark.objects.select_for_update().get_or_create(name=STATS_ROLLUP)
+        day = date_from
+        while day <= date_to:
+            rebuild_day(day)
+            day += timedelta(days=1)
+    bump_response_generation(STATS)
+
+
+def stats_refreshed_at():
+    return RollupWatermark.objects.filter(name=STATS_ROLLUP).values_list('refreshed_at', flat=True).first()
+
+
+def _to_major(minor):
+    return round(minor / 10 ** minor_exponent(BASE_CURRENCY))
+
+
+def salary_percentile(histogram, percentile):
+    """Percentile of a merged histogram, interpolated geometrically inside its bucket."""
+    total = sum(histogram)
+    if not total:
+        return None
+    target = total * percentile / 100
+    seen = 0
+    for bucket, count in enumerate(histogram):
+        if count and seen + count >= target:
+            upper = SALARY_BUCKETS[min(bucket, len(SALARY_BUCKETS) - 1)]
+            if bucket == len(SALARY_BUCKETS):
+                upper *= SALARY_HISTOGRAM_RATIO
+            lower = upper / SALARY_HISTOGRAM_RATIO
+            return _to_major(lower * SALARY_HISTOGRAM_RATIO ** ((target - seen) / count))
+        seen += count
+    return None
+
+
+def vacancy_stats(params):
+    """
+    Aggregates the daily rollups for VacancyStatsParams: one entry per category, or per
+    subcategory when a category is given, with counts, salary percentiles and top key
+    requirements, plus the daily vacancy counts. Three queries, whatever the table sizes.
+    """
+    filters = Q(day__gte=params.date_from, day__lte=params.date_to)
+    if params.category:
+        filters &= Q(job_category__name=params.category)
+    if params.subcategory:
+        filters &= Q(job_subcategory__name=params.subcategory)
+    group = 'job_subcategory__name' if params.category else 'job_category__name'
+
+    entries = {}
+    for name, vacancies, salary_count, salary_sum, histogram in DailyCategoryStats.objects.filter(filters).values_list(
+        group, 'vacancies', 'salary_count', 'salary_sum', 'salary_histogram',
+    ):
+        entry = entries.setdefault(name, {
+            "vacancies": 0, "salary_count": 0, "salary_sum": 0, "histogram": [0] * (len(SALARY_BUCKETS) + 1),
+        })
+        entry["vacancies"] += vacancies
+        entry["salary_count"] += salary_count
+        entry["salary_sum"] += salary_sum
+        for bucket, count in enumerate(histogram):
+            entry["histogram"][bucket] += count
+
+    top_requirements = {}
+    for row in (
+        DailyRequirementStats.objects.filter(filters)
+        .values(group, 'requirement__name')
+        .annotate(total=Sum('vacancies'))
+        .order_by(group, '-total', 'requirement__name')
+    ):
+        names = top_requirements.setdefault(row[group], [])
+        if len(names) < params.top:
+            names.append({"name": row['requirement__name'], "vacancies": row['total']})
+
+    days = list(
+        DailyCategoryStats.objects.filter(filters)
+        .values('day')
+        .annotate(vacancies=Sum('vacancies'))
+        .order_by('day')
+    )
+
+    results = []
+    for name, entry in sorted(entries.items(), key=lambda item: -item[1]["vacancies"]):
+        salary = {"count": entry["salary_count"], "currency": BASE_CURRENCY}
+        if entry["salary_count"]:
+            salary["mean"] = _to_major(entry["salary_sum"] / entry["salary_count"])
+            for percentile in PERCENTILES:
+                salary[f"p{percentile}"] = salary_percentile(entry["histogram"], percentile)
+        results.append({
+            "subcategory" if params.category else "category": name,
+            "vacancies": entry["vacancies"],
+            "salary": salary,
+            "top_requirements": top_requirements.get(name, []),
+        })
+    return {
+        "results": results,
+        "days": [{"date": row['day'].isoformat(), "vacancies": row['vacancies']} for row in days],
+    }
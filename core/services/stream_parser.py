@@ -0,0 +1,97 @@
+import json
+import re
+
+ID_RE = re.compile(r'"id"\s*:\s*(\d+)')
+
+
+class StreamItemError(ValueError):
+    """One object of the streamed array could not be decoded; `vacancy_id` is a best guess."""
+
+    def __init__(self, message, text):
+        super().__init__(message)
+        self.text = text
+        match = ID_RE.search(text)
+        self.vacancy_id = int(match.group(1)) if match else None
+
+
+class VacancyStreamParser:
+    """
+    Incremental parser for the GPT response, fed with streamed text chunks.
+
+    It looks for the first JSON array (either the top-level one or the value of
+    "Vacancies", optionally inside a Markdown code fence) and returns every object
+    of that array as soon as its closing brace arrives. Each object is decoded on
+    its own, so a malformed item does not affect the others.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._in_array = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._item_start = None
+
+    @property
+    def started(self):
+        """True once the opening bracket of the array was seen."""
+        return self._in_array
+
+    @property
+    def finished(self):
+        return self._finished
+
+    def feed(self, chunk):
+        """Consumes a chunk and returns a list of decoded dicts and StreamItemError instances."""
+        self._buffer += chunk
+        results = []
+        buffer = self._buffer
+        pos = self._pos
+        while pos < len(buffer) and not self._finished:
+            char = buffer[pos]
+            if not self._in_array:
+                if char == "[":
+                    self._in_array = True
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if self._depth == 0:
+                    self._item_start = pos
+                self._depth += 1
+            elif char in "}]":
+                if self._depth == 0:
+                    if char == "]":
+                        self._finished = True
+                else:
+                    self._depth -= 1
+                    if self._depth == 0:
+                        results.append(self._decode(buffer[self._item_start:pos + 1]))
+                        self._item_start = None
+            pos += 1
+
+        # Drop consumed text, keeping only the object being read.
+        keep_from = self._item_start if self._item_start is not None else pos
+        self._buffer = buffer[keep_from:]
+        if self._item_start is not None:
+            self._item_start = 0
+        self._pos = pos - keep_from
+        return results
+
+    @staticmethod
+    def _decode(text):
+        try:
+            item = json.loads(text)
+        except json.JSONDecodeError as e:
+            return StreamItemError(f"Failed to decode item from ChatGPT: {e}", text)
+        if not isinstance(item, dict):
+            return StreamItemError("Item from ChatGPT is not an object", text)
+        return item
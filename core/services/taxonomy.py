@@ -0,0 +1,196 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.db import transaction
+from redis.exceptions import RedisError
+
+from core.models import JobCategory, JobSubcategory, AnalysisKeyRequirement
+from core.utils import get_redis
+from .response_cache import STATS, TAXONOMY, VACANCIES, bump_response_generation
+
+logger = logging.getLogger(__name__)
+
+TAXONOMY_CACHE_SIZE = int(os.getenv("TAXONOMY_CACHE_SIZE", "20000"))
+# How often a worker compares its cache with the shared version key.
+TAXONOMY_VERSION_CHECK_SECONDS = float(os.getenv("TAXONOMY_VERSION_CHECK_SECONDS", "5"))
+TAXONOMY_VERSION_KEY = "taxonomy:version"
+
+
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+
+class TaxonomyCache:
+    """
+    Per-process name -> id cache for categories, subcategories and key requirements.
+
+    Names only ever get added, so a miss simply falls through to the database.
+    Renames and deletes bump a version key in Redis; every worker notices it within
+    TAXONOMY_VERSION_CHECK_SECONDS and drops its cache.
+    """
+
+    def __init__(self, maxsize=TAXONOMY_CACHE_SIZE):
+        self.categories = LRUCache(maxsize)     # name -> id
+        self.subcategories = LRUCache(maxsize)  # (category_id, name) -> id
+        self.requirements = LRUCache(maxsize)   # (category_id, name) -> id
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _check_version(self):
+        now = time.monotonic()
+        if now - self._checked_at < TAXONOMY_VERSION_CHECK_SECONDS:
+            return
+        self._checked_at = now
+        try:
+            version = get_redis().get(TAXONOMY_VERSION_KEY)
+        except RedisError as e:
+            logger.warning(f"Could not read taxonomy version: {e}")
+            return
+        if version != self._version:
+            self.categories.clear()
+            self.subcategories.clear()
+            self.requirements.clear()
+            self._version = version
+
+    def warm(self):
+        """Loads the most recent rows of every table, called at worker start."""
+        with self._lock:
+            self._check_version()
+            maxsize = self.categories.maxsize
+            for category_id, name in JobCategory.objects.order_by('-id').values_list('id', 'name')[:maxsize][::-1]:
+                self.categories.put(name, category_id)
+            for subcategory_id, category_id, name in (
+                JobSubcategory.objects.order_by('-id').values_list('id', 'category_id', 'name')[:maxsize][::-1]
+            ):
+                self.subcategories.put((category_id, name), subcategory_id)
+            for requirement_id, category_id, name in (
+                AnalysisKeyRequirement.objects.order_by('-id').values_list('id', 'job_category_id', 'name')[:maxsize][::-1]
+            ):
+                self.requirements.put((category_id, name), requirement_id)
+
+    def _resolve(self, cache, keys, create, fetch, listed=False):
+        """
+        Returns {key: id}. Misses are created with bulk_create(ignore_conflicts=True)
+        and read back in one query; they enter the cache only after the surrounding
+        transaction commits, so a rollback never leaves ids of missing rows behind.
+        `listed` names show up in the taxonomy endpoint, whose cached responses a miss invalidates.
+        """
+        with self._lock:
+            self._check_version()
+            resolved = {}
+            misses = set()
+            for key in keys:
+                value = cache.get(key)
+                if value is None:
+                    misses.add(key)
+                else:
+                    resolved[key] = value
+        if misses:
+            create(misses)
+            fetched = fetch(misses)
+            resolved.update(fetched)
+
+            def remember():
+                with self._lock:
+                    for key, value in fetched.items():
+                        cache.put(key, value)
+
+            transaction.on_commit(remember)
+            if listed:
+                transaction.on_commit(lambda: bump_response_generation(TAXONOMY))
+        return resolved
+
+    def resolve_categories(self, names):
+        return self._resolve(
+            self.categories,
+            names,
+            lambda misses: JobCategory.objects.bulk_create(
+                [JobCategory(name=name) for name in misses], ignore_conflicts=True
+            ),
+            lambda misses: dict(
+                JobCategory.objects.filter(name__in=misses).values_list('name', 'id')
+            ),
+            listed=True,
+        )
+
+    def resolve_subcategories(self, keys):
+        """`keys` are (category_id, name) pairs."""
+        return self._resolve(
+            self.subcategories,
+            keys,
+            lambda misses: JobSubcategory.objects.bulk_create(
+                [JobSubcategory(category_id=category_id, name=name) for category_id, name in misses],
+                ignore_conflicts=True,
+            ),
+            lambda misses: {
+                (category_id, name): subcategory_id
+                for subcategory_id, category_id, name in JobSubcategory.objects.filter(
+                    category_id__in={category_id for category_id, _ in misses},
+                    name__in={name for _, name in misses},
+                ).values_list('id', 'category_id', 'name')
+                if (category_id, name) in misses
+            },
+            listed=True,
+        )
+
+    def resolve_requirements(self, keys):
+        """`keys` are (category_id, name) pairs."""
+        return self._resolve(
+            self.requirements,
+            keys,
+            lambda misses: AnalysisKeyRequirement.objects.bulk_create(
+                [AnalysisKeyRequirement(job_category_id=category_id, name=name) for category_id, name in misses],
+                ignore_conflicts=True,
+            ),
+            lambda misses: {
+                (category_id, name): requirement_id
+                for requirement_id, category_id, name in AnalysisKeyRequirement.objects.filter(
+                    job_category_id__in={category_id for category_id, _ in misses},
+                    name__in={name for _, name in misses},
+                ).values_list('id', 'job_category_id', 'name')
+                if (category_id, name) in misses
+            },
+        )
+
+
+_taxonomy_cache = None
+
+
+def get_taxonomy_cache():
+    global _taxonomy_cache
+    if _taxonomy_cache is None:
+        _taxonomy_cache = TaxonomyCache()
+    return _taxonomy_cache
+
+
+def bump_taxonomy_version():
+    """Invalidates the taxonomy cache of every worker and the cached responses that show names."""
+    try:
+        get_redis().incr(TAXONOMY_VERSION_KEY)
+    except RedisError as e:
+        logger.error(f"Could not bump taxonomy version: {e}")
+    bump_response_generation(TAXONOMY, VACANCIES, STATS)
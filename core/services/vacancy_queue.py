@@ -0,0 +1,124 @@
+import os
+import uuid
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import Vacancy
+
+# How long a worker owns claimed vacancies; after that they are handed out again,
+# so a crashed worker delays its batch by at most one lease.
+VACANCY_CLAIM_LEASE_SECONDS = int(os.getenv("VACANCY_CLAIM_LEASE_SECONDS", "600"))
+# Batches are packed up to this many estimated tokens of vacancy text...
+VACANCY_BATCH_TOKEN_BUDGET = int(os.getenv("VACANCY_BATCH_TOKEN_BUDGET", "6000"))
+# ...and a partial batch is sent anyway once its oldest vacancy waited this long.
+VACANCY_BATCH_MAX_WAIT_SECONDS = int(os.getenv("VACANCY_BATCH_MAX_WAIT_SECONDS", "600"))
+# Rough ratio for mixed Russian/English text with the gpt-4o tokenizer.
+VACANCY_CHARS_PER_TOKEN = float(os.getenv("VACANCY_CHARS_PER_TOKEN", "3"))
+# JSON keys and the id added around every vacancy in the request payload.
+ITEM_TOKEN_OVERHEAD = 10
+
+
+def claimable_vacancies(now):
+    """Unprocessed vacancies without a live lease, oldest first (served by core_vacancy_pending_idx)."""
+    return (
+        Vacancy.objects
+        .filter(is_processed=False)
+        .filter(Q(claimed_until__isnull=True) | Q(claimed_until__lt=now))
+        .order_by('created_at')
+    )
+
+
+def claim_vacancies(limit, lease_seconds=VACANCY_CLAIM_LEASE_SECONDS):
+    """
+    Claims up to `limit` of the oldest unprocessed vacancies for this worker for `lease_seconds`.
+    Rows locked or leased by other workers are skipped, so parallel workers get disjoint sets.
+    The rows get a new claim_token, which renew_lease() and lock_leased() check.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            claimable_vacancies(now)
+            .select_for_update(skip_locked=True)
+            .values_list('id', flat=True)[:limit]
+        )
+        Vacancy.objects.filter(id__in=ids).update(
+            claimed_until=now + timedelta(seconds=lease_seconds),
+            claim_token=uuid.uuid4(),
+        )
+    return list(Vacancy.objects.filter(id__in=ids).order_by('created_at'))
+
+
+def _leased(vacancies):
+    """Rows of `vacancies` still unprocessed and claimed with the token they were loaded with."""
+    ids_by_token = {}
+    for vacancy in vacancies:
+        ids_by_token.setdefault(vacancy.claim_token, []).append(vacancy.id)
+    held = Q(pk__in=[])
+    for token, ids in ids_by_token.items():
+        held |= Q(id__in=ids, claim_token=token)
+    return Vacancy.objects.filter(held, is_processed=False)
+
+
+def renew_lease(vacancies, lease_seconds=VACANCY_CLAIM_LEASE_SECONDS):
+    """
+    Restarts the lease of a batch right before it is sent, so a drain of several batches
+    does not outlive the lease claimed at its start. Returns the vacancies still held;
+    rows another worker claimed in the meantime are dropped.
+    """
+    with transaction.atomic():
+        ids = set(_leased(vacancies).select_for_update().values_list('id', flat=True))
+        Vacancy.objects.filter(id__in=ids).update(claimed_until=timezone.now() + timedelta(seconds=lease_seconds))
+    return [vacancy for vacancy in vacancies if vacancy.id in ids]
+
+
+def lock_leased(vacancies):
+    """
+    Locks the rows of `vacancies` this worker still holds until the caller's transaction
+    ends and returns their ids. Results for the other rows must not be saved.
+    """
+    return set(_leased(vacancies).select_for_update().values_list('id', flat=True))
+
+
+def release_vacancies(vacancies):
+    """Returns claimed vacancies that are still unprocessed, and still held by this worker, to the queue."""
+    _leased(vacancies).update(claimed_until=None, claim_token=None)
+
+
+def estimate_tokens(text):
+    return int(len(text) / VACANCY_CHARS_PER_TOKEN) + ITEM_TOKEN_OVERHEAD
+
+
+def build_batches(
+    vacancies,
+    max_items,
+    token_budget=VACANCY_BATCH_TOKEN_BUDGET,
+    max_wait_seconds=VACANCY_BATCH_MAX_WAIT_SECONDS,
+    now=None,
+):
+    """
+    Packs vacancies, oldest first, into batches of at most `max_items` items and
+    `token_budget` estimated tokens (a single larger vacancy gets a batch of its own).
+    Full batches are always returned; the trailing partial one only when its oldest
+    vacancy is older than `max_wait_seconds`. Returns (batches, leftover).
+    """
+    now = now or timezone.now()
+    batches = []
+    batch, batch_tokens = [], 0
+    for vacancy in vacancies:
+        tokens = estimate_tokens(vacancy.text)
+        if batch and (len(batch) >= max_items or batch_tokens + tokens > token_budget):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(vacancy)
+        batch_tokens += tokens
+
+    if batch:
+        is_full = len(batch) >= max_items or batch_tokens >= token_budget
+        waited = (now - batch[0].created_at).total_seconds()
+        if is_full or waited >= max_wait_seconds:
+            batches.append(batch)
+            batch = []
+    return batches, batch
@@ -0,0 +1,21 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import JobCategory, JobSubcategory, AnalysisKeyRequirement
+from core.services.taxonomy import bump_taxonomy_version
+
+TAXONOMY_MODELS = (JobCategory, JobSubcategory, AnalysisKeyRequirement)
+
+
+@receiver(post_save)
+def invalidate_taxonomy_on_save(sender, created, **kwargs):
+    # New rows are picked up as cache misses, only renames need an invalidation.
+    if sender in TAXONOMY_MODELS and not created:
+        transaction.on_commit(bump_taxonomy_version)
+
+
+@receiver(post_delete)
+def invalidate_taxonomy_on_delete(sender, **kwargs):
+    if sender in TAXONOMY_MODELS:
+        transaction.on_commit(bump_taxonomy_version)
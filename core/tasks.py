@@ -1,194 +1,226 @@
 import logging
 import os
-import json
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
 from celery import shared_task
-from django.db import transaction
-from openai import OpenAI
-
-from core.models import (
-    Vacancy,
-    JobCategory,
-    JobSubcategory,
-    AnalysisKeyRequirement,
-    VacancyAnalysis
+from celery.signals import worker_process_init
+from django.db import connection
+
+from core.services import (
+    ExtractionCache,
+    ExtractionError,
+    StreamItemError,
+    build_batches,
+    claim_vacancies,
+    get_extraction_backend,
+    get_taxonomy_cache,
+    rebuild_duplicate_index,
+    rebuild_match_index,
+    refresh_stats_rollups,
+    release_vacancies,
+    renew_lease,
+    save_vacancy_analyses,
 )
+from core.services.vacancy_queue import VACANCY_BATCH_MAX_WAIT_SECONDS
 from core.utils import send_debug_telegram
 
 logger = logging.getLogger(__name__)
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise EnvironmentError("API key for OpenAI is not set in environment variables.")
-
-client = OpenAI(api_key=OPENAI_API_KEY)
-
-def load_gpt_prompt(file_path="config/prompts/vacancy_processing_prompt.txt"):
-    with open(file_path, "r", encoding="utf-8") as f:
-        return f.read().strip()
-
-GPT_SYSTEM_PROMPT = load_gpt_prompt()
-
-@shared_task
-def process_vacancy_batch():
-    # Retrieve up to 10 unprocessed vacancies ordered by creation time.
-    VACANCY_BATCH_SIZE = int(os.getenv("VACANCY_BATCH_SIZE"))
-
-    unprocessed = list(Vacancy.objects.filter(is_processed=False).order_by('created_at')[:VACANCY_BATCH_SIZE])
-    if len(unprocessed) < VACANCY_BATCH_SIZE:
-        print(f"Not {VACANCY_BATCH_SIZE}")
-        return
 
-    vacancies_for_gpt = []
-    for vac in unprocessed:
-        _id = vac.id  # using internal id for mapping
-        vacancies_for_gpt.append({
-            "id": _id,
-            "text": vac.text
-        })
+@worker_process_init.connect
+def warm_taxonomy_cache(**kwargs):
+    # Resolve taxonomy names without DB round trips from the first batch on.
+    try:
+        get_taxonomy_cache().warm()
+    except Exception as e:
+        logger.error(f"Could not warm taxonomy cache: {e}")
 
-    user_payload = {
-        "Vacancies": vacancies_for_gpt
-    }
 
-    messages = [
-        {"role": "system", "content": GPT_SYSTEM_PROMPT},
-        {"role": "user", "content": json.dumps(user_payload, ensure_ascii=False)}
-    ]
+VACANCY_DRAIN_MAX_BATCHES = int(os.getenv("VACANCY_DRAIN_MAX_BATCHES", "1"))
+VACANCY_LLM_CONCURRENCY = int(os.getenv("VACANCY_LLM_CONCURRENCY", "4"))
+# Parse the completion while it streams and save every vacancy as soon as it is complete.
+VACANCY_GPT_STREAMING = os.getenv("VACANCY_GPT_STREAMING", "1") == "1"
 
-    print(messages)
 
+def run_extraction(backend, batch, events):
+    """
+    Worker thread body: puts ("items", batch, items) for every parsed piece of the
+    response, ("error", batch, exception) on failure and always ("done", batch, None) last.
+    The lease is renewed first, since the batch may have waited for a free slot;
+    vacancies another worker claimed in the meantime are not sent.
+    """
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-            temperature=0.0
-        )
+        held = renew_lease(batch)
+        if held and VACANCY_GPT_STREAMING:
+            for item in backend.stream(held):
+                events.put(("items", batch, [item]))
+        elif held:
+            events.put(("items", batch, backend.extract(held)))
     except Exception as e:
-        error_msg = f"Error calling ChatGPT API: {e}"
-        logger.error(error_msg)
-        send_debug_telegram(error_msg)
-        return
-
-    if not response or not response.choices:
-        error_msg = "No response from ChatGPT."
-        logger.error(error_msg)
-        send_debug_telegram(error_msg)
-        return
-
-    print(response.choices)
-
-    chatgpt_content = response.choices[0].message.content.strip()
-    # Remove Markdown code fences if present.
-    if chatgpt_content.startswith("```"):
-        chatgpt_content = chatgpt_content.strip("`").strip()
-        if chatgpt_content.lower().startswith("json"):
-            chatgpt_content = chatgpt_content[4:].strip()
+        events.put(("error", batch, e))
+    finally:
+        # The thread's own database connection, opened by renew_lease.
+        connection.close()
+        events.put(("done", batch, None))
 
-    try:
-        gpt_json = json.loads(chatgpt_content)
-    except json.JSONDecodeError as e:
-        error_msg = f"Failed to decode JSON from ChatGPT: {e} | content: {chatgpt_content}"
-        logger.error(error_msg)
-        send_debug_telegram(error_msg)
-        return
-
-    if isinstance(gpt_json, list):
-        data_vacancies = gpt_json
-    else:
-        data_vacancies = gpt_json.get("Vacancies", [])
-
-    vacancy_map_by_intid = {v.id: v for v in unprocessed}
-
-    for item in data_vacancies:
-        # Ensure item is a dict.
-        if not isinstance(item, dict):
-            continue
-
-        item_id = item.get("id")
-        if item_id is None:
-            continue
-
-        vacancy_obj = vacancy_map_by_intid.get(item_id)
-        if not vacancy_obj:
-            continue
-
-        if item.get("not_a_vacancy"):
-            text = vacancy_obj.text
-            vacancy_obj.is_processed = True
-            send_debug_telegram(f"#notVacancy\n\nVacancy is not a valid vacancy and has been deleted.\n\nText is:\n{text}\n")
-            continue
-
-        job_category_name = item.get("job_category")
-        job_subcategory_name = item.get("job_subcategory")
-        if job_category_name:
-            job_category, _ = JobCategory.objects.get_or_create(name=job_category_name)
-        else:
-            job_category, _ = JobCategory.objects.get_or_create(name="Other")
-        job_subcategory = None
-        if job_subcategory_name:
-            job_subcategory, _ = JobSubcategory.objects.get_or_create(
-                category=job_category,
-                name=job_subcategory_name
-            )
-        company = item.get("company")
-        location = item.get("location")
-        if location in [None, "Не указано"]:
-            location = "-"
-        employment_type = item.get("employment_type")
-        work_format = item.get("work_format")
-        salary_range_min = item.get("salary_range_min")
-        salary_range_max = item.get("salary_range_max")
-        salary_currency = item.get("salary_currency")
-        experience_years_required = item.get("experience_years_required")
-
-        with transaction.atomic():
-            analysis, created = VacancyAnalysis.objects.get_or_create(vacancy=vacancy_obj)
-            analysis.job_category = job_category
-            analysis.job_subcategory = job_subcategory
-            analysis.company = company or None
-            analysis.location = location or None
-            analysis.employment_type = employment_type or None
-            analysis.work_format = work_format or None
-            analysis.salary_range_min = salary_range_min or None
-            analysis.salary_range_max = salary_range_max or None
-            analysis.salary_currency = salary_currency or None
-            analysis.experience_years_required = experience_years_required or None
-            analysis.save()
-
-            key_reqs = item.get("key_requirements", [])
-            if isinstance(key_reqs, list):
-                analysis.key_requirements.clear()
-                for req_name in key_reqs:
-                    if not req_name.strip():
-                        continue
-                    kr, _ = AnalysisKeyRequirement.objects.get_or_create(
-                        name=req_name.strip(),
-                        job_category=job_category
-                    )
-                    analysis.key_requirements.add(kr)
-
-        vacancy_obj.is_processed = True
-        vacancy_obj.is_valid = True
-        vacancy_obj.save()
+
+@shared_task
+def process_vacancy_batch():
+    """
+    Claims up to VACANCY_DRAIN_MAX_BATCHES batches of unprocessed vacancies and sends
+    them to the extraction backend (VACANCY_EXTRACTION_BACKEND) concurrently, see process_vacancies.
+    """
+    process_vacancies(get_extraction_backend())
+
+
+def process_vacancies(backend, max_batches=VACANCY_DRAIN_MAX_BATCHES, max_wait_seconds=VACANCY_BATCH_MAX_WAIT_SECONDS):
+    """
+    Sends up to `max_batches` batches to `backend` with at most VACANCY_LLM_CONCURRENCY
+    requests in flight and returns the number of vacancies processed.
+    Batches are packed by item count and token budget; a partial batch is sent once
+    its oldest vacancy waited `max_wait_seconds`.
+    Request threads hand parsed items to this thread, which saves them right away.
+    With VACANCY_GPT_STREAMING each vacancy is saved as soon as its object closes in
+    the stream, together with the items of its batch that arrived during the previous
+    save. An item that fails to parse only sends its own vacancy back to the queue.
+    Claimed rows are leased, and each lease is renewed when its batch is sent, so
+    several workers can run this task at the same time on disjoint batches.
+    Nothing is claimed while the backend is unavailable.
+    """
+    VACANCY_BATCH_SIZE = int(os.getenv("VACANCY_BATCH_SIZE"))
+
+    # While the provider is failing, leave vacancies in the queue instead of claiming them.
+    if not backend.available():
+        logger.warning(f"Extraction backend {backend.name} is unavailable, skipping this run.")
+        return 0
+
+    unprocessed = claim_vacancies(VACANCY_BATCH_SIZE * max_batches)
+
+    # Vacancies already extracted with the same text, prompt and model skip the backend.
+    extraction_cache = ExtractionCache(model=backend.model, prompt=backend.prompt)
+    processed = 0
+    cached = extraction_cache.get_many(unprocessed)
+    if cached:
+        hits = [vacancy for vacancy in unprocessed if vacancy.id in cached]
+        processed += save_gpt_results(hits, list(cached.values()))
+        unprocessed = [vacancy for vacancy in unprocessed if vacancy.id not in cached]
+        logger.info(f"{len(hits)} vacancies taken from the extraction cache.")
+
+    batches, leftover = build_batches(unprocessed, VACANCY_BATCH_SIZE, max_wait_seconds=max_wait_seconds)
+    # A partial batch that is not old enough yet goes back to the queue right away.
+    release_vacancies(leftover)
+    if not batches:
+        logger.info(f"{len(leftover)} unprocessed vacancies are waiting for a full batch.")
+        return processed
+
+    events = queue.Queue()
+    with ThreadPoolExecutor(max_workers=min(VACANCY_LLM_CONCURRENCY, len(batches))) as executor:
+        for batch in batches:
+            executor.submit(run_extraction, backend, batch, events)
+
+        pending = len(batches)
+        while pending:
+            # Everything already queued is handled at once, so items of the same batch are
+            # saved in one transaction instead of one per streamed vacancy.
+            received = [events.get()]
+            while True:
+                try:
+                    received.append(events.get_nowait())
+                except queue.Empty:
+                    break
+            parsed = {}
+            for kind, batch, payload in received:
+                if kind == "items":
+                    parsed.setdefault(id(batch), (batch, []))[1].extend(payload)
+                    continue
+                # Items received before an error or the end of a batch are saved first.
+                processed += save_parsed_items(parsed, extraction_cache)
+                parsed = {}
+                if kind == "error":
+                    error_msg = str(payload)
+                    if isinstance(payload, ExtractionError):
+                        logger.error(error_msg)
+                    else:
+                        logger.error(error_msg, exc_info=payload)
+                    send_debug_telegram(error_msg)
+                else:
+                    pending -= 1
+                    # Vacancies missing from the response or failed to parse are retried by the next run.
+                    release_vacancies(batch)
+            processed += save_parsed_items(parsed, extraction_cache)
+
+    summary_msg = f"#info\nProcessed {processed} vacancies from {len(batches)} {backend.name} responses."
+    logger.info(summary_msg)
+    send_debug_telegram(summary_msg)
+    return processed
+
+
+def save_parsed_items(parsed, extraction_cache):
+    """Saves {id(batch): (batch, items)} with one save_gpt_results call per batch; returns the items saved."""
+    processed = 0
+    for batch, items in parsed.values():
+        data_vacancies = []
+        for item in items:
+            if isinstance(item, StreamItemError):
+                error_msg = f"{item} | vacancy id: {item.vacancy_id} | content: {item.text}"
+                logger.error(error_msg)
+                send_debug_telegram(error_msg)
+            else:
+                data_vacancies.append(item)
+        if data_vacancies:
+            processed += save_gpt_results(batch, data_vacancies)
+            extraction_cache.set_many(batch, data_vacancies)
+    return processed
+
+
+def save_gpt_results(unprocessed, data_vacancies):
+    """Stores the analysis of a batch or part of it and returns the number of items given."""
+    analyses, not_vacancies = save_vacancy_analyses(unprocessed, data_vacancies)
+
+    for vacancy_obj in not_vacancies:
+        send_debug_telegram(f"#notVacancy\n\nVacancy is not a valid vacancy and has been deleted.\n\nText is:\n{vacancy_obj.text}\n")
+
+    for analysis in analyses:
+        key_reqs = analysis.key_requirement_names
         # Build formatted debug message with vacancy text and structured information
         formatted_info = (
-            f"Job Category: {job_category.name}\n"
-            f"Job Subcategory: {job_subcategory.name if job_subcategory else '-'}\n"
-            f"Company: {company if company else '-'}\n"
-            f"Location: {location}\n"
-            f"Employment Type: {employment_type if employment_type else '-'}\n"
-            f"Work Format: {work_format if work_format else '-'}\n"
-            f"Salary Range: {salary_range_min if salary_range_min else '-'} - {salary_range_max if salary_range_max else '-'} ({salary_currency if salary_currency else '-'})\n"
-            f"Experience Required: {experience_years_required if experience_years_required else '-'}\n"
+            f"Job Category: {analysis.job_category.name}\n"
+            f"Job Subcategory: {analysis.job_subcategory.name if analysis.job_subcategory else '-'}\n"
+            f"Company: {analysis.company if analysis.company else '-'}\n"
+            f"Location: {analysis.location}\n"
+            f"Employment Type: {analysis.employment_type if analysis.employment_type else '-'}\n"
+            f"Work Format: {analysis.work_format if analysis.work_format else '-'}\n"
+            f"Salary Range: {analysis.salary_range_min if analysis.salary_range_min else '-'} - {analysis.salary_range_max if analysis.salary_range_max else '-'} ({analysis.salary_currency if analysis.salary_currency else '-'})\n"
+            f"Experience Required: {analysis.experience_years_required if analysis.experience_years_required else '-'}\n"
             f"Key Requirements: {', '.join(key_reqs) if key_reqs else '-'}"
         )
         debug_message = (
             f"#processedVacancy\n"
-            f"Vacancy Text:\n{vacancy_obj.text}\n\n"
+            f"Vacancy Text:\n{analysis.vacancy.text}\n\n"
             f"Formatted Information:\n{formatted_info}"
         )
         send_debug_telegram(debug_message)
 
-    summary_msg = f"#info\nProcessed {len(data_vacancies)} vacancies from ChatGPT response."
-    logger.info(summary_msg)
-    send_debug_telegram(summary_msg)
+    return len(data_vacancies)
+
+
+@shared_task
+def rebuild_duplicate_index_task():
+    # Refit TF-IDF on the whole table to refresh IDF weights of the duplicate index.
+    index = rebuild_duplicate_index()
+    logger.info(f"Duplicate index rebuilt, last vacancy id: {index.last_vacancy_id}")
+
+
+@shared_task
+def rebuild_match_index_task():
+    # Refit the matching vocabulary on the window and fold synced rows into the postings.
+    index = rebuild_match_index()
+    logger.info(f"Match index rebuilt with {len(index)} vacancies.")
+
+
+@shared_task
+def refresh_stats_rollups_task():
+    # Rebuild the daily rollups of the days touched since the last run.
+    days = refresh_stats_rollups()
+    logger.info(f"Stats rollups refreshed for {len(days)} days.")
@@ -1,3 +1,473 @@
-from django.test import TestCase
+import pickle
+import zlib
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.test import SimpleTestCase
+from django.utils import timezone
+from scipy import sparse
+
+from core.notifier import TELEGRAM_MESSAGE_LIMIT, TelegramNotifier, pack_messages
+from core.services.duplicate_detector import VacancyDuplicateDetector, dedupe_batch
+from core.services.duplicate_index import DuplicateIndex
+from core.services.llm_client import CircuitBreaker, TokenBucket
+from core.services.lsh import MAX_HASH, MinHashLSH, shingles
+from core.services.normalization import (
+    BASE_CURRENCY,
+    analysis_numbers,
+    normalize_currency,
+    parse_experience,
+    parse_salary,
+)
+from core.services.sparse_buffer import GrowableCSRMatrix
+from core.services.stream_parser import StreamItemError, VacancyStreamParser
+
+
+class ParseSalaryTests(SimpleTestCase):
+    def test_plain_and_grouped_numbers(self):
+        self.assertEqual(parse_salary("150000", "RUB"), 15_000_000)
+        self.assertEqual(parse_salary("200 000", "RUB"), 20_000_000)
+        self.assertEqual(parse_salary("200 000 руб.", "RUB"), 20_000_000)
+
+    def test_comma_or_dot_before_three_digits_groups_thousands(self):
+        self.assertEqual(parse_salary("5,000", "USD"), 500_000)
+        self.assertEqual(parse_salary("150,000", "RUB"), 15_000_000)
+        self.assertEqual(parse_salary("1,500,000", "RUB"), 150_000_000)
+        self.assertEqual(parse_salary("5.000", "EUR"), 500_000)
+        self.assertEqual(parse_salary("1,000.50", "USD"), 100_050)
+        self.assertEqual(parse_salary("1.234.567,89", "RUB"), 123_456_789)
+
+    def test_decimal_fractions(self):
+        self.assertEqual(parse_salary("150000.50", "RUB"), 15_000_050)
+        self.assertEqual(parse_salary("2,5", "USD"), 250)
+        self.assertEqual(parse_salary("1.5000", "USD"), 150)
+
+    def test_multipliers(self):
+        self.assertEqual(parse_salary("300k", "USD"), 30_000_000)
+        self.assertEqual(parse_salary("150 тыс.", "RUB"), 15_000_000)
+        self.assertEqual(parse_salary("1,5 млн", "RUB"), 150_000_000)
+
+    def test_minor_unit_exponent(self):
+        self.assertEqual(parse_salary("5,000", "JPY"), 5000)
+
+    def test_unparseable_or_out_of_range(self):
+        self.assertIsNone(parse_salary(None))
+        self.assertIsNone(parse_salary("по договорённости"))
+        self.assertIsNone(parse_salary("0", "RUB"))
+        self.assertIsNone(parse_salary("9" * 20, "RUB"))
+
+
+class ParseExperienceTests(SimpleTestCase):
+    def test_years(self):
+        self.assertEqual(parse_experience("3"), Decimal("3.0"))
+        self.assertEqual(parse_experience("1.5"), Decimal("1.5"))
+        self.assertEqual(parse_experience("3-5 лет"), Decimal("3.0"))
+        self.assertEqual(parse_experience("от 3 лет"), Decimal("3.0"))
+
+    def test_months(self):
+        self.assertEqual(parse_experience("6 месяцев"), Decimal("0.5"))
+        self.assertEqual(parse_experience("18 months"), Decimal("1.5"))
+
+    def test_unparseable_or_out_of_range(self):
+        self.assertIsNone(parse_experience(None))
+        self.assertIsNone(parse_experience("не требуется"))
+        self.assertIsNone(parse_experience("100"))
+
+
+class AnalysisNumbersTests(SimpleTestCase):
+    def test_currency_aliases(self):
+        self.assertEqual(normalize_currency("₽"), "RUB")
+        self.assertEqual(normalize_currency(" руб. "), "RUB")
+        self.assertEqual(normalize_currency("usd"), "USD")
+        self.assertIsNone(normalize_currency("-"))
+
+    def test_swapped_bounds_are_ordered(self):
+        numbers = analysis_numbers("300 000", "150,000", BASE_CURRENCY, "2 года")
+        self.assertEqual(numbers["salary_min_minor"], 15_000_000)
+        self.assertEqual(numbers["salary_max_minor"], 30_000_000)
+        self.assertEqual(numbers["salary_low_base"], 15_000_000)
+        self.assertEqual(numbers["salary_high_base"], 30_000_000)
+        self.assertEqual(numbers["experience_years"], Decimal("2.0"))
+
+    def test_open_ended_range_falls_back_to_the_other_bound(self):
+        numbers = analysis_numbers("100 000", None, BASE_CURRENCY, None)
+        self.assertIsNone(numbers["salary_max_minor"])
+        self.assertEqual(numbers["salary_low_base"], 10_000_000)
+        self.assertEqual(numbers["salary_high_base"], 10_000_000)
+
+    def test_unknown_currency_keeps_amounts_without_base(self):
+        numbers = analysis_numbers("5,000", "6,000", "XYZ", None)
+        self.assertEqual(numbers["salary_min_minor"], 500_000)
+        self.assertIsNone(numbers["salary_low_base"])
+        self.assertIsNone(numbers["salary_high_base"])
+
+
+class VacancyStreamParserTests(SimpleTestCase):
+    def feed_all(self, parser, chunks):
+        results = []
+        for chunk in chunks:
+            results.extend(parser.feed(chunk))
+        return results
+
+    def test_items_are_returned_as_their_objects_close(self):
+        parser = VacancyStreamParser()
+        self.assertEqual(parser.feed('{"Vacancies": [{"id": 1, "a": "x"}, {"id"'), [{"id": 1, "a": "x"}])
+        self.assertTrue(parser.started)
+        self.assertFalse(parser.finished)
+        self.assertEqual(parser.feed(': 2}]}'), [{"id": 2}])
+        self.assertTrue(parser.finished)
+
+    def test_single_character_chunks(self):
+        text = '```json\n[{"id": 1, "skills": ["a", "b"], "nested": {"k": 1}}, {"id": 2}]\n```'
+        self.assertEqual(
+            self.feed_all(VacancyStreamParser(), text),
+            [{"id": 1, "skills": ["a", "b"], "nested": {"k": 1}}, {"id": 2}],
+        )
+
+    def test_brackets_and_escaped_quotes_inside_strings(self):
+        text = '[{"id": 1, "text": "a } ] [ { \\" b"}]'
+        self.assertEqual(self.feed_all(VacancyStreamParser(), [text[:12], text[12:]]), [{"id": 1, "text": 'a } ] [ { " b'}])
+
+    def test_text_after_the_array_is_ignored(self):
+        parser = VacancyStreamParser()
+        self.assertEqual(self.feed_all(parser, ['[{"id": 1}]', ' trailing [{"id": 2}]']), [{"id": 1}])
+        self.assertTrue(parser.finished)
+
+    def test_malformed_item_does_not_affect_the_others(self):
+        results = self.feed_all(VacancyStreamParser(), ['[{"id": 1}, {"id": 7, "a": tru}, ', '{"id": 3}]'])
+        self.assertEqual(results[0], {"id": 1})
+        self.assertIsInstance(results[1], StreamItemError)
+        self.assertEqual(results[1].vacancy_id, 7)
+        self.assertEqual(results[2], {"id": 3})
+
+    def test_non_object_item_is_an_error(self):
+        results = self.feed_all(VacancyStreamParser(), ['[[1, 2], {"id": 1}]'])
+        self.assertIsInstance(results[0], StreamItemError)
+        self.assertIsNone(results[0].vacancy_id)
+        self.assertEqual(results[1], {"id": 1})
+
+
+class EmptyVocabularyTests(SimpleTestCase):
+    """Batches whose texts are only stopwords or 1-char tokens leave TF-IDF without a vocabulary."""
+
+    texts = ["и в на с по", "a b c d e"]
+
+    def test_unfitted_detector_reports_no_matches(self):
+        detector = VacancyDuplicateDetector(threshold=0.85)
+        self.assertEqual(detector.is_duplicate_many(self.texts), [(False, 0.0, None, None)] * 2)
+
+    def test_detector_skips_rows_without_terms(self):
+        detector = VacancyDuplicateDetector(threshold=0.85, initial_vacancies=[(1, self.texts[0])])
+        self.assertEqual(len(detector), 0)
+        detector.append(2, self.texts[1])
+        detector.append(3, "python разработчик django postgres")
+        self.assertEqual(list(detector.vacancy_ids), [3])
+        self.assertTrue(detector.is_duplicate("python разработчик django postgres")[0])
+
+    def test_empty_index_reports_no_matches(self):
+        index = DuplicateIndex(threshold=0.85)
+        self.assertEqual(index._similar_many(self.texts, [None, None]), [(False, 0.0, None, None)] * 2)
+        index.add(1, self.texts[0], timezone.now())
+        self.assertEqual(len(index), 0)
+
+
+class MinHashLSHTests(SimpleTestCase):
+    text = (
+        "Ищем backend разработчика python django postgres redis celery docker, "
+        "опыт от трёх лет, удалённая работа, зарплата по итогам собеседования"
+    )
+
+    def reference_signature(self, lsh, text):
+        # The same hash family in Python integers, which never overflow.
+        prime = (1 << 61) - 1
+        hashes = [zlib.crc32(s.encode("utf-8")) for s in shingles(text, lsh.shingle_size)]
+        return [
+            min(((int(a) * x + int(b)) % prime) & int(MAX_HASH) for x in hashes)
+            for a, b in zip(lsh._a, lsh._b)
+        ]
+
+    def test_signature_matches_big_int_reference(self):
+        lsh = MinHashLSH()
+        self.assertEqual(lsh.signature(self.text).tolist(), self.reference_signature(lsh, self.text))
+
+    def test_largest_coefficients_do_not_wrap(self):
+        lsh = MinHashLSH(bands=2, rows=2)
+        lsh._a[:] = MAX_HASH
+        lsh._b[:] = MAX_HASH
+        self.assertEqual(lsh.signature(self.text).tolist(), self.reference_signature(lsh, self.text))
+
+    def test_query_finds_near_duplicates_only(self):
+        lsh = MinHashLSH()
+        lsh.insert(1, self.text)
+        lsh.insert(2, "Требуется бухгалтер со знанием 1С, полный рабочий день в офисе")
+        near_duplicate = self.text.replace("трёх", "двух")
+        self.assertEqual(lsh.query(lsh.signature(near_duplicate)), {1})
+        self.assertEqual(lsh.query(lsh.signature(self.text)), {1})
+        self.assertEqual(lsh.query(lsh.signature("Повар в ресторан, график два через два")), set())
+
+
+class GrowableCSRMatrixTests(SimpleTestCase):
+    n_cols = 50
+
+    def chunks(self):
+        # Row counts and densities that cross both the row and the nnz capacity several times.
+        for i, (rows, density) in enumerate([(1, 0.1), (0, 0.1), (3, 0.3), (1, 0.0), (7, 0.5), (20, 0.2)]):
+            yield sparse.random(rows, self.n_cols, density=density, format="csr", random_state=i)
+
+    def assertSameMatrix(self, buffer, expected):
+        actual = buffer.matrix()
+        self.assertEqual(actual.shape, expected.shape)
+        np.testing.assert_array_equal(actual.indptr, expected.indptr)
+        np.testing.assert_array_equal(actual.indices, expected.indices)
+        np.testing.assert_array_equal(actual.data, expected.data)
+
+    def test_appends_across_growth_match_vstack(self):
+        buffer = GrowableCSRMatrix(self.n_cols, row_capacity=1, nnz_capacity=1)
+        appended = []
+        for chunk in self.chunks():
+            buffer.append_rows(chunk)
+            appended.append(chunk)
+            self.assertSameMatrix(buffer, sparse.vstack(appended, format="csr"))
+        self.assertGreater(buffer.indptr.size - 1, 1)
+        self.assertGreater(buffer.data.size, 1)
+
+    def test_pickled_buffer_keeps_rows_and_grows(self):
+        chunks = list(self.chunks())
+        buffer = GrowableCSRMatrix.from_matrix(sparse.vstack(chunks[:3], format="csr"))
+        restored = pickle.loads(pickle.dumps(buffer))
+        self.assertSameMatrix(restored, buffer.matrix())
+        self.assertEqual(restored.data.size, restored.nnz)
+        for chunk in chunks[3:]:
+            restored.append_rows(chunk)
+        self.assertSameMatrix(restored, sparse.vstack(chunks, format="csr"))
+
+    def test_column_mismatch(self):
+        with self.assertRaises(ValueError):
+            GrowableCSRMatrix(self.n_cols).append_rows(sparse.csr_matrix((1, self.n_cols + 1)))
+
+
+class DedupeBatchTests(SimpleTestCase):
+    threshold = 0.85
+
+    def vectors(self, *rows):
+        # Unit rows, so the dot product is the cosine similarity.
+        return sparse.csr_matrix(np.array(rows, dtype=np.float64))
+
+    def test_later_copies_match_the_first_accepted_item(self):
+        vectors = self.vectors([1, 0], [1, 0], [0, 1], [0.6, 0.8])
+        results = dedupe_batch(vectors, np.array([0.1, 0.2, 0.0, 0.3]), np.zeros(4), self.threshold)
+        self.assertEqual(results[0], (False, 0.1, None, None))
+        self.assertEqual(results[1], (True, 1.0, None, 0))
+        self.assertEqual(results[2], (False, 0.0, None, None))
+        # Not a duplicate of either accepted item; the best batch score is reported.
+        self.assertFalse(results[3][0])
+        self.assertAlmostEqual(results[3][1], 0.8)
+
+    def test_incompatible_pairs_do_not_match(self):
+        vectors = self.vectors([1, 0], [1, 0], [1, 0])
+        compatible = np.array([[True, False, True], [False, True, True], [True, True, True]])
+        results = dedupe_batch(vectors, np.zeros(3), np.zeros(3), self.threshold, compatible)
+        self.assertEqual([result[0] for result in results], [False, False, True])
+        self.assertEqual(results[2][3], 0)
+
+    def test_corpus_match_takes_precedence(self):
+        vectors = self.vectors([1, 0], [1, 0], [1, 0])
+        results = dedupe_batch(vectors, np.array([0.9, 0.95, 0.0]), np.array([10, 11, 0]), self.threshold)
+        self.assertEqual(results[0], (True, 0.9, 10, None))
+        self.assertEqual(results[1], (True, 0.95, 11, None))
+        # Items that matched the corpus are not accepted, so the third one is new.
+        self.assertEqual(results[2], (False, 0.0, None, None))
+
+
+class PackMessagesTests(SimpleTestCase):
+    limit = TELEGRAM_MESSAGE_LIMIT
+
+    def test_messages_filling_the_limit_exactly_are_joined(self):
+        first = "a" * 2000
+        second = "b" * (self.limit - 2000 - 2)
+        self.assertEqual(pack_messages([first, second]), [f"{first}\n\n{second}"])
+        self.assertEqual(len(pack_messages([first, second])[0]), self.limit)
+
+    def test_one_character_over_the_limit_starts_a_new_text(self):
+        first = "a" * 2000
+        second = "b" * (self.limit - 2000 - 1)
+        self.assertEqual(pack_messages([first, second]), [first, second])
+
+    def test_long_message_is_split_at_the_limit(self):
+        chunks = pack_messages(["c" * self.limit, "d" * (self.limit + 1), "e"])
+        self.assertEqual(chunks, ["c" * self.limit, "d" * self.limit, "d\n\ne"])
+
+    def test_empty_queue(self):
+        self.assertEqual(pack_messages([]), [])
+
+
+class TelegramNotifierTests(SimpleTestCase):
+    def response(self, status_code, payload=None):
+        response = mock.Mock(status_code=status_code, text="")
+        if payload is None:
+            response.json.side_effect = ValueError
+        else:
+            response.json.return_value = payload
+        return response
+
+    def send(self, *responses):
+        notifier = TelegramNotifier("token", "chat", min_interval=0)
+        notifier._session = mock.Mock()
+        notifier._session.post.side_effect = responses
+        with mock.patch("core.notifier.time.sleep") as sleep:
+            notifier._send("text")
+        return notifier._session.post, sleep
+
+    def test_rate_limit_waits_for_retry_after(self):
+        post, sleep = self.send(self.response(429, {"ok": False, "parameters": {"retry_after": 7}}), self.response(200))
+        self.assertEqual(post.call_count, 2)
+        sleep.assert_called_once_with(7)
+
+    def test_rate_limit_without_retry_after_backs_off(self):
+        post, sleep = self.send(self.response(429), self.response(429, {"ok": False}), self.response(200))
+        self.assertEqual(post.call_count, 3)
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [1, 2])
+
+    def test_client_error_is_not_retried(self):
+        post, sleep = self.send(self.response(400))
+        self.assertEqual(post.call_count, 1)
+        sleep.assert_not_called()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class FakeRedis:
+    """The few Redis commands CircuitBreaker uses, with expiry driven by a FakeClock."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.values = {}
+        self.expires = {}
+
+    def _alive(self, key):
+        if key in self.expires and self.expires[key] <= self.clock():
+            del self.values[key], self.expires[key]
+        return key in self.values
+
+    def exists(self, key):
+        return int(self._alive(key))
+
+    def ttl(self, key):
+        if not self._alive(key):
+            return -2
+        return int(self.expires[key] - self.clock()) if key in self.expires else -1
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+        self.expires.pop(key, None)
+        if ex:
+            self.expires[key] = self.clock() + ex
+
+    def incr(self, key):
+        self.values[key] = int(self.values[key]) + 1 if self._alive(key) else 1
+        return self.values[key]
+
+    def expire(self, key, seconds):
+        if not self._alive(key):
+            return 0
+        self.expires[key] = self.clock() + seconds
+        return 1
+
+    def delete(self, *keys):
+        deleted = [key for key in keys if self._alive(key)]
+        for key in deleted:
+            self.values.pop(key)
+            self.expires.pop(key, None)
+        return len(deleted)
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+class TokenBucketTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch("core.services.llm_client.time", mock.Mock(monotonic=self.clock))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_refill_rate(self):
+        bucket = TokenBucket(60)
+        self.assertEqual(bucket.reserve(60), 0.0)
+        self.assertAlmostEqual(bucket.reserve(1), 1.0)
+        self.clock.advance(3)
+        self.assertEqual(bucket.reserve(2), 0.0)
+        self.assertAlmostEqual(bucket.reserve(30), 30.0)
+
+    def test_refill_stops_at_capacity(self):
+        bucket = TokenBucket(60)
+        bucket.reserve(60)
+        self.clock.advance(1000)
+        self.assertEqual(bucket.reserve(60), 0.0)
+        self.assertAlmostEqual(bucket.reserve(1), 1.0)
+
+    def test_request_larger_than_capacity_waits_for_a_full_bucket(self):
+        bucket = TokenBucket(60)
+        bucket.reserve(60)
+        self.assertAlmostEqual(bucket.reserve(600), 60.0)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch("core.services.llm_client.get_redis", return_value=FakeRedis(self.clock))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(failure_threshold=3, open_seconds=60)
+
+    def fail(self, times):
+        for _ in range(times):
+            self.breaker.record_failure()
+
+    def test_opens_at_threshold_and_closes_after_a_success(self):
+        self.fail(2)
+        self.assertFalse(self.breaker.is_open())
+        self.fail(1)
+        self.assertTrue(self.breaker.is_open())
+        self.assertEqual(self.breaker.open_for(), 60)
+
+        # Half-open: calls go through again, but the first failure reopens the circuit.
+        self.clock.advance(61)
+        self.assertFalse(self.breaker.is_open())
+        self.assertEqual(self.breaker.open_for(), 0)
+        self.fail(1)
+        self.assertTrue(self.breaker.is_open())
+
+        # A success in the half-open state closes it: single failures are counted again.
+        self.clock.advance(61)
+        self.breaker.record_success()
+        self.fail(2)
+        self.assertFalse(self.breaker.is_open())
+
+    def test_success_resets_the_failure_count(self):
+        self.fail(2)
+        self.breaker.record_success()
+        self.fail(2)
+        self.assertFalse(self.breaker.is_open())
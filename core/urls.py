@@ -1,6 +1,22 @@
 from django.urls import path
-from core.api.vacancies import VacancyCreateAPIView
+from django.views.decorators.csrf import csrf_exempt
+from core.api.vacancies import VacancyCreateAPIView, VacancyBulkCreateAPIView
+from core.api.search import VacancySearchAPIView
+from core.api.feed import VacancyFeedAPIView
+from core.api.ingest import VacancyIngestStatusView, VacancyIngestView
+from core.api.resumes import ResumeMatchesAPIView
+from core.api.stats import VacancyStatsAPIView
+from core.api.taxonomy import TaxonomyAPIView
 
 urlpatterns = [
     path('vacancies/', VacancyCreateAPIView.as_view(), name='vacancy-create'),
+    path('vacancies/bulk/', VacancyBulkCreateAPIView.as_view(), name='vacancy-bulk-create'),
+    # Plain async Django views; DRF's APIView, which exempts the others from CSRF, runs synchronously.
+    path('vacancies/ingest/', csrf_exempt(VacancyIngestView.as_view()), name='vacancy-ingest'),
+    path('vacancies/ingest/<str:tracking_id>/', VacancyIngestStatusView.as_view(), name='vacancy-ingest-status'),
+    path('vacancies/search/', VacancySearchAPIView.as_view(), name='vacancy-search'),
+    path('vacancies/feed/', VacancyFeedAPIView.as_view(), name='vacancy-feed'),
+    path('vacancies/stats/', VacancyStatsAPIView.as_view(), name='vacancy-stats'),
+    path('taxonomy/', TaxonomyAPIView.as_view(), name='taxonomy'),
+    path('resumes/<int:resume_id>/matches/', ResumeMatchesAPIView.as_view(), name='resume-matches'),
 ]
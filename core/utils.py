@@ -1,7 +1,15 @@
+import asyncio
+import contextlib
 import logging
 import os
+import weakref
 
-import requests
+import redis
+import redis.asyncio
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+
+from core.notifier import get_notifier
 
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHANNEL = os.getenv("TELEGRAM_CHANNEL")
@@ -15,16 +23,54 @@ if TELEGRAM_DEBUG and (not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHANNEL):
 
 def send_debug_telegram(message: str) -> None:
     """
-    Sends a debug message to the Telegram channel.
+    Queues a debug message for the Telegram channel and returns immediately.
     The message is sent only if TELEGRAM_DEBUG is enabled.
     """
     if not TELEGRAM_DEBUG:
         return
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    params = {"chat_id": f"@{TELEGRAM_CHANNEL}", "text": message}
+    get_notifier(TELEGRAM_BOT_TOKEN, f"@{TELEGRAM_CHANNEL}").enqueue(message)
+
+
+_redis_client = None
+
+
+def get_redis():
+    """
+    Returns a Redis client for the instance used by Celery.
+    The client keeps its own connection pool, so one per process is enough.
+    """
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.REDIS_URL)
+    return _redis_client
+
+
+_async_redis_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_redis():
+    """
+    Returns an asyncio Redis client for async views. Connections belong to an event
+    loop, so there is one client per running loop; views open it with `async_redis`.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_redis_clients.get(loop)
+    if client is None:
+        client = _async_redis_clients[loop] = redis.asyncio.Redis.from_url(settings.REDIS_URL)
+    return client
+
+
+@contextlib.asynccontextmanager
+async def async_redis(request):
+    """
+    The asyncio Redis client for the duration of an async view. Under ASGI every request
+    shares the client of the server loop. Through WSGI each request runs on a loop of its
+    own, so its client is closed on the way out instead of leaking a connection.
+    """
+    client = get_async_redis()
     try:
-        response = requests.get(url, params=params, timeout=5)
-        if response.status_code != 200:
-            logger.error(f"Error sending to Telegram, status: {response.status_code}, response: {response.text}")
-    except Exception as e:
-        logger.error(f"Error sending message to Telegram: {e}")
\ No newline at end of file
+        yield client
+    finally:
+        if not isinstance(request, ASGIRequest):
+            _async_redis_clients.pop(asyncio.get_running_loop(), None)
+            await client.aclose()